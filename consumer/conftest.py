@@ -0,0 +1,16 @@
+import pytest
+
+
+class FakeClock:
+    """time.monotonic 대신 주입하는 시계. 테스트가 now 를 직접 움직임"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
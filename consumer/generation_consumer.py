@@ -1,124 +1,275 @@
 import json
 import uuid
-import sqlite3
 import time
-from contextlib import closing
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from pika import spec as pika_spec
 from pika.exceptions import ChannelClosedByBroker, StreamLostError, AMQPError
 
 from base64 import b64decode
 from io import BytesIO
 from PIL import Image
-import requests
-import base64
-from typing import List, Dict, Optional
-from openai import OpenAI
+from typing import TYPE_CHECKING, List, Optional
 
 from static.rabbitmq import *
 from static.model import *
 from static.s3 import *
 from static.classifier_preprompt import SYSTEM_INSTRUCTIONS, TOOLS
+from static.route_cache import ROUTE_CACHE_ENABLED
+from static.style_transfer import STYLE_TRANSFER_BACKEND
+
+from idempotency import create_store
+from local_router import route_locally
+from route_cache import RouteCache, route_cache_key, router_fingerprint
+from router_context import build_router_content
+from prefetch import ImagePrefetcher, likely_image_paths
+from s3_objects import fetch_s3_object, open_binaries
+from resilience import backoff_delay, openai_call, s3_call
+from style_transfer_client import style_transfer_client
+from pipeline import (SUBTYPES, decode_job, encode_job, execute_queue, executor_queues, rejected_count,
+                      retry_queue)
+from publisher_confirms import AsyncPublisher
+from previews import PreviewPublisher
+from sizing import choose_api_size, edit_target, fit_to_size, image_size, parse_size, shrink_part, size_str
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+
+idempotency_store = create_store()
+# 같은 입력의 router 결정 재사용 (프롬프트/툴 정의가 바뀌면 ROUTER_VERSION 이 달라져 자동 무효화)
+route_cache = RouteCache() if ROUTE_CACHE_ENABLED else None
+ROUTER_VERSION = router_fingerprint(SYSTEM_INSTRUCTIONS, TOOLS)
+# router 호출과 겹쳐서 S3 이미지를 미리 받는 공유 스레드 풀
+prefetch_executor = ThreadPoolExecutor(max_workers=S3_PREFETCH_WORKERS, thread_name_prefix="s3-prefetch") \
+    if S3_PREFETCH_WORKERS > 0 else None
+# 미리보기 업로드/publish 스레드 풀 (이미지 스트림을 읽는 worker 스레드를 막지 않도록)
+preview_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="preview") \
+    if IMAGE_PREVIEW_ENABLED else None
 
-from styletransfer.tasks import wait_for_result
-
-
-IDEMPOTENT_DB_PATH = os.environ.get("IDEMPOTENT_DB_PATH", "/db/processed.db")
-os.makedirs(os.path.dirname(IDEMPOTENT_DB_PATH), exist_ok=True)
-with closing(sqlite3.connect(IDEMPOTENT_DB_PATH)) as conn:
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS processed (
-            request_id TEXT PRIMARY KEY,
-            status TEXT NOT NULL,
-            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    conn.commit()
 
 def mark_in_progress(request_id: str) -> bool:
-    """아직 처리되지 않았으면 기록 후 True, 이미 있으면 False"""
-    try:
-        with closing(sqlite3.connect(IDEMPOTENT_DB_PATH, timeout=5)) as conn:
-            conn.execute("BEGIN IMMEDIATE")
-            row = conn.execute("SELECT status FROM processed WHERE request_id=?", (request_id,)).fetchone()
-            if row and row[0] in ("done", "in_progress"):
-                conn.commit()
-                return False
-            conn.execute("INSERT OR REPLACE INTO processed(request_id, status, updated_at) VALUES(?,?,CURRENT_TIMESTAMP)",
-                         (request_id, "in_progress"))
-            conn.commit()
-            return True
-    except sqlite3.Error:
-        return True  # DB 문제 시에도 처리 진행
+    """아직 처리되지 않았으면 기록 후 True, 이미 있으면 False (lease 만료된 in_progress는 재처리)"""
+    return idempotency_store.mark_in_progress(request_id)
+
 
 def mark_done(request_id: str):
-    try:
-        with closing(sqlite3.connect(IDEMPOTENT_DB_PATH, timeout=5)) as conn:
-            conn.execute("INSERT OR REPLACE INTO processed(request_id, status, updated_at) VALUES(?,?,CURRENT_TIMESTAMP)",
-                         (request_id, "done"))
-            conn.commit()
-    except sqlite3.Error:
-        pass
-
-def safe_publish(channel, routing_key, body, max_retries=3, sleep_sec=0.5):
-    """RabbitMQ publish 재시도"""
+    idempotency_store.mark_done(request_id)
+
+
+def mark_failed(request_id: str):
+    idempotency_store.mark_failed(request_id)
+
+
+def safe_publish(channel, routing_key, body, max_retries=3):
+    """RabbitMQ publish 재시도 (지수 backoff + jitter)"""
     for attempt in range(1, max_retries + 1):
         try:
             channel.basic_publish(exchange='', routing_key=routing_key, body=body)
             return True
         except (ChannelClosedByBroker, StreamLostError, AMQPError, OSError) as e:
             print(f"[경고] publish 실패({attempt}/{max_retries}): {e}")
-            time.sleep(sleep_sec)
+            if attempt < max_retries:
+                time.sleep(backoff_delay(attempt))
     return False
 
-def get_client() -> OpenAI:
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
+class ThreadSafeChannel:
+    """
+    worker 스레드용 channel 프록시.
+    pika channel은 thread-safe 하지 않으므로 ack/nack/publish를 add_callback_threadsafe로
+    connection 스레드에 넘겨 실행하고, 결과(또는 예외)를 기다려 그대로 돌려준다.
+    on_message / safe_publish 는 일반 channel과 동일하게 사용할 수 있다.
+    enable_async_confirms() 후에는 publish_and_ack 로 응답 publish 와 입력 ack 를 기다리지 않고 넘길 수 있다.
+    """
+
+    def __init__(self, connection, channel, timeout: float = 30.0):
+        self.connection = connection
+        self.channel = channel
+        self.timeout = timeout
+        self.publisher: Optional[AsyncPublisher] = None
+
+    def _call(self, fn):
+        fut = Future()
+
+        def run():
+            # 호출자가 timeout 으로 포기(취소)한 작업은 실행하지 않음
+            # → 늦게 실행된 ack 와 호출자의 에러 처리 nack 이 같은 tag 를 두 번 처리하지 않도록
+            if not fut.set_running_or_notify_cancel():
+                return
+            try:
+                fut.set_result(fn())
+            except Exception as e:
+                fut.set_exception(e)
+
+        self.connection.add_callback_threadsafe(run)
+        try:
+            return fut.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            if fut.cancel():
+                raise AMQPError(f"connection 스레드 응답 없음({self.timeout}s)")
+            # 이미 connection 스레드에서 실행 중 → 결과(또는 예외)를 그대로 전달
+            return fut.result()
+
+    def enable_async_confirms(self, max_retries: int = 3):
+        """
+        비동기 publisher confirm 모드 (connection 스레드에서 consume 시작 전에 호출).
+        BlockingChannel.confirm_delivery() 는 publish 마다 confirm 을 기다리므로
+        내부 channel(_impl)에 직접 confirm 모드를 켜고 Basic.Ack/Nack 을 AsyncPublisher 로 넘긴다.
+        """
+        self.publisher = AsyncPublisher(
+            publish=lambda routing_key, body: self.channel.basic_publish(
+                exchange='', routing_key=routing_key, body=body),
+            ack=lambda tag, multiple: self.channel.basic_ack(delivery_tag=tag, multiple=multiple),
+            nack=lambda tag: self.channel.basic_nack(delivery_tag=tag, requeue=False),
+            call_later=self.connection.call_later,
+            max_retries=max_retries,
+        )
+        selected = []
+        self.channel._impl.confirm_delivery(ack_nack_callback=self._on_confirm_frame, callback=selected.append)
+        deadline = time.monotonic() + self.timeout
+        while not selected:
+            if time.monotonic() > deadline:
+                raise AMQPError(f"Confirm.Select 응답 없음({self.timeout}s)")
+            self.connection.process_data_events(time_limit=0.1)
+
+    def _on_confirm_frame(self, frame):
+        # pika I/O 처리 도중 호출됨 → channel 작업(ack 등)은 다음 이벤트 루프 차례에 실행
+        method = frame.method
+        ack = isinstance(method, pika_spec.Basic.Ack)
+        self.connection.add_callback_threadsafe(
+            lambda: self.publisher.on_confirm(method.delivery_tag, method.multiple, ack))
+
+    def delivered(self, delivery_tag):
+        """입력 메시지 수신 기록 (connection 스레드, multiple ack 범위 계산용)"""
+        if self.publisher is not None:
+            self.publisher.acks.delivered(delivery_tag)
+
+    def _forget(self, delivery_tag):
+        if self.publisher is not None:
+            self.publisher.acks.discard(delivery_tag)
+
+    def basic_ack(self, delivery_tag):
+        def ack():
+            self._forget(delivery_tag)
+            return self.channel.basic_ack(delivery_tag=delivery_tag)
+
+        return self._call(ack)
+
+    def basic_nack(self, delivery_tag, requeue=False):
+        def nack():
+            self._forget(delivery_tag)
+            return self.channel.basic_nack(delivery_tag=delivery_tag, requeue=requeue)
+
+        return self._call(nack)
+
+    def basic_publish(self, exchange, routing_key, body):
+        if self.publisher is None:
+            return self._call(lambda: self.channel.basic_publish(exchange=exchange, routing_key=routing_key, body=body))
+        # 비동기 confirm 모드: confirm 까지 기다렸다가 반환 (delivery tag 순서를 AsyncPublisher 가 관리)
+        fut = Future()
+        self.connection.add_callback_threadsafe(lambda: self.publisher.publish_and_ack(
+            routing_key, body, None,
+            on_confirmed=lambda: fut.set_result(None),
+            on_failed=lambda: fut.set_exception(AMQPError("publish 실패(broker nack)"))))
+        try:
+            return fut.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise AMQPError(f"publish confirm 응답 없음({self.timeout}s)")
+
+    def publish_nowait(self, routing_key, body):
+        """confirm 을 기다리지 않는 publish (미리보기 등 best effort 메시지). 비동기 confirm 모드가 아니면 basic_publish"""
+        if self.publisher is None:
+            return self.basic_publish(exchange='', routing_key=routing_key, body=body)
+        self.connection.add_callback_threadsafe(lambda: self.publisher.publish_and_ack(routing_key, body, None))
+
+    def publish_and_ack(self, routing_key, body, delivery_tag, on_confirmed=None, on_failed=None):
+        """
+        응답 publish 후 바로 반환. confirm 되면 on_confirmed() 후 입력 ACK(가능하면 multiple 로 묶음),
+        재시도 후에도 실패하면 on_failed() 후 입력 NACK. 콜백은 connection 스레드에서 실행
+        """
+        self.connection.add_callback_threadsafe(lambda: self.publisher.publish_and_ack(
+            routing_key, body, delivery_tag, on_confirmed=on_confirmed, on_failed=on_failed))
+
+
+def _run_in_worker(handler, channel, method, properties, body):
+    try:
+        handler(channel, method, properties, body)
+    except Exception as e:
+        # ack/nack 자체가 실패한 경우(연결 끊김 등): 메시지는 브로커가 재전달
+        print(f"[❌] worker 예외 (delivery_tag={method.delivery_tag}): {e}")
+
+
+def _require_api_key():
+    if not os.getenv("OPENAI_API_KEY"):
         raise RuntimeError("환경변수 OPENAI_API_KEY가 설정되지 않았습니다.")
-    return OpenAI(api_key=API_KEY)
 
 
-def get_s3_key():
+def get_client() -> "OpenAI":
+    _require_api_key()
+    from http_transport import create_openai_client  # openai/httpx 는 처음 필요할 때 import
+    return create_openai_client(API_KEY)
+
+
+client: Optional["OpenAI"] = None
+_client_lock = threading.Lock()
+
+
+def openai_client() -> "OpenAI":
+    """프로세스 공용 OpenAI client (첫 LLM/이미지 호출 때 생성 → 로컬 규칙/clarify 만 처리하는 동안은 openai 미로드)"""
+    global client
+    if client is None:
+        with _client_lock:
+            if client is None:
+                client = get_client()
+    return client
+
+
+def get_s3_key(path_prefix: str = S3_PATH_PREFIX):
     image_name = uuid.uuid4().hex
     extension = "png"
     filename = f"{image_name}.{extension}"
-    prefix = S3_PATH_PREFIX.strip('/')
+    prefix = path_prefix.strip('/')
     s3_key = f"{prefix}/{filename}"
     return s3_key, filename, image_name, extension
 
 
-def upload_to_s3(image_bytes):
-    s3_key, filename, image_name, extension = get_s3_key()
-    s3_client.put_object(
+def upload_to_s3(image_bytes, path_prefix: str = S3_PATH_PREFIX):
+    s3_key, filename, image_name, extension = get_s3_key(path_prefix)
+    # key 를 재시도 전에 정하므로 put_object 재시도는 멱등
+    s3_call(lambda: get_s3_client().put_object(
         Bucket=S3_BUCKET,
         Key=s3_key,
         Body=image_bytes,
         ContentType="image/png"
-    )
+    ), label=f"s3 put {s3_key}")
     return s3_key, filename, image_name, extension
 
 
-def open_binary(image_path: str):
-    print(image_path)
-    key = image_path.lstrip("/")
-    resp = s3_client.get_object(Bucket=S3_BUCKET, Key=key)  # <-- Key=key 로!
-    data = resp["Body"].read()
-    fname = os.path.basename(key)
-    ctype = resp.get("ContentType", "image/png")  # S3에 저장한 ContentType 재사용
-    return fname, BytesIO(data), ctype
-
-
-def generate_image_from_text(prompt: str, size: str = "1024x1024") -> Image.Image:
+def generate_image_from_text(prompt: str, size: str = "1024x1024", on_partial=None) -> Image.Image:
     """
     OpenAI Images API(gpt-image-1)로 텍스트 프롬프트를 보내고
     base64로 받은 이미지를 PIL.Image로 반환
+    on_partial(index, png bytes) 가 주어지면 스트리밍으로 요청하고 미리보기마다 호출
+    IMAGE_SIZING_ENABLED 면 size 를 만족하는 가장 싼 API size 로 요청하고 결과를 size 로 resize
     """
-    resp = client.images.generate(
-        model=IMAGES_MODEL,
-        prompt=prompt,
-        size="auto",
-    )
-    b64 = resp.data[0].b64_json
-    img = Image.open(BytesIO(b64decode(b64)))
-    return img
+    target = parse_size(size) if IMAGE_SIZING_ENABLED else None
+    api_size = size_str(choose_api_size(target, IMAGE_SIZING_MAX_CROP)) if target else "auto"
+    # 이미지 생성은 비멱등(중복 생성/과금) → 요청이 처리되지 않은 것이 확실한 실패만 재시도
+    if on_partial is not None:
+        from image_stream import stream_image_generation
+
+        data = openai_call(lambda: stream_image_generation(prompt, api_key=API_KEY, on_partial=on_partial,
+                                                           size=api_size),
+                           idempotent=False, label="images.generate(stream)")
+    else:
+        resp = openai_call(lambda: openai_client().images.generate(
+            model=IMAGES_MODEL,
+            prompt=prompt,
+            size=api_size,
+        ), idempotent=False, label="images.generate")
+        data = b64decode(resp.data[0].b64_json)
+    img = Image.open(BytesIO(data))
+    return fit_to_size(img, target) if target else img
 
 
 def edit_image_from_text(
@@ -129,70 +280,79 @@ def edit_image_from_text(
     reference_image_paths: Optional[List[str]] = None,
     style_image_path: Optional[str] = None,
     api_key: Optional[str] = None,
+    open_images=open_binaries,
+    on_partial=None,
 ) -> Image.Image:
     """
     OpenAI Images API (gpt-image-1) 편집 호출.
     - image_path: 편집의 '베이스' 이미지 (필수)
-    - mask_path: 투명 PNG 마스크 (선택)
+    - mask_path: 투명 PNG 마스크 (선택, base 에 적용)
     - reference_image_paths: 참고 이미지 경로/URL 리스트 (선택)
     - style_image_path: 스타일 가이드 이미지 경로/URL (선택)
-    - size: '256x256' | '512x512' | '1024x1024'
-    ※ 참고/스타일 이미지는 OpenAI 편집 엔드포인트에서 네이티브 가이드로 쓰이지 않을 수 있음.
-      이를 보완하기 위해 prompt에 명시적으로 힌트를 주입하며, 파일 파트는 ref_image_#/style_image로 함께 전송.
+    - size: 결과 크기 'WxH' 또는 'auto' (IMAGE_SIZING_ENABLED 면 base 비율, 긴 변 IMAGE_OUTPUT_MAX_SIDE 이하)
+    - open_images: 입력 이미지 일괄 로더 (기본 open_binaries 병렬 다운로드, prefetch 된 요청은 ImagePrefetcher.open_many)
+    - on_partial: 주어지면 스트리밍으로 요청하고 미리보기(partial image)마다 on_partial(index, png bytes) 호출
+    base → 참고 이미지들 → 스타일 이미지 순서로 image[] 파트에 모두 첨부하고,
+    각 이미지의 역할은 prompt 에 순서로 명시한다.
     """
     api_key = api_key or os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise RuntimeError("OPENAI_API_KEY가 설정되지 않았습니다.")
 
-    url = "https://api.openai.com/v1/images/edits"
-    headers = {"Authorization": f"Bearer {api_key}"}
-
-    files = {}
-
-    # 필수: base image
-    base_name, base_fh, base_ct = open_binary(image_path)
-    files["image"] = (base_name, base_fh, base_ct)
-
-    # 선택: mask
-    if mask_path:
-        mask_name, mask_fh, mask_ct = open_binary(mask_path)
-        files["mask"] = (mask_name, mask_fh, mask_ct)
-
-    # 선택: reference images (여러 장)
-    ref_list = reference_image_paths or []
-
-    # 참고/스타일 안내를 프롬프트에 주입
-    ref_hint = ""
+    ref_list = [r for r in (reference_image_paths or []) if r]
+    image_paths = [image_path] + ref_list + ([style_image_path] if style_image_path else [])
+
+    # base / 참고 / 스타일 / mask 를 모두 동시에 다운로드
+    opened = open_images(image_paths + ([mask_path] if mask_path else []))
+    images, mask = opened[:len(image_paths)], (opened[-1] if mask_path else None)
+
+    # 결과 크기를 만족하는 가장 싼 API size 선택 → 입력은 그 크기를 덮는 해상도까지만 축소해 전송
+    target, api_size = None, size
+    if IMAGE_SIZING_ENABLED:
+        target = parse_size(size) or edit_target(image_size(images[0][1]), IMAGE_OUTPUT_MAX_SIDE)
+        bound = choose_api_size(target, IMAGE_SIZING_MAX_CROP)
+        api_size = size_str(bound)
+        images = [shrink_part(part, bound) for part in images]
+        if mask is not None:
+            mask = shrink_part(mask, bound)  # base 와 같은 크기였으므로 같은 크기로 축소됨
+
+    # 참고/스타일 이미지의 역할을 프롬프트에 주입 (첨부 순서 기준)
+    hints = []
     if ref_list:
-        ref_hint += f" 참고이미지 {len([r for r in ref_list if r])}장을 반영해 편집하라."
-
-    effective_prompt = (prompt or "").strip()
-    if ref_hint:
-        effective_prompt = (effective_prompt + " " + ref_hint).strip()
-
-    data = {
-        "model": "gpt-image-1",
-        "prompt": effective_prompt,
-        "size": size,
-    }
-
-    resp = requests.post(url, headers=headers, files=files, data=data, timeout=120)
-    if not resp.ok:
-        print("[OpenAI error payload]", resp.status_code, resp.text)
-    resp.raise_for_status()
+        hints.append(f"첫 번째 이미지가 편집 대상이며, 이어지는 참고이미지 {len(ref_list)}장을 반영해 편집하라.")
+    if style_image_path:
+        hints.append("마지막 이미지의 화풍과 색감을 따르라.")
+    effective_prompt = " ".join([(prompt or "").strip()] + hints).strip()
 
-    # 파일 정리
-    base_fh.close()
-    if mask_path:
-        mask_fh.close()
+    from image_edits import request_image_edit
 
-    b64 = resp.json()["data"][0]["b64_json"]
-    return Image.open(BytesIO(base64.b64decode(b64)))
-
-
-def do_style_transfer(style_image_path, content_image):
-    style_name, style_image, style_type = open_binary(style_image_path)
-    result_image = wait_for_result(content_image, style_image, prompt=None, preprocessor=None)
+    try:
+        result = openai_call(
+            lambda: request_image_edit(images, effective_prompt, api_key=api_key, size=api_size, mask=mask,
+                                       on_partial=on_partial),
+            idempotent=False, label="images.edit")
+    finally:
+        for _, fh, _ in opened:
+            fh.close()
+    img = Image.open(BytesIO(result))
+    return fit_to_size(img, target) if target else img
+
+
+def do_style_transfer(style_image_path, content_image, preserve_color: bool = False, open_images=open_binaries,
+                      style_image=None):
+    """
+    preserve_color=True면 결과에 원본(content) 이미지의 색감을 유지 (coral 후처리)
+    style_image: content 와 함께 미리 받은 스타일 이미지 (없으면 style_image_path 다운로드)
+    """
+    if style_image is None:
+        style_name, style_image, style_type = open_images([style_image_path])[0]
+    if STYLE_TRANSFER_BACKEND == "remote":
+        # style transfer worker 서비스에 request/reply (모델은 서비스에 상주, 호출자 간 batch 처리)
+        result_image = style_transfer_client().transfer(content_image, style_image, preserve_color=preserve_color)
+    else:
+        from styletransfer.tasks import wait_for_result  # torch 는 local 모드에서만 필요
+        result_image = wait_for_result(content_image, style_image, prompt=None, preprocessor=None,
+                                       preserve_color=preserve_color)
     if result_image is None:
         return None
 
@@ -211,6 +371,9 @@ def execute_image_task(
     edit_instructions: Optional[str],
     style_transfer: bool,
     style_image_path: Optional[str] = None,
+    preserve_color: bool = False,
+    open_images=open_binaries,
+    on_partial=None,
 ) -> (bool, str, object):
     def _pil_to_bytesio(img: Image.Image) -> BytesIO:
         buf = BytesIO()
@@ -224,9 +387,9 @@ def execute_image_task(
         return im.convert("RGB") if im.mode != "RGB" else im
 
     # 출력 경로 준비
+    # worker 스레드들이 동시에 저장하므로 순번이 아닌 고유 이름 사용
     os.makedirs("outputs", exist_ok=True)
-    existing = [f for f in os.listdir("outputs") if f.startswith("img_") and f.endswith(".png")]
-    out_path = os.path.join("outputs", f"img_{len(existing)+1:03d}.png")
+    out_path = os.path.join("outputs", f"img_{uuid.uuid4().hex}.png")
 
     print("Subtype: ", subtype)
     # 생성
@@ -237,14 +400,14 @@ def execute_image_task(
             return False, f"[에러] generate 프롬프트가 비어 있습니다.", None
         print(f"[생성] prompt={gen_text!r}")
         try:
-            img = generate_image_from_text(gen_text, size="1024x1024")
+            img = generate_image_from_text(gen_text, size=IMAGE_OUTPUT_SIZE, on_partial=on_partial)
             img.save(out_path)
             print(f"[완료] 생성 이미지 저장: {out_path}")
 
             # 스타일 변환
             if style_transfer and style_image_path:
                 content_fp = _pil_to_bytesio(img)
-                result_fp = do_style_transfer(style_image_path, content_fp)
+                result_fp = do_style_transfer(style_image_path, content_fp, preserve_color, open_images)
                 print(f"[정보] style_transfer=True, style_image_path={style_image_path}")
                 if result_fp is None:
                     return False, f"[이미지 생성 단계, 스타일 변환 에러]", None
@@ -273,6 +436,8 @@ def execute_image_task(
                 mask_path=None,
                 reference_image_paths=extra_refs,
                 style_image_path=None,
+                open_images=open_images,
+                on_partial=on_partial,
             )
 
             # 스타일 변환
@@ -280,7 +445,7 @@ def execute_image_task(
                 if not style_image_path:
                     return False, "[에러] 스타일 변환 요청이지만 style_image_path가 없습니다.", None
                 content_fp = _pil_to_bytesio(img)
-                result_fp = do_style_transfer(style_image_path, content_fp)
+                result_fp = do_style_transfer(style_image_path, content_fp, preserve_color, open_images)
                 print(f"[정보] style_transfer=True, style_image_path={style_image_path}")
                 if result_fp is None:
                     return False, f"[스타일 변환 에러]", None
@@ -289,9 +454,10 @@ def execute_image_task(
         elif subtype == "style_transfer":
             if not style_image_path:
                 return False, "[에러] 스타일 변환 요청이지만 style_image_path가 없습니다.", None
-            _, content_fh, _ = open_binary(base_path)
+            # content(base)와 스타일 이미지를 동시에 다운로드
+            (_, content_fh, _), (_, style_fh, _) = open_images([base_path, style_image_path])
             content_fh.seek(0)
-            result_fp = do_style_transfer(style_image_path, content_fh)
+            result_fp = do_style_transfer(style_image_path, content_fh, preserve_color, style_image=style_fh)
             if result_fp is None:
                 return False, "[스타일 변환 에러]", None
             img = _bytesio_to_pil(result_fp)
@@ -309,6 +475,65 @@ def execute_image_task(
     return True, "", img
 
 
+def route_with_llm(content: list, model: str = MODEL):
+    """router LLM 호출 → (route_scenario args, None) 또는 실패 시 (None, 에러 메시지)"""
+    # 텍스트+이미지 함께 전달
+    resp = openai_call(lambda: openai_client().chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": SYSTEM_INSTRUCTIONS},
+            {"role": "user", "content": content},  # 한 메시지에 text+image 동시 포함
+        ],
+        tools=TOOLS,
+        tool_choice={"type": "function", "function": {"name": "route_scenario"}}
+    ), idempotent=True, label="router")
+    # 툴 아웃풋 파싱
+    choice = resp.choices[0]
+    msg = choice.message
+    tool_calls = msg.tool_calls or []
+    if not tool_calls:
+        print("[경고] 툴 호출이 감지되지 않음.")
+        if msg.content:
+            print(f"[모델텍스트]: {msg.content}")
+        return None, f"[모델텍스트]: {msg.content}"
+
+    call = tool_calls[0]
+    raw = call.function.arguments
+    try:
+        args = json.loads(raw) if isinstance(raw, str) else raw
+    except Exception:
+        print(f"[에러] arguments JSON 파싱 실패: {raw}")
+        return None, f"[에러] arguments JSON 파싱 실패: {raw}"
+    return args, None
+
+
+def route_request(content: list, prompt: str, uploads: list, chat_images: list, chat_summary: str,
+                  model: str = MODEL):
+    """
+    router 결정: 로컬 규칙 → 결정 캐시 → LLM 순서로 시도.
+    (args, None) 또는 LLM 실패 시 (None, 에러 메시지)
+    """
+    # 기계적으로 결정되는 요청(R1 등)은 LLM 호출 없이 로컬 규칙으로 결정
+    args = route_locally(prompt, uploads, chat_summary) if ROUTER_LOCAL_RULES else None
+    if args is not None:
+        print(f"[라우터] 로컬 규칙으로 결정: {args.get('signals')}")
+        return args, None
+
+    if route_cache is None:
+        return route_with_llm(content, model)
+
+    cache_key = route_cache_key(model, prompt, uploads, chat_images, chat_summary, ROUTER_VERSION)
+    args = route_cache.get(cache_key)
+    if args is not None:
+        print(f"[캐시] router 결정 재사용: {cache_key[:12]}")
+        return args, None
+
+    args, error = route_with_llm(content, model)
+    if args is not None:
+        route_cache.put(cache_key, args)
+    return args, error
+
+
 def classify_and_execute(
     prompt: str,
     images_path: list,
@@ -317,6 +542,10 @@ def classify_and_execute(
     recent_chat: list,
     chat_summary: str,
     model: str = MODEL,
+    preserve_color: bool = False,
+    request_id: Optional[str] = None,
+    execute: bool = True,
+    previews: Optional[PreviewPublisher] = None,
 ):
     """
     텍스트와 이미지를 '같은 메시지'의 content 배열로 섞어 전달.
@@ -324,29 +553,17 @@ def classify_and_execute(
     - uploads(images_path)는 별도 섹션으로 이어서 넣음.
     - 각 이미지는 라벨(chat#i / upload#j)을 텍스트로 먼저 명시하고, 바로 다음에 image_url 로 실제 이미지를 첨부.
     - TOOL은 indices(=chat 이미지 인덱스만), reference_urls(file://, chat/업로드 모두)에 맞춰 응답.
+    - request_id가 주어지면 router 결정/결과 이미지를 단계별로 저장하고, 재전달 시 마지막 완료 단계부터 재개.
+    - execute=False(router 단계)면 이미지 작업을 실행하지 않고 ("execute", {"payload", "result"}) 반환.
+    - previews 가 주어지면 생성/편집 중 미리보기를 publish (run_image_job 참고).
     """
 
     def _safe(s):
         return (s or "").replace("\n", " ").strip()
 
-    def _bool(v):
-        if v is True or v is False:
-            return v
-        if isinstance(v, str):
-            t = v.strip().lower()
-            if t in ("true", "1", "yes", "y"): return True
-            if t in ("false", "0", "no", "n"): return False
-        raise ValueError(f"bool 값이 잘못됨 {v}")
-
     def _is_http(u: str) -> bool:
         return isinstance(u, str) and u.startswith("https://")
 
-    def _json_text_block(obj: dict):
-        return {
-            "type": "text",
-            "text": json.dumps(obj, ensure_ascii=False)
-        }
-
     def _resolve_item(item, chat_image_map, uploads):
         """item: {source: 'chat'|'upload', index?:int, path?:str} -> 실제 경로(str)"""
         if not item or "source" not in item:
@@ -365,167 +582,89 @@ def classify_and_execute(
             return pth  # (fallback)
         return None
 
-    # 1) 간단한 설명과 사용자 프롬프트 (비어있으면 빈 문자열로)
-    content = [{
-        "type": "text",
-        "text": (
-            "아래는 하나의 JSON 기반 대화 컨텍스트입니다.\n"
-            "- prompt: 이번 요청의 사용자 텍스트\n"
-            "- chat_images: 과거 대화 중 이미지 목록 (chat#i)\n"
-            "- uploads: 이번 요청에 포함된 업로드 이미지 목록 (S3 Key 또는 URL)\n"
-            "- chat_summary: 이전 대화의 요약 (선택)\n"
-            "⚠ 모든 항목은 JSON 객체로 제공되며, 사람 읽기용 텍스트는 포함되지 않습니다.\n"
-            "툴은 prompt / chat_images / uploads를 기반으로 base 및 references를 결정해야 합니다."
-        )
-    }, _json_text_block({
-        "type": "prompt",
-        "value": _safe(prompt)
-    })]
-
-    # 2) recent_chat에서 이미지만 구조화 (i 인덱스는 chat#i와 동일하게 부여)
-    chat_image_map: Dict[int, str] = {}
-    chat_images = []
-    img_counter = 0
-
-    for turn in list(recent_chat or []):
-        role = turn.get("role", "user")
-        for c in turn.get("contents", []):
-            ctype = (c.get("type") or "").lower()
-            if ctype == "image":
-                img_path = _safe(c.get("imagePath", ""))
-                desc = _safe(c.get("description", ""))
-                from_origin_image = _bool(c.get("fromOriginImage"))
-                if not img_path:
-                    continue
-                chat_images.append({
-                    "i": img_counter,  # ← indices[0]로 고를 때 사용할 정수 인덱스
-                    "path": img_path,  # ← S3 키 or https URL (그대로 사용)
-                    "role": role,  # user/assistant
-                    "description": desc,  # 선택 설명
-                    "fromOriginImage": from_origin_image  # bool
-                })
-                chat_image_map[img_counter] = img_path
-                img_counter += 1
-
-    # chat 이미지 목록을 JSON 블록으로 전달
-    content.append(_json_text_block({
-        "type": "chat_images",
-        "value": chat_images  # []일 수 있음
-    }))
-
-    # 3) 업로드 목록을 JSON 블록으로 전달 (사람용 라벨 제거)
+    # 1) router 입력: 토큰 예산 안에서 chat 이미지를 고르고, 고정 안내문이 앞에 오도록 구성
     uploads = [_safe(p) for p in (images_path or [])]
-    content.append(_json_text_block({
-        "type": "uploads",
-        "value": uploads  # 예: ["ai-request/...."] 또는 []
-    }))
-
-    # (선택) chat_summary도 기계가 읽기 쉽게 JSON으로만 전달
-    if chat_summary:
-        content.append(_json_text_block({
-            "type": "chat_summary",
-            "value": _safe(chat_summary)
-        }))
+    content, chat_images, chat_image_map, tokens = build_router_content(prompt, uploads, recent_chat, chat_summary)
 
     # 디버그 로그도 JSON만 찍기
     print({
         "prompt": _safe(prompt),
         "chat_images_count": len(chat_images),
-        "uploads": uploads
+        "uploads": uploads,
+        "router_tokens": tokens
     })
 
-    # ── 5) route_scenario 호출: 텍스트+이미지 함께 전달
-    resp = client.chat.completions.create(
-        model=model,
-        messages=[
-            {"role": "system", "content": SYSTEM_INSTRUCTIONS},
-            {"role": "user", "content": content},  # 한 메시지에 text+image 동시 포함
-        ],
-        tools=TOOLS,
-        tool_choice={"type": "function", "function": {"name": "route_scenario"}}
-    )
-    # ── 6) 툴 아웃풋 파싱
-    choice = resp.choices[0]
-    msg = choice.message
-    tool_calls = msg.tool_calls or []
-    if not tool_calls:
-        print("[경고] 툴 호출이 감지되지 않음.")
-        if msg.content:
-            print(f"[모델텍스트]: {msg.content}")
-        return "error", f"[모델텍스트]: {msg.content}"
+    # ── 5) route_scenario: 재전달된 요청이면 저장된 router 결정을 재사용
+    checkpoint = idempotency_store.load_stages(request_id) if request_id else {}
 
-    call = tool_calls[0]
-    raw = call.function.arguments
-    try:
-        args = json.loads(raw) if isinstance(raw, str) else raw
-    except Exception:
-        print(f"[에러] arguments JSON 파싱 실패: {raw}")
-        return "error", f"[에러] arguments JSON 파싱 실패: {raw}"
-
-    new_chat_summary = args.get("chat_summary", chat_summary)
-
-    # ── 7) 결과 해석 (이미지 작업만 수행)
-    needs = bool(args.get("needs_clarification", False))
-    reason = args.get("reason", "")
-    if needs:
-        print(f"추가적인 설명 필요, 이유: {reason}")
-        message = {"response": f"{reason}", "chat_summary": new_chat_summary, "reason": reason}
-        return "clarify", message
-
-    subtype = args.get("subtype")  # "generate" | "edit" | "style_transfer"
-
-    # NEW: base/references 구조 해석 유틸
-    uploads = [_safe(p) for p in (images_path or [])]  # 이미 위에서 만든 값과 동일 개념
-
-    # NEW: base / references 해석
-    base_obj = args.get("base")
-    base_path = _resolve_item(base_obj, chat_image_map, uploads)
-
-    ref_objs = args.get("references", []) or []
-    extra_refs = []
-    for r in ref_objs:
-        rp = _resolve_item(r, chat_image_map, uploads)
-        if rp:
-            extra_refs.append(rp)
-
-    generation_prompt = args.get("generate_instructions") or prompt
-    edit_instructions = args.get("edit_instructions")
-    style_transfer = bool(args.get("style_transfer", False))
-    image_description = args.get("image_description", "")
-
-    # 필수 검증: 편집/스타일 변환이면 base 필수
-    if subtype in ("edit", "style_transfer") and not base_path:
-        print("[경고] 편집/스타일 변환인데 base 미지정 → clarify로 전환")
-        message = {"response": "편집/스타일 변환인데 base 이미지를 특정하지 못했습니다.",
-                   "chat_summary": new_chat_summary,
-                   "reason": "base가 비었습니다. 최근 업로드 또는 최신 USER 이미지를 base로 사용할지 선택해 주세요."}
-        return "clarify", message
-
-    print(f"[분류] action=image task(고정), subtype={subtype}, needs={needs}, style_transfer={style_transfer}")
-    print(f"[대상 base] {base_path}")
-    if extra_refs:
-        print(f"[참조 refs] {extra_refs}")
-
-    # ── 8) 이미지 작업 실행
-    payload = {
-        "prompt": prompt,
-        "subtype": (subtype or "generate"),
-        "base_path": base_path,  # NEW
-        "extra_refs": extra_refs,  # NEW
-        "generate_instructions": (generation_prompt if subtype == "generate" else None),
-        "edit_instructions": (edit_instructions if (subtype != "generate") else None),
-        "style_transfer": style_transfer,
-        "style_image_path": style_image_path,
-    }
+    # 결과 이미지가 아직 없으면 router 호출 동안 필요할 가능성이 높은 이미지를 미리 다운로드
+    prefetcher = None
+    if execute and prefetch_executor is not None and checkpoint.get("image") is None:
+        prefetcher = ImagePrefetcher(fetch_s3_object, prefetch_executor)
+        prefetcher.start(likely_image_paths(uploads, chat_images, style_image_path, S3_PREFETCH_MAX_IMAGES))
 
-    success, message, img = execute_image_task(**payload)
-    if not success:
-        return "error", message
+    def _drop_prefetch():
+        # router 결정과 다른 이미지였으면 버림 (진행 중인 다운로드는 취소)
+        if prefetcher is not None:
+            unused = prefetcher.discard()
+            if unused:
+                print(f"[정보] 사용하지 않은 prefetch {unused}건 폐기")
+
+    # route_request / run_image_job 이 예외를 내도 남은 prefetch 는 취소
     try:
-        buf = BytesIO()
-        img.save(buf, format="PNG")
-        buf.seek(0)
-        s3_key, file_name, image_name, _ = upload_to_s3(buf.getvalue())
+        args = checkpoint.get("route")
+        if args is not None:
+            print(f"[재개] {request_id}: 저장된 router 결정 재사용")
+        else:
+            args, error = route_request(content, _safe(prompt), uploads, chat_images, chat_summary, model)
+            if args is None:
+                return "error", error
+            if request_id:
+                idempotency_store.save_stage(request_id, "route", args)
+
+        new_chat_summary = args.get("chat_summary", chat_summary)
+
+        # ── 7) 결과 해석 (이미지 작업만 수행)
+        needs = bool(args.get("needs_clarification", False))
+        reason = args.get("reason", "")
+        if needs:
+            print(f"추가적인 설명 필요, 이유: {reason}")
+            message = {"response": f"{reason}", "chat_summary": new_chat_summary, "reason": reason}
+            return "clarify", message
+
+        subtype = args.get("subtype")  # "generate" | "edit" | "style_transfer"
+
+        # NEW: base/references 구조 해석 유틸
+        uploads = [_safe(p) for p in (images_path or [])]  # 이미 위에서 만든 값과 동일 개념
+
+        # NEW: base / references 해석
+        base_obj = args.get("base")
+        base_path = _resolve_item(base_obj, chat_image_map, uploads)
+
+        ref_objs = args.get("references", []) or []
+        extra_refs = []
+        for r in ref_objs:
+            rp = _resolve_item(r, chat_image_map, uploads)
+            if rp:
+                extra_refs.append(rp)
+
+        generation_prompt = args.get("generate_instructions") or prompt
+        edit_instructions = args.get("edit_instructions")
+        style_transfer = bool(args.get("style_transfer", False))
+        image_description = args.get("image_description", "")
+
+        # 필수 검증: 편집/스타일 변환이면 base 필수
+        if subtype in ("edit", "style_transfer") and not base_path:
+            print("[경고] 편집/스타일 변환인데 base 미지정 → clarify로 전환")
+            message = {"response": "편집/스타일 변환인데 base 이미지를 특정하지 못했습니다.",
+                       "chat_summary": new_chat_summary,
+                       "reason": "base가 비었습니다. 최근 업로드 또는 최신 USER 이미지를 base로 사용할지 선택해 주세요."}
+            return "clarify", message
+
+        print(f"[분류] action=image task(고정), subtype={subtype}, needs={needs}, style_transfer={style_transfer}")
+        print(f"[대상 base] {base_path}")
+        if extra_refs:
+            print(f"[참조 refs] {extra_refs}")
 
         from_origin_image = False
         if isinstance(base_obj, dict) and base_obj.get("fromOriginImage") is True:
@@ -536,21 +675,177 @@ def classify_and_execute(
                 from_origin_image = True
                 break
 
-        message = {
-            "image_path": s3_key,
-            "file_name": file_name,
-            "image_name": image_name,
+        # ── 8) 이미지 작업 실행
+        payload = {
+            "prompt": prompt,
+            "subtype": (subtype or "generate"),
+            "base_path": base_path,  # NEW
+            "extra_refs": extra_refs,  # NEW
+            "generate_instructions": (generation_prompt if subtype == "generate" else None),
+            "edit_instructions": (edit_instructions if (subtype != "generate") else None),
+            "style_transfer": style_transfer,
+            "style_image_path": style_image_path,
+            "preserve_color": preserve_color,
+        }
+        result = {
             "description": image_description,
             "style_transfer": style_transfer,
             "chat_summary": new_chat_summary,
             "from_origin_image": from_origin_image or style_transfer,
         }
-        return "ok", message
-    except Exception as e:
-        print(e)
-        return "error", e
+        if not execute:
+            # router 단계: 실행은 executor 단계에 맡김
+            return "execute", {"payload": payload, "result": result}
+
+        status, message = run_image_job(
+            payload, result, request_id=request_id, checkpoint=checkpoint,
+            open_images=prefetcher.open_many if prefetcher is not None else open_binaries,
+            previews=previews,
+        )
+        return status, message
+    finally:
+        _drop_prefetch()
+
+
+def run_image_job(payload: dict, result: dict, request_id: Optional[str] = None, checkpoint: Optional[dict] = None,
+                  open_images=open_binaries, previews: Optional[PreviewPublisher] = None):
+    """
+    router 결정이 끝난 이미지 작업 실행 → 결과 업로드 → ("ok", 응답용 message) 또는 ("error", 에러)
+    checkpoint(저장된 단계 결과)에 결과 이미지가 있으면 재실행하지 않는다.
+    previews 가 주어지면 생성/편집 중 미리보기를 넘기고, 반환 전에 닫아 최종 응답보다 늦은 미리보기가 없도록 한다.
+    """
+    if checkpoint is None:
+        checkpoint = idempotency_store.load_stages(request_id) if request_id else {}
+
+    # 재전달된 요청이면 이미 업로드된 결과 이미지를 재사용 (생성/편집 재실행 없음)
+    image = checkpoint.get("image")
+    if image is not None:
+        print(f"[재개] {request_id}: 저장된 결과 이미지 재사용 {image['image_path']}")
+    else:
+        try:
+            success, message, img = execute_image_task(**payload, open_images=open_images, on_partial=previews)
+        finally:
+            if previews is not None:
+                print(f"[정보] {request_id}: 미리보기 {previews.close()}건 publish")
+        if not success:
+            return "error", message
+        try:
+            buf = BytesIO()
+            img.save(buf, format="PNG")
+            buf.seek(0)
+            s3_key, file_name, image_name, _ = upload_to_s3(buf.getvalue())
+        except Exception as e:
+            print(e)
+            return "error", e
+        image = {"image_path": s3_key, "file_name": file_name, "image_name": image_name}
+        if request_id:
+            idempotency_store.save_stage(request_id, "image", image)
+
+    message = {
+        "image_path": image["image_path"],
+        "file_name": image["file_name"],
+        "image_name": image["image_name"],
+        "description": result["description"],
+        "style_transfer": result["style_transfer"],
+        "chat_summary": result["chat_summary"],
+        "from_origin_image": result["from_origin_image"],
+    }
+    return "ok", message
+
+def publish_response(channel, method, request_id: str, resp: dict):
+    """응답을 단계 결과로 저장 후 publish → 성공 시 done + ACK, 실패 시 failed + NACK(DLX, 재전달 시 publish만 재시도)"""
+    idempotency_store.save_stage(request_id, "response", resp)
+    if getattr(channel, "publisher", None) is not None:
+        # confirm 을 기다리지 않고 다음 작업으로 (confirm 이 오면 done + ACK)
+        channel.publish_and_ack(IMAGE_GENERATION_CHAT_RESPONSE_QUEUE, json.dumps(resp), method.delivery_tag,
+                                on_confirmed=lambda: mark_done(request_id),
+                                on_failed=lambda: mark_failed(request_id))
+        return
+    if safe_publish(channel, IMAGE_GENERATION_CHAT_RESPONSE_QUEUE, json.dumps(resp)):
+        mark_done(request_id)
+        channel.basic_ack(delivery_tag=method.delivery_tag)
+    else:
+        print("[에러] publish 실패 → DLX로 이동")
+        mark_failed(request_id)
+        channel.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+
+
+def build_response(request_id: str, success: str, message: dict) -> dict:
+    """classify_and_execute / run_image_job 결과("ok" | "clarify") → 응답 메시지"""
+    if success == "ok":
+        return {
+            "isSuccess": True,
+            "requestId": request_id,
+            "isImageGenerated": True,
+            "imagePath": message["image_path"],
+            "fullImageName": message["file_name"],
+            "imageName": message["image_name"],
+            "extension": "PNG",
+            "description": message["description"],
+            "chatSummary": message["chat_summary"],
+            "fromStyleImage": message["from_origin_image"]
+        }
+    return {
+        "isSuccess": True,
+        "requestId": request_id,
+        "isImageGenerated": False,
+        "textContext": message["reason"],
+        "chatSummary": message["chat_summary"]
+    }
+
+
+def build_preview_response(request_id: str, index: int, s3_key: str, file_name: str, image_name: str) -> dict:
+    """생성/편집 중 미리보기 진행 메시지 (isPreview=True, 최종 결과는 isImageGenerated=True 로 따로 옴)"""
+    return {
+        "isSuccess": True,
+        "requestId": request_id,
+        "isImageGenerated": False,
+        "isPreview": True,
+        "previewIndex": index,
+        "imagePath": s3_key,
+        "fullImageName": file_name,
+        "imageName": image_name,
+        "extension": "PNG",
+    }
+
+
+def preview_publisher(channel, request_id: str) -> Optional[PreviewPublisher]:
+    """IMAGE_PREVIEW_ENABLED 면 미리보기마다 S3 업로드 후 진행 메시지를 응답 큐로 publish 하는 PreviewPublisher"""
+    if preview_executor is None:
+        return None
+
+    def handle(index: int, data: bytes):
+        s3_key, file_name, image_name, _ = upload_to_s3(data, S3_PREVIEW_PATH_PREFIX)
+        resp = build_preview_response(request_id, index, s3_key, file_name, image_name)
+        if hasattr(channel, "publish_nowait"):
+            channel.publish_nowait(IMAGE_GENERATION_CHAT_RESPONSE_QUEUE, json.dumps(resp))
+        elif not safe_publish(channel, IMAGE_GENERATION_CHAT_RESPONSE_QUEUE, json.dumps(resp), max_retries=1):
+            raise AMQPError("미리보기 publish 실패")
+
+    return PreviewPublisher(handle, preview_executor)
+
+
+def dispatch_job(channel, method, request_id: str, job: dict):
+    """router 단계: 이미지 작업을 subtype 별 executor 큐로 넘긴 뒤 원본 요청 ACK (실패 시 failed + NACK)"""
+    queue = execute_queue(job["payload"]["subtype"])
+    body = encode_job(request_id, job["payload"], job["result"])
+    if getattr(channel, "publisher", None) is not None:
+        print(f"[분배] {request_id} → {queue}")
+        channel.publish_and_ack(queue, body, method.delivery_tag, on_failed=lambda: mark_failed(request_id))
+        return
+    if safe_publish(channel, queue, body):
+        # in_progress 유지 → 완료(done)는 executor 가 응답 publish 후 기록
+        print(f"[분배] {request_id} → {queue}")
+        channel.basic_ack(delivery_tag=method.delivery_tag)
+    else:
+        print("[에러] job publish 실패 → DLX로 이동")
+        mark_failed(request_id)
+        channel.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+
 
 def on_message(channel, method, properties, body):
+    request_id = None
+    taken = False  # 이 worker가 in_progress를 가져갔는지 (실패 시 failed로 돌려놓기 위함)
     try:
         raw_body = body.decode("utf-8")
         print("[📥] 작업 수신:", raw_body)
@@ -567,6 +862,15 @@ def on_message(channel, method, properties, body):
             print(f"[멱등] 이미 처리된 요청 {request_id} → ACK 후 스킵")
             channel.basic_ack(delivery_tag=method.delivery_tag)
             return
+        taken = True
+
+        # 응답까지 만들어졌지만 publish 전에 실패했던 요청 → 다시 publish만 수행
+        saved_resp = idempotency_store.load_stages(request_id).get("response")
+        if saved_resp is not None:
+            print(f"[재개] {request_id}: 저장된 응답 재전송")
+            taken = False
+            publish_response(channel, method, request_id, saved_resp)
+            return
 
         prompt = task.get("prompt", "")
         images_path = task.get("imagesPath", [])
@@ -574,60 +878,135 @@ def on_message(channel, method, properties, body):
         style_image_path = task.get("styleImagePath", "")
         recent_chat = task.get("chat", [])
         chat_summary = task.get("chatSummary", "")
+        preserve_color = bool(task.get("preserveColor", False))
 
         success, message = classify_and_execute(
-            prompt, images_path, style_image_id, style_image_path, recent_chat, chat_summary
+            prompt, images_path, style_image_id, style_image_path, recent_chat, chat_summary,
+            preserve_color=preserve_color, request_id=request_id,
+            execute=(IMAGE_GENERATION_STAGE != "router"),
+            previews=preview_publisher(channel, request_id) if IMAGE_GENERATION_STAGE != "router" else None,
         )
 
         # [PATCH] 상태별 응답 처리
-        if success == "ok":
-            resp = {
-                "isSuccess": True,
-                "requestId": request_id,
-                "isImageGenerated": True,
-                "imagePath": message["image_path"],
-                "fullImageName": message["file_name"],
-                "imageName": message["image_name"],
-                "extension": "PNG",
-                "description": message["description"],
-                "chatSummary": message["chat_summary"],
-                "fromStyleImage": message["from_origin_image"]
-            }
-            if safe_publish(channel, IMAGE_GENERATION_CHAT_RESPONSE_QUEUE, json.dumps(resp)):
-                mark_done(request_id)
-                channel.basic_ack(delivery_tag=method.delivery_tag)
-            else:
-                print("[에러] publish 실패 → DLX로 이동")
-                channel.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
-
-        elif success == "clarify":
-            resp = {
-                "isSuccess": True,
-                "requestId": request_id,
-                "isImageGenerated": False,
-                "textContext": message["reason"],
-                "chatSummary": message["chat_summary"]
-            }
-            if safe_publish(channel, IMAGE_GENERATION_CHAT_RESPONSE_QUEUE, json.dumps(resp)):
-                mark_done(request_id)
-                channel.basic_ack(delivery_tag=method.delivery_tag)
-            else:
-                channel.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+        if success in ("ok", "clarify"):
+            taken = False
+            publish_response(channel, method, request_id, build_response(request_id, success, message))
+
+        elif success == "execute":
+            # execute_queue 가 알 수 없는 subtype 으로 예외를 내면 아래 except 에서 failed 로 돌려놓음
+            dispatch_job(channel, method, request_id, message)
+            taken = False
 
         else:
             print(f"[에러] 처리 실패: {success} / {message}")
+            mark_failed(request_id)
+            taken = False
             channel.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
 
     except Exception as e:
         print(f"[❌] on_message 예외: {e}")
+        if taken:
+            mark_failed(request_id)
         channel.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
 
 
+def on_job(channel, method, properties, body):
+    """executor 단계: router 단계가 넘긴 이미지 작업 실행 → 응답 publish"""
+    request_id = None
+    try:
+        job = decode_job(body)
+        request_id = job["requestId"]
+        print(f"[📥] 이미지 작업 수신: {request_id} ({job['payload']['subtype']})")
+
+        retries = rejected_count(getattr(properties, "headers", None))
+        if retries > IMAGE_GENERATION_EXECUTE_MAX_RETRIES:
+            print(f"[에러] {request_id}: 재시도 {retries - 1}회 후에도 실패 → ACK 후 폐기")
+            mark_failed(request_id)
+            channel.basic_ack(delivery_tag=method.delivery_tag)
+            return
+
+        # router 가 in_progress 로 남겨 둔 요청 → done 이면 중복 전달
+        if idempotency_store.get_status(request_id) == "done":
+            print(f"[멱등] 이미 처리된 요청 {request_id} → ACK 후 스킵")
+            channel.basic_ack(delivery_tag=method.delivery_tag)
+            return
+
+        checkpoint = idempotency_store.load_stages(request_id)
+        saved_resp = checkpoint.get("response")
+        if saved_resp is not None:
+            print(f"[재개] {request_id}: 저장된 응답 재전송")
+            publish_response(channel, method, request_id, saved_resp)
+            return
+
+        success, message = run_image_job(job["payload"], job["result"], request_id=request_id,
+                                         checkpoint=checkpoint, previews=preview_publisher(channel, request_id))
+        if success == "ok":
+            publish_response(channel, method, request_id, build_response(request_id, success, message))
+        else:
+            print(f"[에러] 처리 실패: {success} / {message}")
+            mark_failed(request_id)
+            channel.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+
+    except Exception as e:
+        print(f"[❌] on_job 예외: {e}")
+        if request_id:
+            mark_failed(request_id)
+        channel.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+
+
+def _declare_request_queue(channel):
+    channel.queue_declare(
+        queue=IMAGE_GENERATION_CHAT_QUEUE,
+        durable=True,
+        arguments={
+            "x-dead-letter-exchange": "ai.image.request.dlx",
+            "x-dead-letter-routing-key": "ai.image.request.retry"
+        }
+    )
+
+
+def _declare_execute_queue(channel, queue: str):
+    # 실패한 job 은 DLX 를 거쳐 <queue>.retry 로 → TTL 뒤 기본 exchange 로 원래 큐에 돌아옴
+    # (원본 요청은 router 가 이미 ACK 했으므로 여기서 재시도하지 않으면 job 이 사라짐)
+    retry = retry_queue(queue)
+    channel.queue_declare(
+        queue=queue,
+        durable=True,
+        arguments={
+            "x-dead-letter-exchange": "ai.image.request.dlx",
+            "x-dead-letter-routing-key": retry
+        }
+    )
+    channel.queue_declare(
+        queue=retry,
+        durable=True,
+        arguments={
+            "x-message-ttl": IMAGE_GENERATION_EXECUTE_RETRY_DELAY_MS,
+            "x-dead-letter-exchange": "",
+            "x-dead-letter-routing-key": queue
+        }
+    )
+    channel.queue_bind(queue=retry, exchange="ai.image.request.dlx", routing_key=retry)
+
+
 def main():
     import ssl
     import pika
     import time
 
+    if IMAGE_GENERATION_STAGE not in ("all", "router", "executor"):
+        raise RuntimeError(f"IMAGE_GENERATION_STAGE 값이 잘못됨: {IMAGE_GENERATION_STAGE}")
+    # router 단계는 job publish 대상 큐 전체를, executor 단계는 담당 subtype 큐만 사용
+    execute_queues = executor_queues(
+        list(SUBTYPES) if IMAGE_GENERATION_STAGE == "router" else IMAGE_GENERATION_EXECUTOR_SUBTYPES)
+
+    # on_message는 worker 스레드에서 실행 → connection 스레드는 heartbeat/ack만 처리
+    executor = ThreadPoolExecutor(max_workers=IMAGE_GENERATION_CHAT_CONCURRENCY,
+                                  thread_name_prefix="image-worker")
+    idempotency_store.start_eviction()
+    if route_cache:
+        route_cache.start_eviction()
+
     while True:
         connection = None
         channel = None
@@ -641,33 +1020,47 @@ def main():
                 ssl_options=pika.SSLOptions(context),
                 heartbeat=120,
                 blocked_connection_timeout=300,
-                client_properties={"connection_name": "image-consumer"},
+                client_properties={"connection_name": f"image-consumer-{IMAGE_GENERATION_STAGE}"},
             )
             connection = pika.BlockingConnection(params)
             channel = connection.channel()
-            channel.basic_qos(prefetch_count=1)
-            channel.confirm_delivery()
-
-            channel.queue_declare(
-                queue=IMAGE_GENERATION_CHAT_QUEUE,
-                durable=True,
-                arguments={
-                    "x-dead-letter-exchange": "ai.image.request.dlx",
-                    "x-dead-letter-routing-key": "ai.image.request.retry"
-                }
-            )
+            # executor 는 여러 큐를 소비하므로 channel 전체(global) 기준으로 worker 수만큼만 받음
+            channel.basic_qos(prefetch_count=IMAGE_GENERATION_CHAT_CONCURRENCY, global_qos=True)
 
-            channel.basic_consume(
-                queue=IMAGE_GENERATION_CHAT_QUEUE,
-                on_message_callback=on_message,
-                auto_ack=False
-            )
+            _declare_request_queue(channel)
+            if IMAGE_GENERATION_STAGE != "all":
+                for queue in execute_queues:
+                    _declare_execute_queue(channel, queue)
+
+            worker_channel = ThreadSafeChannel(connection, channel)
+            if IMAGE_GENERATION_ASYNC_CONFIRMS:
+                worker_channel.enable_async_confirms()
+            else:
+                channel.confirm_delivery()
+
+            def consume(queue, handler):
+                def dispatch(ch, method, properties, body):
+                    # prefetch == worker 수 이므로 executor 대기열은 늘어나지 않음
+                    worker_channel.delivered(method.delivery_tag)
+                    executor.submit(_run_in_worker, handler, worker_channel, method, properties, body)
+
+                channel.basic_consume(queue=queue, on_message_callback=dispatch, auto_ack=False)
+
+            if IMAGE_GENERATION_STAGE == "executor":
+                for queue in execute_queues:
+                    consume(queue, on_job)
+                consuming = ", ".join(execute_queues)
+            else:
+                consume(IMAGE_GENERATION_CHAT_QUEUE, on_message)
+                consuming = IMAGE_GENERATION_CHAT_QUEUE
 
-            print("[🚀] 이미지 생성 작업 대기 중...")
+            print(f"[🚀] 이미지 생성 작업 대기 중... (단계 {IMAGE_GENERATION_STAGE}, 큐 {consuming}, "
+                  f"동시 처리 {IMAGE_GENERATION_CHAT_CONCURRENCY})")
             channel.start_consuming()
 
         except KeyboardInterrupt:
             print("[🧩] 사용자 종료 요청")
+            executor.shutdown(wait=False)
             break
         except Exception as e:
             print(f"[경고] 소비자 루프 예외 발생: {e}")
@@ -685,5 +1078,5 @@ def main():
 
 
 if __name__ == "__main__":
-    client = get_client()
+    _require_api_key()
     main()
@@ -9,6 +9,7 @@ from typing import Any, Dict, List, Optional, Tuple
 
 from openai import OpenAI
 from static.classifier_preprompt import SYSTEM_INSTRUCTIONS, TOOLS
+from local_router import route_locally
 # -------------------------------
 # Utilities
 # -------------------------------
@@ -155,6 +156,14 @@ def classify_only(client: OpenAI, *, model: str, prompt: str, uploads: List[str]
     args["chat_summary"] = args.get("chat_summary", chat_summary)
     return "ok", {"args": args, "chat_images": chat_images}
 
+def classify_locally(*, prompt: str, uploads: List[str], recent_chat: List[Dict],
+                     chat_summary: str) -> Optional[Dict]:
+    """pre-router(local_router)가 결정하는 케이스면 classify_only와 같은 payload, 아니면 None"""
+    args = route_locally(_safe(prompt), list(map(_safe, uploads or [])), chat_summary)
+    if args is None:
+        return None
+    return {"args": args, "chat_images": _build_chat_images(recent_chat)}
+
 # -------------------------------
 # 검증
 # -------------------------------
@@ -278,7 +287,8 @@ def load_cases(paths: List[str], recursive: bool) -> List[Dict]:
 # Runner
 # -------------------------------
 def run_cases(args) -> int:
-    client = get_client()
+    # --local_only: pre-router만 검증하므로 API 키 불필요
+    client = None if args.local_only else get_client()
     cases = load_cases(args.cases, args.recursive)
 
     if args.shuffle:
@@ -295,6 +305,8 @@ def run_cases(args) -> int:
 
     passed = 0
     failed = 0
+    local_decided = 0
+    skipped = 0
     last_actual_dump = None
 
     started = time.time()
@@ -306,10 +318,22 @@ def run_cases(args) -> int:
         chat_summary = case.get("chatSummary", "") or ""
         expected = case.get("expected", {}) or {}
 
-        status, payload = classify_only(
-            client, model=args.model, prompt=prompt, uploads=uploads,
-            recent_chat=chat, chat_summary=chat_summary
-        )
+        payload = None
+        if args.local_router or args.local_only:
+            payload = classify_locally(prompt=prompt, uploads=uploads, recent_chat=chat, chat_summary=chat_summary)
+        is_local = payload is not None
+        if is_local:
+            status = "ok"
+            local_decided += 1
+        elif args.local_only:
+            skipped += 1
+            print(f"[{idx}/{total}] {name}: SKIP (LLM 라우팅 대상)")
+            continue
+        else:
+            status, payload = classify_only(
+                client, model=args.model, prompt=prompt, uploads=uploads,
+                recent_chat=chat, chat_summary=chat_summary
+            )
         if status != "ok":
             failed += 1
             print(f"[{idx}/{total}] {name}: ERROR - {payload.get('error')}")
@@ -322,7 +346,7 @@ def run_cases(args) -> int:
         ok, details, actual_norm = assert_case(actual_args, chat_images, uploads, expected)
         last_actual_dump = {"name": name, "file": case.get("_file", ""), "actual_args": actual_args, "normalized": actual_norm}
 
-        tag = "PASS" if ok else "FAIL"
+        tag = ("PASS" if ok else "FAIL") + (" (local)" if is_local else "")
         print(f"[{idx}/{total}] {name}: {tag}")
         if not ok:
             print(details)
@@ -336,6 +360,8 @@ def run_cases(args) -> int:
     dur = time.time() - started
     print(f"\n=== SUMMARY ===")
     print(f"Total: {total}  Passed: {passed}  Failed: {failed}  Time: {dur:.2f}s")
+    if args.local_router or args.local_only:
+        print(f"Local router decided: {local_decided}  Skipped(LLM): {skipped}")
 
     if args.dump_json and last_actual_dump:
         try:
@@ -363,6 +389,10 @@ def parse_args():
                    help="케이스 순서 무작위")
     p.add_argument("--seed", type=int, default=42,
                    help="--shuffle 시 랜덤 시드")
+    p.add_argument("--local_router", action="store_true",
+                   help="운영과 같이 pre-router(local_router)가 결정하는 케이스는 LLM 없이 검증")
+    p.add_argument("--local_only", action="store_true",
+                   help="pre-router가 결정하는 케이스만 검증하고 나머지는 SKIP (API 키 불필요)")
     p.add_argument("--dump_json", default="",
                    help="마지막 응답 args를 저장할 경로")
     return p.parse_args()
@@ -0,0 +1,168 @@
+"""
+OpenAI SDK 와 raw 편집 호출이 함께 쓰는 HTTP transport.
+
+프로세스당 httpx.Client 하나를 공유해 keep-alive 연결을 재사용하므로(정상 상태에서 TCP/TLS handshake 없음)
+pool 크기와 connect/read timeout 을 static/http.py 한 곳에서 설정한다.
+요청마다 endpoint(method + host + path) 별 응답 헤더 수신까지의 지연시간을 기록하고,
+RateLimitedTransport 가 model/endpoint 별 한도(rate_limiter.py)에 맞춰 요청을 대기시킨다.
+"""
+import json
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from rate_limiter import AdaptiveLimiter, LimiterRegistry
+from static.http import *
+
+
+def endpoint_of(method: str, url) -> str:
+    parts = urlsplit(str(url))
+    return f"{method} {parts.netloc}{parts.path}"
+
+
+class EndpointMetrics:
+    """endpoint 별 요청 수/에러 수/지연시간(ms) 최근 window 개 기준 p50·p95"""
+
+    def __init__(self, window: int = 500, log_every: int = HTTP_METRICS_LOG_EVERY):
+        self.window = window
+        self.log_every = log_every
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, deque] = {}
+        self._counts: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+        self._total = 0
+
+    def record(self, endpoint: str, latency_ms: float, error: bool = False):
+        with self._lock:
+            self._latencies.setdefault(endpoint, deque(maxlen=self.window)).append(latency_ms)
+            self._counts[endpoint] = self._counts.get(endpoint, 0) + 1
+            if error:
+                self._errors[endpoint] = self._errors.get(endpoint, 0) + 1
+            self._total += 1
+            should_log = self.log_every and self._total % self.log_every == 0
+        if should_log:
+            self.log()
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            result = {}
+            for endpoint, values in self._latencies.items():
+                ordered = sorted(values)
+                result[endpoint] = {
+                    "count": self._counts[endpoint],
+                    "errors": self._errors.get(endpoint, 0),
+                    "p50_ms": ordered[len(ordered) // 2],
+                    "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                }
+            return result
+
+    def log(self):
+        for endpoint, s in self.snapshot().items():
+            print(f"[HTTP] {endpoint} count={s['count']} errors={s['errors']} "
+                  f"p50={s['p50_ms']:.0f}ms p95={s['p95_ms']:.0f}ms")
+
+
+http_metrics = EndpointMetrics()
+
+
+def _on_request(request: httpx.Request):
+    request.extensions["started_at"] = time.perf_counter()
+
+
+def _on_response(response: httpx.Response):
+    started_at = response.request.extensions.get("started_at")
+    if started_at is not None:
+        http_metrics.record(endpoint_of(response.request.method, response.request.url),
+                            (time.perf_counter() - started_at) * 1000, error=response.status_code >= 400)
+
+
+rate_limiters = LimiterRegistry(lambda: AdaptiveLimiter(
+    rpm=RATE_LIMIT_DEFAULT_RPM,
+    initial_concurrency=RATE_LIMIT_INITIAL_CONCURRENCY,
+    max_concurrency=RATE_LIMIT_MAX_CONCURRENCY,
+    max_wait_sec=RATE_LIMIT_MAX_WAIT_SEC,
+))
+
+
+def limiter_key(request: httpx.Request) -> str:
+    """model/endpoint 별 한도 key. JSON 요청(SDK)은 본문의 model 포함, multipart 편집은 endpoint 만"""
+    endpoint = endpoint_of(request.method, request.url)
+    if request.headers.get("content-type", "").startswith("application/json"):
+        try:
+            model = json.loads(request.content).get("model")
+        except (httpx.RequestNotRead, ValueError, AttributeError):
+            model = None
+        if model:
+            return f"{endpoint} {model}"
+    return endpoint
+
+
+class RateLimitedTransport(httpx.BaseTransport):
+    """
+    요청 전 한도 확인(대기), 응답의 status/rate limit 헤더를 limiter 에 보고.
+    429 를 받으면 limiter 가 정한 시간만큼 대기열에서 기다렸다가 같은 요청을 다시 보낸다.
+    """
+
+    def __init__(self, inner: httpx.BaseTransport, registry: LimiterRegistry, max_429_retries: int):
+        self.inner = inner
+        self.registry = registry
+        self.max_429_retries = max_429_retries
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        limiter = self.registry.get(limiter_key(request))
+        for attempt in range(self.max_429_retries + 1):
+            limiter.acquire()
+            try:
+                response = self.inner.handle_request(request)
+            except Exception:
+                limiter.release(None)
+                raise
+            limiter.release(response.status_code, response.headers)
+            if response.status_code != 429 or attempt == self.max_429_retries:
+                return response
+            response.close()
+            print(f"[경고] 429 {endpoint_of(request.method, request.url)} → 한도 회복 후 재전송 "
+                  f"({attempt + 1}/{self.max_429_retries})")
+        return response
+
+    def close(self):
+        self.inner.close()
+
+
+def create_http_client() -> httpx.Client:
+    transport: httpx.BaseTransport = httpx.HTTPTransport(limits=httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SEC,
+    ))
+    if RATE_LIMIT_ENABLED:
+        transport = RateLimitedTransport(transport, rate_limiters, RATE_LIMIT_MAX_429_RETRIES)
+    return httpx.Client(
+        transport=transport,
+        timeout=httpx.Timeout(HTTP_READ_TIMEOUT_SEC, connect=HTTP_CONNECT_TIMEOUT_SEC),
+        event_hooks={"request": [_on_request], "response": [_on_response]},
+    )
+
+
+_http_client: Optional[httpx.Client] = None
+_http_client_lock = threading.Lock()
+
+
+def shared_http_client() -> httpx.Client:
+    """프로세스 공용 httpx.Client (처음 호출 시 생성)"""
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            _http_client = create_http_client()
+        return _http_client
+
+
+def create_openai_client(api_key: str):
+    """공용 transport 를 쓰는 OpenAI SDK client (재시도는 resilience.openai_call 에서만 하므로 SDK 재시도는 끔)"""
+    from openai import OpenAI
+
+    return OpenAI(api_key=api_key, http_client=shared_http_client(), max_retries=0)
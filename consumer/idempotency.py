@@ -0,0 +1,277 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from static.idempotency import *
+
+# 재전달 시 이어서 처리하기 위한 단계별 결과 (processed 테이블의 컬럼, JSON 텍스트)
+# route: router(LLM) 결정 args / image: 업로드된 결과 이미지 S3 정보 / response: 최종 응답 메시지
+STAGES = ("route", "image", "response")
+
+
+class SQLiteIdempotencyStore:
+    """
+    processed 테이블 기반 멱등성 저장소.
+    - 프로세스당 connection 1개를 유지 (WAL 모드) → 호출마다 connect 하지 않음
+    - in_progress 는 lease_sec 가 지나면 크래시로 간주하고 다시 가져갈 수 있음
+    - done/failed 기록은 ttl_sec 이후 백그라운드 스레드가 삭제
+    - STAGES 단계 결과를 같은 행에 저장 → DLX 재시도 시 마지막 완료 단계부터 재개
+    같은 DB 파일을 여러 프로세스(generation_consumer@N)가 공유해도 안전하도록 쓰기는 BEGIN IMMEDIATE.
+    """
+
+    def __init__(self, path: str = IDEMPOTENT_DB_PATH, lease_sec: int = IDEMPOTENT_LEASE_SEC,
+                 ttl_sec: int = IDEMPOTENT_TTL_SEC, evict_interval_sec: int = IDEMPOTENT_EVICT_INTERVAL_SEC):
+        self.path = path
+        self.lease_sec = lease_sec
+        self.ttl_sec = ttl_sec
+        self.evict_interval_sec = evict_interval_sec
+        self._lock = threading.Lock()  # worker 스레드들이 connection 하나를 공유
+        self._conn: Optional[sqlite3.Connection] = None
+        self._evictor: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        with self._lock:
+            self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is not None:
+            return self._conn
+        dirname = os.path.dirname(self.path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS processed (
+                request_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_processed_updated_at ON processed(updated_at)")
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(processed)")}
+        for stage in STAGES:
+            if stage not in columns:
+                try:
+                    conn.execute(f"ALTER TABLE processed ADD COLUMN {stage} TEXT")
+                except sqlite3.OperationalError:
+                    pass  # 다른 프로세스가 먼저 추가함
+        self._conn = conn
+        return conn
+
+    def _reset(self):
+        # DB 오류 후에는 다음 호출에서 새로 연결
+        try:
+            if self._conn is not None:
+                self._conn.close()
+        except sqlite3.Error:
+            pass
+        self._conn = None
+
+    def _write(self, fn: Callable[[sqlite3.Connection], object]):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(conn)
+                conn.execute("COMMIT")
+                return result
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def mark_in_progress(self, request_id: str) -> bool:
+        """아직 처리되지 않았거나(lease 만료 포함) 실패 기록이면 in_progress 기록 후 True"""
+        def take(conn):
+            row = conn.execute(
+                "SELECT status, updated_at <= datetime('now', ?) FROM processed WHERE request_id=?",
+                (f"-{self.lease_sec} seconds", request_id)).fetchone()
+            if row:
+                status, stale = row
+                if status == "done" or (status == "in_progress" and not stale):
+                    return False
+            self._upsert_status(conn, request_id, "in_progress")
+            return True
+
+        try:
+            return self._write(take)
+        except sqlite3.Error as e:
+            print(f"[경고] 멱등성 DB 오류(mark_in_progress): {e}")
+            with self._lock:
+                self._reset()
+            return True  # DB 문제 시에도 처리 진행
+
+    @staticmethod
+    def _upsert_status(conn, request_id: str, status: str):
+        # INSERT OR REPLACE 는 행을 지우고 다시 만들어 단계 결과가 사라지므로 UPSERT 사용
+        conn.execute(
+            "INSERT INTO processed(request_id, status, updated_at) VALUES(?,?,CURRENT_TIMESTAMP) "
+            "ON CONFLICT(request_id) DO UPDATE SET status=excluded.status, updated_at=CURRENT_TIMESTAMP",
+            (request_id, status))
+
+    def _set_status(self, request_id: str, status: str):
+        try:
+            self._write(lambda conn: self._upsert_status(conn, request_id, status))
+        except sqlite3.Error as e:
+            print(f"[경고] 멱등성 DB 오류(mark_{status}): {e}")
+            with self._lock:
+                self._reset()
+
+    def mark_done(self, request_id: str):
+        self._set_status(request_id, "done")
+
+    def mark_failed(self, request_id: str):
+        """실패(DLX 재시도 대상) → 재전달 시 lease를 기다리지 않고 바로 다시 처리"""
+        self._set_status(request_id, "failed")
+
+    def get_status(self, request_id: str) -> Optional[str]:
+        """기록된 상태 (없거나 DB 오류면 None)"""
+        try:
+            with self._lock:
+                row = self._connect().execute(
+                    "SELECT status FROM processed WHERE request_id=?", (request_id,)).fetchone()
+        except sqlite3.Error as e:
+            print(f"[경고] 멱등성 DB 오류(get_status): {e}")
+            with self._lock:
+                self._reset()
+            return None
+        return row[0] if row else None
+
+    def save_stage(self, request_id: str, stage: str, value):
+        """단계 결과 저장 (best effort: 실패해도 처리는 계속). updated_at 갱신으로 lease도 연장됨"""
+        if stage not in STAGES:
+            raise ValueError(f"알 수 없는 stage: {stage}")
+        try:
+            self._write(lambda conn: conn.execute(
+                f"INSERT INTO processed(request_id, status, {stage}, updated_at) "
+                f"VALUES(?, 'in_progress', ?, CURRENT_TIMESTAMP) "
+                f"ON CONFLICT(request_id) DO UPDATE SET {stage}=excluded.{stage}, updated_at=CURRENT_TIMESTAMP",
+                (request_id, json.dumps(value, ensure_ascii=False))))
+        except sqlite3.Error as e:
+            print(f"[경고] 멱등성 DB 오류(save_stage {stage}): {e}")
+            with self._lock:
+                self._reset()
+
+    def load_stages(self, request_id: str) -> Dict[str, object]:
+        """저장된 단계 결과 {stage: value} (없으면 빈 dict)"""
+        try:
+            with self._lock:
+                row = self._connect().execute(
+                    f"SELECT {', '.join(STAGES)} FROM processed WHERE request_id=?", (request_id,)).fetchone()
+        except sqlite3.Error as e:
+            print(f"[경고] 멱등성 DB 오류(load_stages): {e}")
+            with self._lock:
+                self._reset()
+            return {}
+        if not row:
+            return {}
+        return {stage: json.loads(raw) for stage, raw in zip(STAGES, row) if raw is not None}
+
+    def evict_expired(self) -> int:
+        """ttl 이 지난 기록 삭제 (오래된 in_progress 포함). 삭제한 행 수 반환"""
+        try:
+            return self._write(lambda conn: conn.execute(
+                "DELETE FROM processed WHERE updated_at <= datetime('now', ?)",
+                (f"-{self.ttl_sec} seconds",)).rowcount)
+        except sqlite3.Error as e:
+            print(f"[경고] 멱등성 DB 정리 실패: {e}")
+            with self._lock:
+                self._reset()
+            return 0
+
+    def start_eviction(self):
+        if self._evictor is not None:
+            return
+
+        def loop():
+            while not self._stop.wait(self.evict_interval_sec):
+                removed = self.evict_expired()
+                if removed:
+                    print(f"[정리] 멱등성 기록 {removed}건 삭제")
+
+        self._evictor = threading.Thread(target=loop, name="idempotency-evictor", daemon=True)
+        self._evictor.start()
+
+    def close(self):
+        self._stop.set()
+        with self._lock:
+            self._reset()
+
+
+class MemoryIdempotencyStore:
+    """테스트/로컬용 in-memory 구현. SQLiteIdempotencyStore 와 같은 인터페이스"""
+
+    def __init__(self, lease_sec: int = IDEMPOTENT_LEASE_SEC, ttl_sec: int = IDEMPOTENT_TTL_SEC,
+                 clock: Callable[[], float] = time.time):
+        self.lease_sec = lease_sec
+        self.ttl_sec = ttl_sec
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._rows: Dict[str, dict] = {}
+
+    def _row(self, request_id: str) -> dict:
+        row = self._rows.setdefault(request_id, {"status": "in_progress", "updated_at": 0.0, "stages": {}})
+        row["updated_at"] = self.clock()
+        return row
+
+    def mark_in_progress(self, request_id: str) -> bool:
+        with self._lock:
+            row = self._rows.get(request_id)
+            if row:
+                fresh = row["updated_at"] > self.clock() - self.lease_sec
+                if row["status"] == "done" or (row["status"] == "in_progress" and fresh):
+                    return False
+            self._row(request_id)["status"] = "in_progress"
+            return True
+
+    def mark_done(self, request_id: str):
+        with self._lock:
+            self._row(request_id)["status"] = "done"
+
+    def mark_failed(self, request_id: str):
+        with self._lock:
+            self._row(request_id)["status"] = "failed"
+
+    def get_status(self, request_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._rows.get(request_id)
+        return row["status"] if row else None
+
+    def save_stage(self, request_id: str, stage: str, value):
+        if stage not in STAGES:
+            raise ValueError(f"알 수 없는 stage: {stage}")
+        with self._lock:
+            # SQLite 구현과 같이 JSON 왕복 (저장 후 원본 객체 변경의 영향을 받지 않도록)
+            self._row(request_id)["stages"][stage] = json.dumps(value, ensure_ascii=False)
+
+    def load_stages(self, request_id: str) -> Dict[str, object]:
+        with self._lock:
+            row = self._rows.get(request_id)
+            stages = dict(row["stages"]) if row else {}
+        return {stage: json.loads(raw) for stage, raw in stages.items()}
+
+    def evict_expired(self) -> int:
+        with self._lock:
+            cutoff = self.clock() - self.ttl_sec
+            expired = [k for k, row in self._rows.items() if row["updated_at"] <= cutoff]
+            for k in expired:
+                del self._rows[k]
+        return len(expired)
+
+    def start_eviction(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def create_store(backend: str = IDEMPOTENT_BACKEND):
+    if backend == "memory":
+        return MemoryIdempotencyStore()
+    if backend == "sqlite":
+        return SQLiteIdempotencyStore()
+    raise ValueError(f"알 수 없는 IDEMPOTENT_BACKEND: {backend}")
@@ -0,0 +1,136 @@
+import os
+import sqlite3
+import tempfile
+
+from idempotency import MemoryIdempotencyStore, SQLiteIdempotencyStore
+
+
+def _sqlite_store(tmpdir, **kwargs):
+    return SQLiteIdempotencyStore(path=os.path.join(tmpdir, "db", "processed.db"), **kwargs)
+
+
+def test_memory_store_lifecycle(clock):
+    store = MemoryIdempotencyStore(lease_sec=60, ttl_sec=3600, clock=clock)
+
+    assert store.mark_in_progress("r1") is True
+    assert store.mark_in_progress("r1") is False  # 처리 중
+    store.mark_done("r1")
+    assert store.mark_in_progress("r1") is False  # 완료
+
+    assert store.mark_in_progress("r2") is True
+    clock.now += 61
+    assert store.mark_in_progress("r2") is True  # lease 만료 → 재처리
+
+    store.mark_failed("r2")
+    assert store.mark_in_progress("r2") is True  # 실패 기록은 바로 재처리
+
+    clock.now += 3601
+    assert store.evict_expired() == 2
+    assert store.get_status("r1") is None
+
+
+def test_sqlite_store_lifecycle_and_wal():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = _sqlite_store(tmpdir, lease_sec=3600, ttl_sec=3600)
+        try:
+            assert store.mark_in_progress("r1") is True
+            assert store.mark_in_progress("r1") is False
+            store.mark_done("r1")
+            assert store.get_status("r1") == "done"
+            assert store.mark_in_progress("r1") is False
+
+            store.mark_failed("r2")
+            assert store.mark_in_progress("r2") is True
+
+            mode = sqlite3.connect(store.path).execute("PRAGMA journal_mode").fetchone()[0]
+            assert mode.lower() == "wal"
+        finally:
+            store.close()
+
+
+def test_sqlite_store_stale_lease_and_eviction():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = _sqlite_store(tmpdir, lease_sec=0, ttl_sec=0)
+        try:
+            assert store.mark_in_progress("r1") is True
+            assert store.mark_in_progress("r1") is True  # lease 0 → 항상 만료
+            store.mark_done("r1")
+            assert store.evict_expired() == 1
+            assert store.get_status("r1") is None
+        finally:
+            store.close()
+
+
+def test_sqlite_store_shared_between_instances():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        a = _sqlite_store(tmpdir, lease_sec=3600)
+        b = _sqlite_store(tmpdir, lease_sec=3600)
+        try:
+            assert a.mark_in_progress("r1") is True
+            assert b.mark_in_progress("r1") is False
+        finally:
+            a.close()
+            b.close()
+
+
+def _check_stages(store):
+    assert store.load_stages("r1") == {}
+    assert store.mark_in_progress("r1") is True
+    store.save_stage("r1", "route", {"subtype": "generate", "needs_clarification": False})
+    store.save_stage("r1", "image", {"image_path": "generated-images/a.png"})
+    store.mark_failed("r1")
+
+    # 재전달: 다시 가져가도 저장된 단계 결과는 유지
+    assert store.mark_in_progress("r1") is True
+    stages = store.load_stages("r1")
+    assert stages["route"]["subtype"] == "generate"
+    assert stages["image"]["image_path"] == "generated-images/a.png"
+    assert "response" not in stages
+
+
+def test_memory_store_stages():
+    _check_stages(MemoryIdempotencyStore(lease_sec=60))
+
+
+def test_sqlite_store_stages_survive_status_changes():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = _sqlite_store(tmpdir, lease_sec=3600)
+        try:
+            _check_stages(store)
+        finally:
+            store.close()
+
+
+def test_sqlite_store_migrates_legacy_table():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "processed.db")
+        legacy = sqlite3.connect(path)
+        legacy.execute("CREATE TABLE processed (request_id TEXT PRIMARY KEY, status TEXT NOT NULL, "
+                       "updated_at DATETIME DEFAULT CURRENT_TIMESTAMP)")
+        legacy.execute("INSERT INTO processed(request_id, status) VALUES('old', 'done')")
+        legacy.commit()
+        legacy.close()
+
+        store = SQLiteIdempotencyStore(path=path)
+        try:
+            assert store.mark_in_progress("old") is False
+            store.save_stage("new", "response", {"requestId": "new"})
+            assert store.load_stages("new") == {"response": {"requestId": "new"}}
+        finally:
+            store.close()
+
+
+def test_sqlite_store_get_status_recovers_from_db_error():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = _sqlite_store(tmpdir)
+        try:
+            store.mark_done("r1")
+            other = sqlite3.connect(store.path)
+            other.execute("DROP TABLE processed")
+            other.commit()
+            other.close()
+            assert store.get_status("r1") is None  # 예외 대신 None, 연결 재설정
+            store.mark_in_progress("r2")  # 다시 연결하며 테이블 재생성
+            assert store.get_status("r2") == "in_progress"
+        finally:
+            store.close()
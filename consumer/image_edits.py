@@ -0,0 +1,100 @@
+"""
+OpenAI Images 편집(/v1/images/edits) 멀티 이미지 요청.
+
+base 와 참고 이미지들을 image[] 파트로 모두 첨부한다 (첫 번째가 편집 대상, mask 는 첫 번째 이미지에 적용).
+multipart 본문은 하나의 bytes 로 합치지 않고, 이미 받아 둔 이미지 버퍼를 그대로 이어 붙여
+Content-Length 를 알려 준 채 파트 단위로 전송한다 (이미지 크기만큼의 추가 복사 없음).
+요청은 공용 HTTP transport(http_transport.shared_http_client)로 보내 keep-alive 연결을 재사용한다.
+"""
+import base64
+import uuid
+from io import BytesIO
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import httpx
+
+from http_transport import shared_http_client
+from image_stream import OnPartial, post_image_stream
+from static.model import IMAGES_MODEL, IMAGES_EDIT_URL, IMAGE_PREVIEW_PARTIAL_IMAGES
+
+# 편집 엔드포인트가 한 요청에 받는 최대 이미지 수
+MAX_EDIT_IMAGES = 16
+
+# (파일명, 버퍼(BytesIO 또는 bytes), content-type)
+Part = Tuple[str, object, str]
+
+
+def _buffer(data) -> bytes:
+    # getvalue() 는 CPython 에서 BytesIO 내부 버퍼를 복사 없이 공유 (getbuffer 와 달리 close() 도 안전)
+    if isinstance(data, BytesIO):
+        return data.getvalue()
+    return data
+
+
+class MultipartBody:
+    """
+    multipart/form-data 본문. __len__ 을 Content-Length 로 주고 __iter__ 로 파트 단위 스트리밍.
+    generator 가 아니라 여러 번 순회할 수 있으므로 429 후 재전송에도 그대로 사용 가능
+    """
+
+    def __init__(self, fields: Sequence[Tuple[str, str]], files: Sequence[Tuple[str, Part]],
+                 boundary: Optional[str] = None):
+        self.boundary = boundary or uuid.uuid4().hex
+        self._chunks: List[bytes] = []
+        for name, value in fields:
+            self._chunks.append(
+                f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'.encode()
+                + str(value).encode() + b"\r\n")
+        for name, (filename, data, ctype) in files:
+            self._chunks.append(
+                f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                f'Content-Type: {ctype}\r\n\r\n'.encode())
+            self._chunks.append(_buffer(data))
+            self._chunks.append(b"\r\n")
+        self._chunks.append(f"--{self.boundary}--\r\n".encode())
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self) -> int:
+        return sum(len(c) for c in self._chunks)
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(self._chunks)
+
+
+def request_image_edit(images: Sequence[Part], prompt: str, *, api_key: str, size: str = "auto",
+                       mask: Optional[Part] = None, url: str = IMAGES_EDIT_URL, model: str = IMAGES_MODEL,
+                       timeout: Optional[float] = None, on_partial: Optional[OnPartial] = None,
+                       partial_images: int = IMAGE_PREVIEW_PARTIAL_IMAGES) -> bytes:
+    """
+    images[0] 을 편집 대상으로, 나머지를 참고 이미지로 함께 보내고 결과 PNG bytes 반환.
+    on_partial 이 주어지면 스트리밍으로 요청하고 미리보기(partial image)마다 호출
+    """
+    if not images:
+        raise ValueError("편집할 이미지가 없습니다.")
+    if len(images) > MAX_EDIT_IMAGES:
+        print(f"[경고] 편집 이미지 {len(images)}장 → 앞 {MAX_EDIT_IMAGES}장만 전송")
+        images = images[:MAX_EDIT_IMAGES]
+
+    field = "image[]" if len(images) > 1 else "image"
+    files = [(field, part) for part in images]
+    if mask is not None:
+        files.append(("mask", mask))
+    fields = [("model", model), ("prompt", prompt), ("size", size)]
+    if on_partial is not None:
+        fields += [("stream", "true"), ("partial_images", partial_images)]
+    body = MultipartBody(fields, files)
+
+    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": body.content_type,
+               "Content-Length": str(len(body))}
+    if on_partial is not None:
+        return post_image_stream(url, headers=headers, on_partial=on_partial, content=body, timeout=timeout)
+    # timeout 미지정 시 공용 client 설정(HTTP_CONNECT/READ_TIMEOUT_SEC) 사용
+    resp = shared_http_client().post(url, headers=headers, content=body,
+                                     timeout=httpx.USE_CLIENT_DEFAULT if timeout is None else timeout)
+    if not resp.is_success:
+        print("[OpenAI error payload]", resp.status_code, resp.text)
+    resp.raise_for_status()
+    return base64.b64decode(resp.json()["data"][0]["b64_json"])
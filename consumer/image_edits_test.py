@@ -0,0 +1,87 @@
+import base64
+import json
+import threading
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+from http_transport import http_metrics
+from image_edits import MultipartBody, request_image_edit
+
+
+class StubEditsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    received = []
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        raw = self.rfile.read(length)
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + raw)
+        parts = [(p.get_param("name", header="content-disposition"), p.get_filename(), p.get_payload(decode=True))
+                 for p in message.iter_parts()]
+        StubEditsHandler.received.append({"headers": dict(self.headers), "parts": parts,
+                                          "client_port": self.client_address[1]})
+
+        body = json.dumps({"data": [{"b64_json": base64.b64encode(b"result-png").decode()}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubEditsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_multipart_length_matches_body():
+    body = MultipartBody([("prompt", "고양이")], [("image[]", ("a.png", BytesIO(b"abc"), "image/png"))], "b")
+    assert len(body) == len(b"".join(bytes(c) for c in body))
+
+
+def test_base_and_references_sent_as_image_array():
+    StubEditsHandler.received.clear()
+    server = _serve()
+    try:
+        images = [("base.png", BytesIO(b"base"), "image/png"),
+                  ("ref1.png", BytesIO(b"ref-1"), "image/png"),
+                  ("ref2.jpg", b"ref-2", "image/jpeg")]
+        result = request_image_edit(images, "합쳐줘", api_key="test", size="auto",
+                                    url=f"http://127.0.0.1:{server.server_port}/v1/images/edits")
+    finally:
+        server.shutdown()
+
+    assert result == b"result-png"
+    request = StubEditsHandler.received[0]
+    assert request["headers"]["Authorization"] == "Bearer test"
+    assert "chunked" not in request["headers"].get("Transfer-Encoding", "")
+    files = [(name, filename, payload) for name, filename, payload in request["parts"] if filename]
+    assert files == [("image[]", "base.png", b"base"), ("image[]", "ref1.png", b"ref-1"),
+                     ("image[]", "ref2.jpg", b"ref-2")]
+    fields = {name: payload.decode() for name, filename, payload in request["parts"] if not filename}
+    assert fields["prompt"] == "합쳐줘"
+    assert fields["size"] == "auto"
+
+
+def test_edits_reuse_pooled_connection_and_record_latency():
+    StubEditsHandler.received.clear()
+    server = _serve()
+    url = f"http://127.0.0.1:{server.server_port}/v1/images/edits"
+    try:
+        for _ in range(3):
+            request_image_edit([("base.png", b"base", "image/png")], "편집", api_key="test", url=url)
+    finally:
+        server.shutdown()
+
+    assert len({r["client_port"] for r in StubEditsHandler.received}) == 1  # 연결 하나를 재사용
+    stats = http_metrics.snapshot()[f"POST 127.0.0.1:{server.server_port}/v1/images/edits"]
+    assert stats["count"] == 3
+    assert stats["errors"] == 0
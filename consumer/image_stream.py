@@ -0,0 +1,77 @@
+"""
+OpenAI Images 스트리밍 응답(partial image) 처리.
+
+stream=true, partial_images=N 으로 요청하면 응답이 SSE 로 온다.
+  data: {"type": "image_generation.partial_image", "partial_image_index": 0, "b64_json": "..."}
+  data: {"type": "image_generation.completed", "b64_json": "..."}
+(편집은 image_edit.partial_image / image_edit.completed)
+미리보기는 on_partial(index, png bytes) 로 넘기고 완료 이미지 bytes 를 반환한다.
+on_partial 의 실패는 미리보기만 건너뛰고 본 요청은 계속한다.
+"""
+import base64
+import json
+from typing import Callable, Iterable, Iterator, Optional
+
+import httpx
+
+from http_transport import shared_http_client
+from static.model import IMAGES_GENERATE_URL, IMAGES_MODEL, IMAGE_PREVIEW_PARTIAL_IMAGES
+
+# on_partial(partial_image_index, 미리보기 이미지 bytes)
+OnPartial = Callable[[int, bytes], None]
+
+
+def iter_sse_events(lines: Iterable[str]) -> Iterator[dict]:
+    """SSE 줄 → data JSON 이벤트 (빈 줄이 이벤트 경계, ':' 로 시작하면 주석)"""
+    data = []
+    for line in lines:
+        if not line:
+            if data:
+                yield json.loads("\n".join(data))
+                data = []
+            continue
+        if line.startswith(":"):
+            continue
+        field, _, value = line.partition(":")
+        if field == "data":
+            data.append(value[1:] if value.startswith(" ") else value)
+    if data:
+        yield json.loads("\n".join(data))
+
+
+def read_image_stream(lines: Iterable[str], on_partial: Optional[OnPartial]) -> bytes:
+    for event in iter_sse_events(lines):
+        etype = event.get("type", "")
+        if etype.endswith(".partial_image"):
+            if on_partial is None:
+                continue
+            try:
+                on_partial(int(event.get("partial_image_index", 0)), base64.b64decode(event["b64_json"]))
+            except Exception as e:
+                print(f"[경고] 미리보기 처리 실패(무시): {e}")
+        elif etype.endswith(".completed"):
+            return base64.b64decode(event["b64_json"])
+        elif etype == "error" or "error" in event:
+            raise RuntimeError(f"이미지 스트림 오류: {event.get('error', event)}")
+    raise RuntimeError("이미지 스트림이 완료 이벤트 없이 끝났습니다.")
+
+
+def post_image_stream(url: str, *, headers: dict, on_partial: Optional[OnPartial], content=None,
+                      json_body: Optional[dict] = None, timeout: Optional[float] = None) -> bytes:
+    """공용 HTTP client 로 스트리밍 요청 → 완료 이미지 bytes"""
+    with shared_http_client().stream("POST", url, headers=headers, content=content, json=json_body,
+                                     timeout=httpx.USE_CLIENT_DEFAULT if timeout is None else timeout) as resp:
+        if not resp.is_success:
+            resp.read()
+            print("[OpenAI error payload]", resp.status_code, resp.text)
+        resp.raise_for_status()
+        return read_image_stream(resp.iter_lines(), on_partial)
+
+
+def stream_image_generation(prompt: str, *, api_key: str, on_partial: Optional[OnPartial], size: str = "auto",
+                            partial_images: int = IMAGE_PREVIEW_PARTIAL_IMAGES, url: str = IMAGES_GENERATE_URL,
+                            model: str = IMAGES_MODEL, timeout: Optional[float] = None) -> bytes:
+    """images/generations 스트리밍 호출 → 완료 PNG bytes"""
+    body = {"model": model, "prompt": prompt, "size": size, "stream": True, "partial_images": partial_images}
+    return post_image_stream(url, headers={"Authorization": f"Bearer {api_key}"}, on_partial=on_partial,
+                             json_body=body, timeout=timeout)
@@ -0,0 +1,98 @@
+import base64
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from image_edits import request_image_edit
+from image_stream import iter_sse_events, read_image_stream, stream_image_generation
+
+PARTIALS = [b"preview-0", b"preview-1"]
+FINAL = b"final-png"
+
+
+def _event(payload: dict) -> bytes:
+    return f"data: {json.dumps(payload)}\n\n".encode()
+
+
+class StubStreamHandler(BaseHTTPRequestHandler):
+    """고정된 미리보기 2장 + 완료 이미지를 SSE 로 스트리밍하는 Images API stub"""
+    protocol_version = "HTTP/1.1"
+    received = []
+
+    def do_POST(self):
+        raw = self.rfile.read(int(self.headers["Content-Length"]))
+        StubStreamHandler.received.append({"path": self.path, "headers": dict(self.headers), "body": raw})
+        prefix = "image_edit" if self.path.endswith("/edits") else "image_generation"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        events = [_event({"type": f"{prefix}.partial_image", "partial_image_index": i,
+                          "b64_json": base64.b64encode(data).decode()}) for i, data in enumerate(PARTIALS)]
+        events.append(b": keep-alive\n\n")
+        events.append(_event({"type": f"{prefix}.completed", "b64_json": base64.b64encode(FINAL).decode()}))
+        for chunk in events:
+            self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_url():
+    StubStreamHandler.received.clear()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubStreamHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/v1/images"
+    server.shutdown()
+
+
+def test_sse_events_split_on_blank_lines():
+    lines = ["data: {\"a\": 1}", "", ": comment", "event: x", "data: {\"b\": 2}", ""]
+    assert list(iter_sse_events(lines)) == [{"a": 1}, {"b": 2}]
+
+
+def test_stream_without_completed_event_fails():
+    lines = ['data: {"type": "image_generation.partial_image", "partial_image_index": 0, "b64_json": ""}', ""]
+    with pytest.raises(RuntimeError):
+        read_image_stream(lines, None)
+
+
+def test_partial_callback_error_does_not_abort_stream():
+    lines = [f'data: {json.dumps({"type": "image_generation.partial_image", "b64_json": ""})}', "",
+             f'data: {json.dumps({"type": "image_generation.completed", "b64_json": "AQ=="})}', ""]
+
+    def fail(index, data):
+        raise ValueError("upload 실패")
+
+    assert read_image_stream(lines, fail) == b"\x01"
+
+
+def test_generation_stream_delivers_previews_before_result(stub_url):
+    previews = []
+    result = stream_image_generation("고양이", api_key="test", on_partial=lambda i, d: previews.append((i, d)),
+                                     url=f"{stub_url}/generations", partial_images=2)
+
+    assert result == FINAL
+    assert previews == list(enumerate(PARTIALS))
+    request = StubStreamHandler.received[0]
+    assert request["headers"]["Authorization"] == "Bearer test"
+    body = json.loads(request["body"])
+    assert body["stream"] is True and body["partial_images"] == 2
+
+
+def test_edit_stream_sends_stream_fields(stub_url):
+    previews = []
+    result = request_image_edit([("base.png", b"base", "image/png")], "편집", api_key="test",
+                                url=f"{stub_url}/edits", on_partial=lambda i, d: previews.append(d))
+
+    assert result == FINAL
+    assert previews == PARTIALS
+    body = StubStreamHandler.received[0]["body"]
+    assert b'name="stream"\r\n\r\ntrue' in body
+    assert b'name="partial_images"' in body
@@ -0,0 +1,15 @@
+import os
+import subprocess
+import sys
+
+HEAVY_MODULES = ("torch", "torchvision", "openai", "httpx", "boto3", "botocore")
+
+
+def test_generation_consumer_import_skips_heavy_modules():
+    # torch(style transfer), openai/httpx(LLM 호출), boto3/botocore(S3) 는 처음 필요할 때만 import
+    code = ("import sys, generation_consumer; "
+            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    env = dict(os.environ, IDEMPOTENT_BACKEND="memory", S3_CACHE_DIR="")
+    out = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                         capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == ""
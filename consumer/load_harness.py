@@ -0,0 +1,643 @@
+"""
+RabbitMQ / S3 / OpenAI 없이 on_message(→ classify_and_execute → 이미지 작업) 처리량을 재는 오프라인 부하 테스트.
+
+- FakeBroker: 프로세스 내 큐. 소비자마다 worker 스레드 풀(= prefetch)로 handler(channel, method, properties, body) 실행
+- LocalS3: 디렉토리 기반 get_object/put_object (없는 key 는 placeholder PNG 를 만들어 저장)
+- StubOpenAI: chat.completions(router) / images.generations / images.edits 를 흉내 내는 로컬 HTTP 서버.
+  지연시간/에러율 설정 가능, 메시지 파일의 expected 로 router 결정을 돌려줌 (stream 요청이면 partial image SSE)
+- style transfer 모델은 --style-latency 만큼 기다린 뒤 content 이미지를 그대로 돌려주는 stand-in 으로 대체
+
+generation_test/*.json 같은 메시지 파일을 목표 속도(--rate)로 재생하고 처리량과 단계별 p50/p95/p99 를 출력한다.
+설정(동시성, router/executor 분리, 캐시, 미리보기 등)은 실제 consumer 와 같은 환경변수를 그대로 사용.
+
+    python load_harness.py --count 40 --rate 4 --concurrency 4 --image-latency 2
+    IMAGE_PREVIEW_ENABLED=true python load_harness.py --stage split --executor-concurrency 8
+"""
+import argparse
+import base64
+import glob
+import hashlib
+import itertools
+import json
+import math
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+from PIL import Image
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REQUEST_QUEUE = "loadtest.request"
+RESPONSE_QUEUE = "loadtest.response"
+
+
+# ── 측정 ──────────────────────────────────────────────────────────────
+def percentile(ordered: List[float], q: float) -> float:
+    """정렬된 값의 nearest-rank 백분위"""
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+class StageRecorder:
+    """단계별 소요 시간(초) 기록 → count / p50 / p95 / p99 / max (ms)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: Dict[str, List[float]] = {}
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            self._values.setdefault(stage, []).append(seconds)
+
+    def timed(self, stage: str, fn: Callable) -> Callable:
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - started)
+
+        return wrapper
+
+    def summary(self) -> Dict[str, dict]:
+        with self._lock:
+            values = {stage: sorted(v) for stage, v in self._values.items()}
+        return {stage: {"count": len(v),
+                        "p50_ms": percentile(v, 50) * 1000,
+                        "p95_ms": percentile(v, 95) * 1000,
+                        "p99_ms": percentile(v, 99) * 1000,
+                        "max_ms": v[-1] * 1000}
+                for stage, v in sorted(values.items())}
+
+
+class Tracker:
+    """요청별 전송 시각 → 최종 응답/NACK 시 end_to_end 기록, 모든 요청이 끝나면 done 이벤트"""
+
+    def __init__(self, recorder: StageRecorder, expected: int):
+        self.recorder = recorder
+        self.expected = expected
+        self.outcomes: Dict[str, int] = {}
+        self.previews = 0
+        self.done = threading.Event()
+        self._lock = threading.Lock()
+        self._sent: Dict[str, float] = {}
+        self._finished = set()
+
+    def sent(self, request_id: str):
+        with self._lock:
+            self._sent[request_id] = time.perf_counter()
+
+    def finish(self, request_id: Optional[str], outcome: str):
+        with self._lock:
+            if request_id not in self._sent or request_id in self._finished:
+                return
+            self._finished.add(request_id)
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+            elapsed = time.perf_counter() - self._sent[request_id]
+            if len(self._finished) >= self.expected:
+                self.done.set()
+        self.recorder.record("end_to_end", elapsed)
+
+    def on_response(self, body):
+        resp = json.loads(body)
+        if resp.get("isPreview"):
+            with self._lock:
+                self.previews += 1
+            return
+        if not resp.get("isSuccess", False):
+            outcome = "failed"
+        else:
+            outcome = "image" if resp.get("isImageGenerated") else "clarify"
+        self.finish(resp.get("requestId"), outcome)
+
+    @property
+    def finished(self) -> int:
+        with self._lock:
+            return len(self._finished)
+
+
+# ── 브로커 stand-in ───────────────────────────────────────────────────
+def _request_id_of(body) -> Optional[str]:
+    try:
+        return json.loads(body).get("requestId")
+    except (ValueError, AttributeError):
+        return None
+
+
+class FakeChannel:
+    """on_message / on_job 이 쓰는 channel 메서드만 구현 (publisher 가 없으므로 동기 confirm 경로)"""
+
+    def __init__(self, broker: "FakeBroker"):
+        self.broker = broker
+
+    def basic_publish(self, exchange, routing_key, body, properties=None):
+        self.broker.publish(routing_key, body)
+
+    def basic_ack(self, delivery_tag, multiple=False):
+        self.broker.settle(delivery_tag, ack=True)
+
+    def basic_nack(self, delivery_tag, requeue=False, multiple=False):
+        self.broker.settle(delivery_tag, ack=False)
+
+
+class FakeBroker:
+    """
+    프로세스 내 큐. consume(queue, handler, workers) 로 소비자를 붙이면 publish 된 메시지를 worker 스레드에서 처리
+    (worker 수 = prefetch, 나머지는 대기). 응답 큐로 온 메시지는 Tracker 로 넘긴다.
+    """
+
+    def __init__(self, recorder: StageRecorder, tracker: Tracker):
+        self.recorder = recorder
+        self.tracker = tracker
+        self.channel = FakeChannel(self)
+        self._consumers: Dict[str, tuple] = {}
+        self._tags = itertools.count(1)
+        self._lock = threading.Lock()
+        self._unacked: Dict[int, bytes] = {}
+
+    def consume(self, queue: str, handler, workers: int):
+        pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix=f"fake-{queue}")
+        self._consumers[queue] = (handler, pool)
+
+    def publish(self, routing_key: str, body):
+        consumer = self._consumers.get(routing_key)
+        if consumer is None:
+            if routing_key == RESPONSE_QUEUE:
+                self.tracker.on_response(body)
+            return
+        handler, pool = consumer
+        body = body.encode("utf-8") if isinstance(body, str) else body
+        tag = next(self._tags)
+        with self._lock:
+            self._unacked[tag] = body
+        pool.submit(self._deliver, handler, routing_key, tag, body, time.perf_counter())
+
+    def _deliver(self, handler, queue: str, tag: int, body: bytes, enqueued_at: float):
+        stage = "queue_wait" if queue == REQUEST_QUEUE else "queue_wait.execute"
+        self.recorder.record(stage, time.perf_counter() - enqueued_at)
+        method = SimpleNamespace(delivery_tag=tag, routing_key=queue, redelivered=False)
+        try:
+            handler(self.channel, method, SimpleNamespace(), body)
+        except Exception as e:
+            print(f"[❌] worker 예외 (delivery_tag={tag}): {e}")
+
+    def settle(self, tag: int, ack: bool):
+        with self._lock:
+            body = self._unacked.pop(tag, None)
+        if body is not None and not ack:
+            self.tracker.finish(_request_id_of(body), "failed")
+
+    def close(self):
+        for _, pool in self._consumers.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+# ── S3 stand-in ──────────────────────────────────────────────────────
+def solid_png(size, color=(120, 160, 200)) -> bytes:
+    buf = BytesIO()
+    Image.new("RGB", size, color).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+class LocalS3:
+    """
+    boto3 S3 client 대신 쓰는 디렉토리 기반 stand-in (get_object / put_object 만).
+    없는 key 를 읽으면 placeholder_size 크기의 PNG 를 만들어 저장 (None 이면 NoSuchKey)
+    """
+
+    def __init__(self, root: str, recorder: StageRecorder, latency_sec: float = 0.0,
+                 placeholder_size=(1600, 1200)):
+        self.root = root
+        self.recorder = recorder
+        self.latency_sec = latency_sec
+        self.placeholder_size = placeholder_size
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        rel = os.path.normpath(key.replace(":", "").lstrip("/"))
+        if rel.startswith(".."):
+            raise ValueError(f"잘못된 key: {key}")
+        return os.path.join(self.root, rel)
+
+    @staticmethod
+    def _error(code: str, message: str):
+        from botocore.exceptions import ClientError
+
+        return ClientError({"Error": {"Code": code, "Message": message}}, "GetObject")
+
+    def get_object(self, Bucket, Key, IfNoneMatch=None, **kwargs):
+        started = time.perf_counter()
+        time.sleep(self.latency_sec)
+        path = self._path(Key)
+        with self._lock:
+            if not os.path.exists(path):
+                if self.placeholder_size is None:
+                    raise self._error("NoSuchKey", Key)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "wb") as f:
+                    f.write(solid_png(self.placeholder_size))
+        with open(path, "rb") as f:
+            data = f.read()
+        etag = f'"{hashlib.md5(data).hexdigest()}"'
+        self.recorder.record("s3.get", time.perf_counter() - started)
+        if IfNoneMatch and IfNoneMatch == etag:
+            raise self._error("304", "Not Modified")
+        return {"Body": BytesIO(data), "ContentType": "image/png", "ETag": etag}
+
+    def put_object(self, Bucket, Key, Body, ContentType=None, **kwargs):
+        started = time.perf_counter()
+        time.sleep(self.latency_sec)
+        data = Body if isinstance(Body, (bytes, bytearray)) else Body.read()
+        path = self._path(Key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        self.recorder.record("s3.put", time.perf_counter() - started)
+        return {"ETag": f'"{hashlib.md5(data).hexdigest()}"'}
+
+
+# ── OpenAI stand-in ──────────────────────────────────────────────────
+def route_decision(case: dict) -> dict:
+    """메시지 파일의 expected → route_scenario 인자 (expected 가 없으면 generate)"""
+    expected = case.get("expected") or {}
+    uploads = case.get("uploads") or case.get("imagesPath") or []
+    prompt = case.get("prompt", "")
+    needs = bool(expected.get("needs_clarification", False))
+    subtype = expected.get("subtype") or "generate"
+
+    def item(obj):
+        path = (obj or {}).get("path")
+        if not path or path == "None":
+            return None
+        return {"source": "upload" if path in uploads else "chat", "path": path}
+
+    return {
+        "subtype": subtype,
+        "base": item(expected.get("base")),
+        "references": [r for r in (item(o) for o in expected.get("references") or []) if r],
+        "generate_instructions": prompt if subtype == "generate" else "",
+        "edit_instructions": prompt if subtype != "generate" else "",
+        "style_transfer": bool(expected.get("style_transfer", False)),
+        "image_description": "stub 이미지",
+        "needs_clarification": needs,
+        "reason": "stub: 추가 설명이 필요합니다." if needs else "",
+        "signals": ["stub"],
+        "chat_summary": case.get("chatSummary", ""),
+    }
+
+
+def _router_prompt(request: dict) -> Optional[str]:
+    """router 요청 user content 의 {"type": "prompt"} 텍스트 블록 값"""
+    for message in request.get("messages", []):
+        content = message.get("content")
+        if not isinstance(content, list):
+            continue
+        for block in content:
+            try:
+                obj = json.loads(block.get("text", ""))
+            except (ValueError, AttributeError):
+                continue
+            if isinstance(obj, dict) and obj.get("type") == "prompt":
+                return obj.get("value")
+    return None
+
+
+class StubOpenAI:
+    """
+    chat.completions / images.generations / images.edits 로컬 서버.
+    latency: endpoint("chat" | "images") 별 평균 지연(초), jitter 비율만큼 균등 분포로 흔듦.
+    error_rate 확률로 429 / 500 / 503 응답.
+    """
+
+    def __init__(self, decisions: Dict[str, dict], chat_latency: float, image_latency: float,
+                 jitter: float = 0.2, error_rate: float = 0.0, seed: Optional[int] = None):
+        self.decisions = decisions
+        self.latency = {"chat": chat_latency, "images": image_latency}
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests: Dict[str, int] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._png_cache: Dict[tuple, bytes] = {}
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}/v1"
+
+    def start(self) -> "StubOpenAI":
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                stub.handle(self, body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="stub-openai", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    # 응답 헬퍼
+    def _delay(self, kind: str) -> float:
+        base = self.latency[kind]
+        with self._lock:
+            return max(0.0, base * (1 + self._rng.uniform(-self.jitter, self.jitter)))
+
+    def _fail(self) -> Optional[int]:
+        with self._lock:
+            if self._rng.random() < self.error_rate:
+                return self._rng.choice((429, 500, 503))
+        return None
+
+    def _png(self, size) -> bytes:
+        with self._lock:
+            if size not in self._png_cache:
+                self._png_cache[size] = solid_png(size, (200, 120, 80))
+            return self._png_cache[size]
+
+    @staticmethod
+    def _send_json(handler, status: int, obj: dict, headers: Optional[dict] = None):
+        data = json.dumps(obj).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            handler.send_header(k, v)
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def handle(self, handler, body: bytes):
+        path = handler.path.split("?")[0]
+        kind = "chat" if path.endswith("/chat/completions") else "images"
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+        delay = self._delay(kind)
+        status = self._fail()
+        if status is not None:
+            time.sleep(delay * 0.1)
+            self._send_json(handler, status, {"error": {"message": "stub error", "type": "server_error"}},
+                            {"retry-after-ms": "50"} if status == 429 else None)
+            return
+        if kind == "chat":
+            time.sleep(delay)
+            self._chat(handler, json.loads(body or b"{}"))
+        elif path.endswith("/images/generations"):
+            request = json.loads(body or b"{}")
+            self._image(handler, request.get("size"), bool(request.get("stream")),
+                        int(request.get("partial_images") or 0), "image_generation", delay)
+        elif path.endswith("/images/edits"):
+            fields = dict(re.findall(rb'name="([a-z_]+)"\r\n\r\n([^\r]*)\r\n', body))
+            self._image(handler, fields.get(b"size", b"auto").decode(), fields.get(b"stream") == b"true",
+                        int(fields.get(b"partial_images", b"0")), "image_edit", delay)
+        else:
+            self._send_json(handler, 404, {"error": {"message": f"unknown path {path}"}})
+
+    def _chat(self, handler, request: dict):
+        decision = self.decisions.get(_router_prompt(request) or "") or route_decision({})
+        self._send_json(handler, 200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "tool_calls",
+                "message": {"role": "assistant", "content": None, "tool_calls": [{
+                    "id": "call_stub", "type": "function",
+                    "function": {"name": "route_scenario", "arguments": json.dumps(decision, ensure_ascii=False)},
+                }]},
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        })
+
+    def _image(self, handler, size: Optional[str], stream: bool, partials: int, prefix: str, delay: float):
+        w, _, h = (size or "").partition("x")
+        dims = (int(w), int(h)) if w.isdigit() and h.isdigit() else (1024, 1024)
+        final = base64.b64encode(self._png(dims)).decode()
+        if not stream:
+            time.sleep(delay)
+            self._send_json(handler, 200, {"created": int(time.time()), "data": [{"b64_json": final}]})
+            return
+        # partial image 는 지연 구간에 고르게 나눠 보내고 마지막에 완료 이미지
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+        preview = base64.b64encode(self._png((dims[0] // 4, dims[1] // 4))).decode()
+        events = [{"type": f"{prefix}.partial_image", "partial_image_index": i, "b64_json": preview}
+                  for i in range(partials)]
+        events.append({"type": f"{prefix}.completed", "b64_json": final})
+        for event in events:
+            time.sleep(delay / len(events))
+            chunk = f"data: {json.dumps(event)}\n\n".encode()
+            handler.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+            handler.wfile.flush()
+        handler.wfile.write(b"0\r\n\r\n")
+
+
+# ── 메시지 파일 ──────────────────────────────────────────────────────
+def load_cases(pattern: str) -> List[dict]:
+    cases = []
+    for path in sorted(glob.glob(pattern)):
+        with open(path, encoding="utf-8-sig") as f:
+            case = json.load(f)
+        case.setdefault("name", os.path.splitext(os.path.basename(path))[0])
+        cases.append(case)
+    return cases
+
+
+def to_task(case: dict, request_id: str, style_image_path: str) -> dict:
+    """메시지 파일(테스트 케이스 형식 또는 실제 요청 형식) → generation 요청 메시지"""
+    expected = case.get("expected") or {}
+    style_path = case.get("styleImagePath") or (style_image_path if expected.get("style_transfer") else "")
+    return {
+        "requestId": request_id,
+        "prompt": case.get("prompt", ""),
+        "imagesPath": case.get("imagesPath", case.get("uploads", [])),
+        "styleImageId": case.get("styleImageId", ""),
+        "styleImagePath": style_path,
+        "chat": case.get("chat", []),
+        "chatSummary": case.get("chatSummary", ""),
+        "preserveColor": bool(case.get("preserveColor", False)),
+    }
+
+
+# ── 실행 ──────────────────────────────────────────────────────────────
+def configure_env(stub: StubOpenAI):
+    """generation_consumer import 전에 외부 서비스 주소/저장소를 stand-in 으로 (직접 지정한 환경변수는 유지)"""
+    os.environ["OPENAI_BASE_URL"] = stub.base_url
+    os.environ["OPENAI_IMAGES_GENERATE_URL"] = f"{stub.base_url}/images/generations"
+    os.environ["OPENAI_IMAGES_EDIT_URL"] = f"{stub.base_url}/images/edits"
+    os.environ["OPENAI_API_KEY"] = "sk-loadtest"
+    os.environ["IMAGE_GENERATION_CHAT_REQUEST_QUEUE"] = REQUEST_QUEUE
+    os.environ["IMAGE_GENERATION_CHAT_RESPONSE_QUEUE"] = RESPONSE_QUEUE
+    os.environ.setdefault("IDEMPOTENT_BACKEND", "memory")
+    os.environ.setdefault("S3_BUCKET", "loadtest")
+    os.environ.setdefault("S3_CACHE_DIR", "")
+    os.environ.setdefault("ROUTE_CACHE_DB_PATH", "")
+    os.environ.setdefault("HTTP_METRICS_LOG_EVERY", "0")
+    os.environ.setdefault("IMAGE_GENERATION_ASYNC_CONFIRMS", "false")
+
+
+def run(args) -> dict:
+    recorder = StageRecorder()
+    cases = load_cases(args.messages)
+    if not cases:
+        raise SystemExit(f"메시지 파일 없음: {args.messages}")
+    decisions = {case.get("prompt", ""): route_decision(case) for case in cases}
+    stub = StubOpenAI(decisions, args.chat_latency, args.image_latency, args.jitter, args.error_rate,
+                      args.seed).start()
+    workdir = args.workdir or tempfile.mkdtemp(prefix="loadtest-")
+    configure_env(stub)
+    os.chdir(workdir)  # execute_image_task 의 outputs/ 를 작업 디렉토리에
+    sys.path.insert(0, HERE)
+
+    import generation_consumer as gc
+    import static.s3
+
+    static.s3._s3_client = LocalS3(os.path.join(workdir, "s3"), recorder, args.s3_latency,
+                                   placeholder_size=tuple(args.placeholder_size))
+
+    # 단계별 시간 측정 (module 전역을 감싸면 호출부가 그대로 측정 대상 호출)
+    gc.route_request = recorder.timed("route", gc.route_request)
+    gc.execute_image_task = recorder.timed("image", gc.execute_image_task)
+    gc.upload_to_s3 = recorder.timed("upload", gc.upload_to_s3)
+    original_openai_call = gc.openai_call
+
+    def openai_call(fn, idempotent, label="openai"):
+        return recorder.timed(f"openai {label}", original_openai_call)(fn, idempotent=idempotent, label=label)
+
+    gc.openai_call = openai_call
+
+    def style_transfer_stand_in(style_image_path, content_image, preserve_color=False, open_images=None,
+                                style_image=None):
+        started = time.perf_counter()
+        time.sleep(args.style_latency)
+        recorder.record("style_transfer", time.perf_counter() - started)
+        content_image.seek(0)
+        return BytesIO(content_image.read())
+
+    gc.do_style_transfer = style_transfer_stand_in
+
+    tracker = Tracker(recorder, args.count)
+    broker = FakeBroker(recorder, tracker)
+    if args.stage == "split":
+        gc.IMAGE_GENERATION_STAGE = "router"
+        broker.consume(REQUEST_QUEUE, gc.on_message, args.concurrency)
+        for queue in gc.executor_queues(list(gc.SUBTYPES)):
+            broker.consume(queue, gc.on_job, args.executor_concurrency or args.concurrency)
+    else:
+        gc.IMAGE_GENERATION_STAGE = "all"
+        broker.consume(REQUEST_QUEUE, gc.on_message, args.concurrency)
+
+    print(f"[정보] {len(cases)}개 메시지 파일, {args.count}건을 {args.rate}/s 로 재생 "
+          f"(stage={args.stage}, concurrency={args.concurrency}, workdir={workdir})")
+    started = time.perf_counter()
+    for i in range(args.count):
+        if args.rate > 0:
+            wait = started + i / args.rate - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+        request_id = f"loadtest-{i:05d}-{uuid.uuid4().hex[:8]}"
+        task = to_task(cases[i % len(cases)], request_id, args.style_image)
+        tracker.sent(request_id)
+        broker.publish(REQUEST_QUEUE, json.dumps(task, ensure_ascii=False))
+    send_elapsed = time.perf_counter() - started
+
+    if not tracker.done.wait(args.timeout):
+        print(f"[경고] timeout({args.timeout}s): {tracker.finished}/{args.count}건만 완료")
+    elapsed = time.perf_counter() - started
+    broker.close()
+    stub.stop()
+
+    return {
+        "sent": args.count,
+        "finished": tracker.finished,
+        "outcomes": tracker.outcomes,
+        "previews": tracker.previews,
+        "elapsed_sec": elapsed,
+        "offered_rate": args.count / send_elapsed if send_elapsed > 0 else None,
+        "throughput_per_sec": tracker.finished / elapsed if elapsed > 0 else 0.0,
+        "stub_requests": stub.requests,
+        "stages": recorder.summary(),
+    }
+
+
+def print_report(report: dict):
+    outcomes = ", ".join(f"{k} {v}" for k, v in sorted(report["outcomes"].items())) or "-"
+    print(f"[결과] 전송 {report['sent']}건 / 완료 {report['finished']}건 ({outcomes}) / 미리보기 {report['previews']}건")
+    offered = report["offered_rate"]
+    print(f"[결과] 처리량 {report['throughput_per_sec']:.2f} req/s ({report['elapsed_sec']:.1f}s)"
+          + (f", 전송 속도 {offered:.2f} req/s" if offered else ""))
+    print(f"{'stage':<32}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}  (ms)")
+    for stage, s in report["stages"].items():
+        print(f"{stage:<32}{s['count']:>7}{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}{s['p99_ms']:>10.1f}"
+              f"{s['max_ms']:>10.1f}")
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="오프라인 generation consumer 부하 테스트")
+    p.add_argument("--messages", default=os.path.join(HERE, "generation_test", "*.json"),
+                   help="재생할 메시지 파일 glob")
+    p.add_argument("--count", type=int, default=20, help="보낼 요청 수 (파일을 순환)")
+    p.add_argument("--rate", type=float, default=2.0, help="초당 전송 요청 수 (0 이면 한 번에)")
+    p.add_argument("--stage", choices=("all", "split"), default="all",
+                   help="all: 한 consumer, split: router 단계 + subtype 별 executor 단계")
+    p.add_argument("--concurrency", type=int,
+                   default=int(os.getenv("IMAGE_GENERATION_CHAT_CONCURRENCY", "4")),
+                   help="요청 큐 worker 수 (prefetch)")
+    p.add_argument("--executor-concurrency", type=int, default=0, help="split 일 때 executor 큐별 worker 수")
+    p.add_argument("--chat-latency", type=float, default=0.3, help="router LLM 응답 지연(초)")
+    p.add_argument("--image-latency", type=float, default=2.0, help="이미지 생성/편집 응답 지연(초)")
+    p.add_argument("--jitter", type=float, default=0.2, help="지연 변동 비율 (±)")
+    p.add_argument("--error-rate", type=float, default=0.0, help="OpenAI stub 이 429/500/503 을 돌려줄 확률")
+    p.add_argument("--s3-latency", type=float, default=0.02, help="S3 get/put 지연(초)")
+    p.add_argument("--style-latency", type=float, default=0.5, help="style transfer stand-in 지연(초)")
+    p.add_argument("--style-image", default="s3://bucket/style/loadtest-style.png",
+                   help="스타일 변환 케이스에 styleImagePath 가 없을 때 쓸 경로")
+    p.add_argument("--placeholder-size", type=int, nargs=2, default=[1600, 1200],
+                   help="없는 S3 key 에 만들어 줄 이미지 크기")
+    p.add_argument("--timeout", type=float, default=600.0, help="전체 완료 대기 시간(초)")
+    p.add_argument("--seed", type=int, default=None)
+    p.add_argument("--workdir", default="", help="S3 디렉토리/outputs 위치 (기본 임시 디렉토리)")
+    p.add_argument("--report", default="", help="결과 JSON 저장 경로")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report_path = os.path.abspath(args.report) if args.report else ""
+    report = run(args)
+    print_report(report)
+    if report_path:
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0 if report["finished"] == report["sent"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
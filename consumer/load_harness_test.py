@@ -0,0 +1,57 @@
+import json
+import os
+import subprocess
+import sys
+
+from load_harness import LocalS3, StageRecorder, percentile, route_decision, to_task
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_percentile_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([3.0], 95) == 3.0
+    assert percentile([], 50) == 0.0
+
+
+def test_route_decision_from_expected():
+    case = {"prompt": "합쳐줘", "uploads": ["s3://b/u.png"],
+            "expected": {"subtype": "edit", "base": {"path": "s3://b/gen.png"},
+                         "references": [{"path": "s3://b/u.png"}], "needs_clarification": False}}
+    decision = route_decision(case)
+    assert decision["base"] == {"source": "chat", "path": "s3://b/gen.png"}
+    assert decision["references"] == [{"source": "upload", "path": "s3://b/u.png"}]
+    assert decision["edit_instructions"] == "합쳐줘"
+    assert route_decision({"prompt": "호수", "expected": {"base": {"path": "None"}}})["base"] is None
+
+
+def test_style_cases_get_stand_in_style_image():
+    task = to_task({"prompt": "p", "uploads": ["a"], "expected": {"style_transfer": True}}, "r1", "s3://style.png")
+    assert task["requestId"] == "r1" and task["imagesPath"] == ["a"]
+    assert task["styleImagePath"] == "s3://style.png"
+
+
+def test_local_s3_round_trip(tmp_path):
+    s3 = LocalS3(str(tmp_path), StageRecorder(), placeholder_size=(8, 8))
+    s3.put_object(Bucket="b", Key="generated-images/a.png", Body=b"png")
+    assert s3.get_object(Bucket="b", Key="generated-images/a.png")["Body"].read() == b"png"
+    # 없는 key 는 placeholder 생성
+    assert s3.get_object(Bucket="b", Key="s3://bucket/user/x.png")["Body"].read().startswith(b"\x89PNG")
+
+
+def test_replay_reports_every_request(tmp_path):
+    report_path = tmp_path / "report.json"
+    args = ["--count", "6", "--rate", "0", "--concurrency", "3", "--chat-latency", "0.01", "--image-latency", "0.05",
+            "--style-latency", "0.01", "--s3-latency", "0", "--placeholder-size", "64", "64",
+            "--messages", os.path.join(HERE, "generation_test", "R5_*.json"),
+            "--workdir", str(tmp_path), "--report", str(report_path)]
+    subprocess.run([sys.executable, "load_harness.py"] + args, cwd=HERE, capture_output=True, text=True,
+                   check=True, timeout=120)
+
+    report = json.loads(report_path.read_text(encoding="utf-8"))
+    assert report["finished"] == report["sent"] == 6
+    assert report["outcomes"] == {"image": 6}
+    assert report["stages"]["end_to_end"]["count"] == 6
+    assert {"queue_wait", "image", "upload", "s3.put"} <= set(report["stages"])
@@ -0,0 +1,53 @@
+"""
+router LLM 앞단의 규칙 기반 pre-router.
+static/classifier_preprompt.py 규칙 중 prompt 내용 해석이 필요 없는(기계적으로 결정되는) 경우만
+로컬에서 처리하고, route_scenario 툴 출력과 같은 구조의 args를 돌려준다. 그 외는 None → LLM.
+
+- R1: 업로드 있음 + prompt 비어있음 → style_transfer, base=uploads[0]
+  (R / R0 / 특수 예외는 모두 prompt 내용에 의존하므로 prompt가 비어 있으면 해당될 수 없음)
+- 공통 예외: 업로드 없음 + prompt 비어있음 → needs_clarification
+- 공통 예외: prompt에 글자가 하나도 없음(예: "123!!!@@?") → needs_clarification
+"""
+from typing import Dict, List, Optional
+
+EMPTY_REQUEST_REASON = "요청 내용이 비어 있어요. 새로 만들 이미지나 편집하고 싶은 내용을 문장으로 알려주세요."
+UNREADABLE_REQUEST_REASON = ("입력하신 내용을 이해하지 못했어요. 숫자나 기호만으로는 작업을 정할 수 없으니, "
+                             "원하는 이미지나 수정 사항을 문장으로 설명해 주세요.")
+
+
+def _clarify(reason: str, chat_summary: str, signal: str) -> Dict:
+    return {
+        "subtype": "generate",
+        "needs_clarification": True,
+        "reason": reason,
+        "references": [],
+        "style_transfer": False,
+        "signals": [signal],
+        "chat_summary": chat_summary,
+    }
+
+
+def route_locally(prompt: str, uploads: List[str], chat_summary: str = "") -> Optional[Dict]:
+    """기계적으로 결정 가능한 요청이면 route_scenario args, 아니면 None"""
+    text = (prompt or "").strip()
+    uploads = [u for u in (uploads or []) if u]
+
+    if not text and uploads:
+        return {
+            "subtype": "style_transfer",
+            "base": {"source": "upload", "index": 0, "path": uploads[0]},
+            "references": [],
+            "style_transfer": True,
+            "needs_clarification": False,
+            "image_description": "업로드 이미지 스타일 변환",
+            "signals": ["R1: 업로드만 있고 prompt 비어있음"],
+            "chat_summary": chat_summary,
+        }
+
+    if not text:
+        return _clarify(EMPTY_REQUEST_REASON, chat_summary, "공통 예외: 업로드/prompt 모두 없음")
+
+    if not any(ch.isalpha() for ch in text):
+        return _clarify(UNREADABLE_REQUEST_REASON, chat_summary, "공통 예외: prompt에 글자가 없음")
+
+    return None
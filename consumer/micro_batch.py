@@ -0,0 +1,72 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Sequence
+
+
+class MicroBatcher:
+    """
+    여러 호출자의 요청을 모아 한 번에 처리하는 단일 스레드 batch 실행기 (GPU 모델 추론용).
+    - submit(item) → Future. 호출 스레드(pika connection 스레드 등)는 막히지 않음
+    - 첫 요청이 들어온 뒤 max_wait_sec 동안 또는 max_batch_size 개가 모일 때까지 기다렸다가
+      run_batch(items) 를 한 번 호출 → 결과 리스트를 요청 순서대로 각 Future 에 전달
+    - run_batch 가 예외를 던지면 그 batch 의 모든 Future 에 같은 예외
+    """
+
+    def __init__(self, run_batch: Callable[[List[object]], Sequence[object]], max_batch_size: int,
+                 max_wait_sec: float, name: str = "micro-batch"):
+        self._run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_sec = max_wait_sec
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._stop = threading.Event()
+        self.batches = 0
+        self.items = 0
+        self._thread = threading.Thread(target=self._loop, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, item) -> Future:
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _collect(self) -> List[tuple]:
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.max_wait_sec
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while not self._stop.is_set():
+            batch = self._collect()
+            if not batch:
+                continue
+            # 대기 중 취소된 요청은 제외
+            batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                results = self._run_batch([item for item, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"batch 결과 수 불일치: {len(results)} != {len(batch)}")
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=2)
@@ -0,0 +1,38 @@
+import threading
+
+import pytest
+
+from micro_batch import MicroBatcher
+
+
+def test_requests_from_many_callers_share_batches():
+    sizes = []
+    release = threading.Event()
+
+    def run_batch(items):
+        release.wait(2)  # 첫 batch 처리 중에 나머지 요청이 쌓이도록
+        sizes.append(len(items))
+        return [item * 10 for item in items]
+
+    batcher = MicroBatcher(run_batch, max_batch_size=4, max_wait_sec=0.05)
+    try:
+        futures = [batcher.submit(i) for i in range(9)]
+        release.set()
+        assert [f.result(timeout=5) for f in futures] == [i * 10 for i in range(9)]
+    finally:
+        batcher.close()
+    assert sum(sizes) == 9 and max(sizes) <= 4 and len(sizes) < 9
+
+
+def test_batch_failure_is_reported_to_every_caller():
+    def run_batch(items):
+        raise RuntimeError("gpu")
+
+    batcher = MicroBatcher(run_batch, max_batch_size=2, max_wait_sec=0.05)
+    try:
+        futures = [batcher.submit(i) for i in range(2)]
+        for future in futures:
+            with pytest.raises(RuntimeError):
+                future.result(timeout=5)
+    finally:
+        batcher.close()
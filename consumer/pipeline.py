@@ -0,0 +1,69 @@
+"""
+generation 파이프라인의 router 단계 → executor 단계 내부 큐 메시지.
+
+router 단계는 LLM 라우팅만 하고 clarify 응답은 바로 publish, 이미지 작업은 subtype 별 큐
+(<prefix>.generate / .edit / .style_transfer)에 job 으로 넘긴다.
+→ 몇 분 걸리는 생성/편집 작업 뒤에 짧은 clarify 응답이 줄 서지 않고, executor 는 subtype 별로 따로 확장.
+job 에는 실행과 응답 구성에 필요한 값이 모두 들어 있어 executor 는 router 결정을 다시 계산하지 않는다.
+"""
+import json
+from typing import List, Optional
+
+from static.rabbitmq import IMAGE_GENERATION_EXECUTE_QUEUE_PREFIX
+
+SUBTYPES = ("generate", "edit", "style_transfer")
+JOB_VERSION = 1
+
+# execute_image_task 인자 중 job 으로 전달하는 값 (open_images 같은 프로세스 내 객체는 제외)
+PAYLOAD_KEYS = ("prompt", "subtype", "base_path", "extra_refs", "generate_instructions", "edit_instructions",
+                "style_transfer", "style_image_path", "preserve_color")
+# 최종 응답 구성용 값
+RESULT_KEYS = ("description", "style_transfer", "chat_summary", "from_origin_image")
+
+
+def execute_queue(subtype: str, prefix: str = IMAGE_GENERATION_EXECUTE_QUEUE_PREFIX) -> str:
+    if subtype not in SUBTYPES:
+        raise ValueError(f"알 수 없는 subtype: {subtype}")
+    return f"{prefix}.{subtype}"
+
+
+def executor_queues(subtypes: List[str], prefix: str = IMAGE_GENERATION_EXECUTE_QUEUE_PREFIX) -> List[str]:
+    """executor 가 소비할 큐 목록 (중복 제거, 순서 유지)"""
+    queues = []
+    for subtype in subtypes:
+        queue = execute_queue(subtype, prefix)
+        if queue not in queues:
+            queues.append(queue)
+    return queues
+
+
+def retry_queue(queue: str) -> str:
+    """executor 큐에서 NACK 된 job 이 대기하는 큐 (DLX 라우팅 키도 같은 이름)"""
+    return f"{queue}.retry"
+
+
+def rejected_count(headers: Optional[dict]) -> int:
+    """x-death 헤더에서 NACK(rejected) 으로 dead-letter 된 횟수 (retry 큐 만료는 제외)"""
+    deaths = (headers or {}).get("x-death") or []
+    return sum(int(d.get("count", 1)) for d in deaths if d.get("reason") == "rejected")
+
+
+def encode_job(request_id: str, payload: dict, result: dict) -> bytes:
+    job = {
+        "version": JOB_VERSION,
+        "requestId": request_id,
+        "payload": {k: payload.get(k) for k in PAYLOAD_KEYS},
+        "result": {k: result.get(k) for k in RESULT_KEYS},
+    }
+    return json.dumps(job, ensure_ascii=False).encode("utf-8")
+
+
+def decode_job(body: bytes) -> dict:
+    job = json.loads(body.decode("utf-8"))
+    if job.get("version") != JOB_VERSION:
+        raise ValueError(f"지원하지 않는 job version: {job.get('version')}")
+    if not job.get("requestId"):
+        raise ValueError("job 에 requestId 없음")
+    if job.get("payload", {}).get("subtype") not in SUBTYPES:
+        raise ValueError(f"job subtype 오류: {job.get('payload', {}).get('subtype')}")
+    return job
@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+from pipeline import decode_job, encode_job, execute_queue, executor_queues, rejected_count, retry_queue
+
+
+def test_execute_queue_names_per_subtype():
+    assert execute_queue("generate", prefix="ai.image.execute") == "ai.image.execute.generate"
+    assert executor_queues(["edit", "style_transfer", "edit"], prefix="q") == ["q.edit", "q.style_transfer"]
+    with pytest.raises(ValueError):
+        execute_queue("upscale")
+
+
+def test_job_round_trip_drops_process_local_values():
+    payload = {"prompt": "고양이", "subtype": "edit", "base_path": "/u/1.png", "extra_refs": ["/u/2.png"],
+               "generate_instructions": None, "edit_instructions": "배경을 바다로", "style_transfer": False,
+               "style_image_path": "", "preserve_color": False, "open_images": object()}
+    result = {"description": "바다 배경 고양이", "style_transfer": False, "chat_summary": "요약",
+              "from_origin_image": True}
+
+    job = decode_job(encode_job("req-1", payload, result))
+
+    assert job["requestId"] == "req-1"
+    assert "open_images" not in job["payload"]
+    assert job["payload"]["edit_instructions"] == "배경을 바다로"
+    assert job["result"] == result
+
+
+def test_decode_job_rejects_invalid_messages():
+    with pytest.raises(ValueError):
+        decode_job(json.dumps({"version": 1, "requestId": "r", "payload": {"subtype": "upscale"}}).encode())
+    with pytest.raises(ValueError):
+        decode_job(json.dumps({"version": 99, "requestId": "r", "payload": {"subtype": "edit"}}).encode())
+    with pytest.raises(ValueError):
+        decode_job(json.dumps({"version": 1, "payload": {"subtype": "edit"}}).encode())
+
+
+def test_rejected_count_ignores_retry_queue_expiry():
+    assert retry_queue("q.edit") == "q.edit.retry"
+    assert rejected_count(None) == 0
+    assert rejected_count({}) == 0
+    headers = {"x-death": [{"queue": "q.edit", "reason": "rejected", "count": 2},
+                           {"queue": "q.edit.retry", "reason": "expired", "count": 2}]}
+    assert rejected_count(headers) == 2
@@ -0,0 +1,70 @@
+from concurrent.futures import Executor, Future
+from io import BytesIO
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# fetch(path) -> (파일명, bytes, content-type)
+Fetch = Callable[[str], Tuple[str, bytes, str]]
+
+
+def likely_image_paths(uploads: list, chat_images: list, style_image_path: Optional[str], limit: int) -> list:
+    """
+    router 결정 전에 미리 받을 이미지: base 후보(uploads[0], 최신 chat 이미지) → style → 나머지 업로드(ref 후보)
+    chat_images 는 recent_chat 순서(index 0 이 최신)
+    """
+    candidates = uploads[:1] + [c["path"] for c in chat_images[:1]] + [style_image_path] + uploads[1:]
+    paths = []
+    for p in candidates:
+        # https URL 은 S3 키가 아니므로 제외
+        if p and not p.startswith(("http://", "https://")) and p not in paths:
+            paths.append(p)
+    return paths[:limit]
+
+
+class ImagePrefetcher:
+    """
+    router LLM 호출 중에 base/reference/style 이 될 가능성이 높은 이미지를 미리 받아 둔다.
+    - start(paths): 백그라운드 다운로드 시작 (같은 path 는 한 번만)
+    - open(path): open_binary 와 같은 (파일명, BytesIO, content-type) 반환.
+      미리 받은 path 면 그 결과를, 아니면(또는 prefetch 실패 시) 바로 다운로드
+    - open_many(paths): open_binaries 대체 (base/mask/style 등을 한 번에)
+    - discard(): 요청 처리가 끝나면 쓰지 않은 다운로드는 취소/폐기
+    요청(메시지) 하나에 인스턴스 하나. 다운로드 스레드는 공유 executor 사용.
+    """
+
+    def __init__(self, fetch: Fetch, executor: Executor):
+        self._fetch = fetch
+        self._executor = executor
+        self._futures: Dict[str, Future] = {}
+        self._used: Set[str] = set()
+
+    def start(self, paths: Iterable[str]) -> "ImagePrefetcher":
+        for path in paths:
+            if path and path not in self._futures:
+                self._futures[path] = self._executor.submit(self._fetch, path)
+        return self
+
+    def open(self, path: str):
+        future = self._futures.get(path)
+        if future is not None and not future.cancelled():
+            try:
+                fname, data, ctype = future.result()
+                self._used.add(path)
+                return fname, BytesIO(data), ctype
+            except Exception as e:
+                print(f"[경고] prefetch 실패, 직접 다운로드: {path} ({e})")
+        fname, data, ctype = self._fetch(path)
+        return fname, BytesIO(data), ctype
+
+    def open_many(self, paths: List[str]):
+        """open_binaries 와 같은 일괄 로더. 아직 시작하지 않은 path 도 동시에 받은 뒤 요청 순서대로 반환"""
+        self.start(paths)
+        return [self.open(p) for p in paths]
+
+    def discard(self) -> int:
+        """사용하지 않은 prefetch 를 취소/폐기하고 그 수를 반환"""
+        unused = [p for p in self._futures if p not in self._used]
+        for path in unused:
+            self._futures[path].cancel()
+        self._futures.clear()
+        self._used.clear()
+        return len(unused)
@@ -0,0 +1,57 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from prefetch import ImagePrefetcher, likely_image_paths
+from router_context import build_router_content
+
+
+class FakeS3:
+    def __init__(self, fail=()):
+        self.calls = []
+        self.fail = set(fail)
+        self._lock = threading.Lock()
+
+    def __call__(self, path):
+        with self._lock:
+            self.calls.append(path)
+        if path in self.fail:
+            raise IOError("download failed")
+        return path.rsplit("/", 1)[-1], path.encode(), "image/png"
+
+
+def test_prefetched_bytes_are_reused():
+    s3 = FakeS3()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        prefetcher = ImagePrefetcher(s3, executor).start(["u/a.png", "g/b.png", "u/a.png"])
+        for _ in range(2):  # 같은 이미지를 여러 번 열어도 매번 새 BytesIO
+            name, fh, ctype = prefetcher.open("u/a.png")
+            assert (name, fh.read(), ctype) == ("a.png", b"u/a.png", "image/png")
+        assert prefetcher.open("s/style.png")[1].read() == b"s/style.png"  # prefetch 안 한 이미지는 직접
+        assert prefetcher.discard() == 1  # g/b.png 는 사용되지 않음
+    assert s3.calls.count("u/a.png") == 1  # 중복 path 는 한 번만 다운로드
+    assert "s/style.png" in s3.calls       # g/b.png 는 실행 전이면 취소됨
+
+
+def test_failed_prefetch_falls_back_to_direct_fetch():
+    s3 = FakeS3(fail={"u/a.png"})
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        prefetcher = ImagePrefetcher(s3, executor).start(["u/a.png"])
+        prefetcher._futures["u/a.png"].exception()  # prefetch 실패 대기
+        s3.fail.clear()
+        assert prefetcher.open("u/a.png")[1].read() == b"u/a.png"
+    assert s3.calls == ["u/a.png", "u/a.png"]
+
+
+def test_likely_paths_prefetch_newest_chat_image():
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "generation_test",
+                           "R2_스타일전용_최근AI이미지.json"), encoding="utf-8-sig") as f:
+        case = json.load(f)  # chat 은 index 0 이 최신
+    for turn in case["chat"]:
+        for c in turn["contents"]:
+            c.setdefault("fromOriginImage", False)
+    _, chat_images, _, _ = build_router_content(case["prompt"], case["uploads"], case["chat"], "")
+    paths = likely_image_paths(case["uploads"], chat_images, "s/style.png", limit=4)
+    assert paths == [case["expected"]["base"]["path"], "s/style.png"]
+    assert likely_image_paths(["u/1.png", "https://x/y.png"], [], None, limit=4) == ["u/1.png"]
@@ -0,0 +1,58 @@
+import threading
+from concurrent.futures import Executor, Future
+from typing import Callable, List
+
+
+class PreviewPublisher:
+    """
+    요청 하나의 미리보기(partial image) 업로드 + 진행 메시지 publish.
+    - __call__(index, data): 이미지 스트림을 읽는 스레드를 막지 않도록 공유 executor 에서 처리
+    - 미리보기는 받은 순서대로 처리 (앞 미리보기가 끝난 뒤 다음 것)
+    - close(): 최종 결과를 publish 하기 전에 호출 → 아직 시작하지 않은 미리보기는 버리고,
+      진행 중인 것은 끝날 때까지 기다려 최종 결과보다 늦게 도착하는 미리보기가 없도록 함
+    미리보기는 best effort 라 실패해도 로그만 남긴다.
+    """
+
+    def __init__(self, handle: Callable[[int, bytes], None], executor: Executor):
+        self._handle = handle
+        self._executor = executor
+        self._submit_lock = threading.Lock()
+        self._publish_lock = threading.Lock()  # handle 실행과 close 사이 순서 보장
+        self._closed = False
+        self._last: Future = None
+        self._futures: List[Future] = []
+        self.published = 0
+
+    def __call__(self, index: int, data: bytes):
+        with self._submit_lock:
+            if self._closed:
+                return
+            previous = self._last
+            self._last = self._executor.submit(self._run, previous, index, data)
+            self._futures.append(self._last)
+
+    def _run(self, previous: Future, index: int, data: bytes):
+        if previous is not None:
+            try:
+                previous.result()
+            except Exception:
+                pass
+        with self._publish_lock:
+            if self._closed:
+                return
+            try:
+                self._handle(index, data)
+                self.published += 1
+            except Exception as e:
+                print(f"[경고] 미리보기 {index} publish 실패(무시): {e}")
+
+    def close(self) -> int:
+        """이후 미리보기 publish 중단. publish 된 미리보기 수 반환"""
+        with self._submit_lock:
+            self._closed = True
+            futures = list(self._futures)
+        for future in futures:
+            future.cancel()
+        with self._publish_lock:  # 진행 중인 미리보기 publish 가 끝날 때까지 대기
+            pass
+        return self.published
@@ -0,0 +1,60 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from previews import PreviewPublisher
+
+
+def test_previews_published_in_order():
+    published = []
+
+    def handle(index, data):
+        time.sleep(0.02 if index == 0 else 0)  # 첫 미리보기가 더 오래 걸려도 순서 유지
+        published.append(index)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        previews = PreviewPublisher(handle, executor)
+        for i in range(3):
+            previews(i, b"png")
+        time.sleep(0.2)
+        assert previews.close() == 3
+    assert published == [0, 1, 2]
+
+
+def test_close_waits_for_running_preview_and_drops_pending():
+    started, release = threading.Event(), threading.Event()
+    published = []
+
+    def handle(index, data):
+        started.set()
+        release.wait(2)
+        published.append(index)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        previews = PreviewPublisher(handle, executor)
+        previews(0, b"png")
+        previews(1, b"png")
+        started.wait(2)
+        threading.Timer(0.05, release.set).start()
+        count = previews.close()
+        # close 가 반환된 뒤에는 더 이상 publish 되지 않음 (최종 결과보다 늦은 미리보기 없음)
+        assert published == [0] and count == 1
+        previews(2, b"png")
+    assert published == [0]
+
+
+def test_failed_preview_is_skipped():
+    published = []
+
+    def handle(index, data):
+        if index == 0:
+            raise OSError("s3 down")
+        published.append(index)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        previews = PreviewPublisher(handle, executor)
+        previews(0, b"png")
+        previews(1, b"png")
+        time.sleep(0.1)
+        assert previews.close() == 1
+    assert published == [1]
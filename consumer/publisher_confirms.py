@@ -0,0 +1,142 @@
+"""
+비동기 publisher confirm + 입력 메시지 ack 묶음 처리.
+
+channel.confirm_delivery()(blocking) 는 publish 마다 broker 왕복을 connection 스레드에서 기다리므로
+응답 publish 와 입력 ack 가 모두 직렬화된다. 여기서는
+- publish 는 바로 보내고 confirm delivery tag(1부터 증가) → 대기 항목으로 기록
+- Basic.Ack(multiple 포함) 가 오면 해당 응답들의 입력 메시지를 ack
+  (앞선 입력 메시지가 모두 끝났으면 basic_ack(multiple=True) 한 번으로)
+- Basic.Nack 이면 backoff 후 재전송, max_retries 를 넘으면 입력 메시지 nack(DLX)
+입력 ack 는 confirm 이후에만 하므로 at-least-once 는 그대로 (연결이 끊기면 ack 안 된 입력이 재전달됨).
+모든 메서드는 connection 스레드에서만 호출한다 (lock 없음).
+"""
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from resilience import backoff_delay
+
+
+class _Pending:
+    __slots__ = ("routing_key", "body", "input_tag", "attempt", "on_confirmed", "on_failed")
+
+    def __init__(self, routing_key, body, input_tag, on_confirmed, on_failed):
+        self.routing_key = routing_key
+        self.body = body
+        self.input_tag = input_tag
+        self.attempt = 1
+        self.on_confirmed = on_confirmed
+        self.on_failed = on_failed
+
+
+class AckBatcher:
+    """
+    입력 메시지 ack 묶기. 받은 순서(delivery tag 순)대로 처리 중인 tag 를 추적하고,
+    가장 오래된 것부터 연속으로 끝난 tag 들은 basic_ack(마지막 tag, multiple=True) 한 번으로 ack.
+    앞선 메시지가 아직 처리 중이면 끝난 tag 는 개별 ack (prefetch 슬롯을 오래 잡지 않도록)
+    """
+
+    def __init__(self, ack: Callable[[int, bool], None]):
+        self._ack = ack
+        self._outstanding: "OrderedDict[int, bool]" = OrderedDict()  # tag -> ack 준비됨
+        self.acks_sent = 0
+
+    def delivered(self, tag: int):
+        self._outstanding[tag] = False
+
+    def discard(self, tag: int):
+        """다른 경로로 ack/nack 된 입력"""
+        self._outstanding.pop(tag, None)
+
+    def done(self, tags: List[int]):
+        for tag in tags:
+            if tag in self._outstanding:
+                self._outstanding[tag] = True
+            else:
+                self._ack(tag, False)  # 추적하지 않던 tag (delivered 누락 시에도 ack 는 보장)
+                self.acks_sent += 1
+        # 가장 오래된 것부터 연속으로 끝난 구간 → multiple ack 한 번
+        prefix = []
+        for tag, ready in self._outstanding.items():
+            if not ready:
+                break
+            prefix.append(tag)
+        if prefix:
+            for tag in prefix:
+                del self._outstanding[tag]
+            self._ack(prefix[-1], len(prefix) > 1)
+            self.acks_sent += 1
+        # 나머지 끝난 tag 는 개별 ack
+        for tag in [t for t in tags if self._outstanding.get(t)]:
+            del self._outstanding[tag]
+            self._ack(tag, False)
+            self.acks_sent += 1
+
+
+class AsyncPublisher:
+    def __init__(self, publish: Callable[[str, bytes], None], ack: Callable[[int, bool], None],
+                 nack: Callable[[int], None], call_later: Callable[[float, Callable[[], None]], None],
+                 max_retries: int = 3):
+        """
+        publish(routing_key, body): confirm 모드 channel 에 보내기만 함 (기다리지 않음)
+        ack(input_tag, multiple) / nack(input_tag): 입력 메시지 ack / nack(requeue=False)
+        call_later(delay, fn): 재전송 예약 (connection 스레드에서 실행)
+        """
+        self._publish = publish
+        self._nack = nack
+        self._call_later = call_later
+        self.max_retries = max_retries
+        self.acks = AckBatcher(ack)
+        self._next_tag = 0
+        self._pending: Dict[int, _Pending] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def publish_and_ack(self, routing_key: str, body, input_tag: Optional[int],
+                        on_confirmed: Optional[Callable[[], None]] = None,
+                        on_failed: Optional[Callable[[], None]] = None):
+        """
+        응답 publish → confirm 되면 on_confirmed() 후 입력 ack, 최종 실패면 on_failed() 후 입력 nack.
+        input_tag=None 이면 publish 만 (입력 ack/nack 없음)
+        """
+        self._send(_Pending(routing_key, body, input_tag, on_confirmed, on_failed))
+
+    def _send(self, item: _Pending):
+        try:
+            self._publish(item.routing_key, item.body)
+        except Exception as e:
+            print(f"[경고] publish 실패({item.attempt}/{self.max_retries}): {e}")
+            self._retry(item)
+            return
+        self._next_tag += 1
+        self._pending[self._next_tag] = item
+
+    def _retry(self, item: _Pending):
+        if item.attempt >= self.max_retries:
+            print("[에러] publish 실패 → DLX로 이동")
+            if item.on_failed:
+                item.on_failed()
+            if item.input_tag is not None:
+                self.acks.discard(item.input_tag)
+                self._nack(item.input_tag)
+            return
+        delay = backoff_delay(item.attempt)
+        item.attempt += 1
+        self._call_later(delay, lambda: self._send(item))
+
+    def on_confirm(self, delivery_tag: int, multiple: bool, ack: bool):
+        """broker 의 Basic.Ack / Basic.Nack"""
+        if multiple:
+            tags = [t for t in self._pending if t <= delivery_tag]
+        else:
+            tags = [delivery_tag] if delivery_tag in self._pending else []
+        items = [self._pending.pop(t) for t in tags]
+        if not ack:
+            for item in items:
+                print(f"[경고] broker 가 publish 거부(nack) ({item.attempt}/{self.max_retries})")
+                self._retry(item)
+            return
+        for item in items:
+            if item.on_confirmed:
+                item.on_confirmed()
+        self.acks.done([item.input_tag for item in items if item.input_tag is not None])
@@ -0,0 +1,102 @@
+from publisher_confirms import AckBatcher, AsyncPublisher
+
+
+class FakeChannel:
+    def __init__(self, fail_publishes=0):
+        self.published = []
+        self.acks = []
+        self.nacks = []
+        self.scheduled = []
+        self.fail_publishes = fail_publishes
+
+    def publish(self, routing_key, body):
+        if self.fail_publishes:
+            self.fail_publishes -= 1
+            raise OSError("channel closed")
+        self.published.append((routing_key, body))
+
+    def ack(self, tag, multiple):
+        self.acks.append((tag, multiple))
+
+    def nack(self, tag):
+        self.nacks.append(tag)
+
+    def call_later(self, delay, fn):
+        self.scheduled.append(fn)
+
+    def run_scheduled(self):
+        scheduled, self.scheduled = self.scheduled, []
+        for fn in scheduled:
+            fn()
+
+
+def _publisher(ch, max_retries=3):
+    return AsyncPublisher(ch.publish, ch.ack, ch.nack, ch.call_later, max_retries=max_retries)
+
+
+def test_multiple_confirm_acks_contiguous_inputs_once():
+    ch = FakeChannel()
+    pub = _publisher(ch)
+    done = []
+    for tag in (1, 2, 3):
+        pub.acks.delivered(tag)
+        pub.publish_and_ack("resp", b"%d" % tag, tag, on_confirmed=lambda t=tag: done.append(t))
+
+    assert ch.acks == []  # confirm 전에는 입력 ack 없음
+    pub.on_confirm(3, multiple=True, ack=True)
+
+    assert done == [1, 2, 3]
+    assert ch.acks == [(3, True)]
+    assert len(pub) == 0
+
+
+def test_confirm_out_of_order_acks_individually_while_older_input_is_busy():
+    ch = FakeChannel()
+    pub = _publisher(ch)
+    for tag in (1, 2):
+        pub.acks.delivered(tag)
+    pub.publish_and_ack("resp", b"2", 2)  # 입력 1 은 아직 처리 중
+
+    pub.on_confirm(1, multiple=False, ack=True)
+    assert ch.acks == [(2, False)]
+
+    pub.publish_and_ack("resp", b"1", 1)
+    pub.on_confirm(2, multiple=False, ack=True)
+    assert ch.acks == [(2, False), (1, False)]
+
+
+def test_nack_is_retried_then_input_goes_to_dlx():
+    ch = FakeChannel()
+    pub = _publisher(ch, max_retries=2)
+    failed = []
+    pub.acks.delivered(7)
+    pub.publish_and_ack("resp", b"x", 7, on_failed=lambda: failed.append(7))
+
+    pub.on_confirm(1, multiple=False, ack=False)
+    ch.run_scheduled()  # backoff 후 재전송
+    assert len(ch.published) == 2 and failed == []
+
+    pub.on_confirm(2, multiple=False, ack=False)
+    assert failed == [7] and ch.nacks == [7] and ch.acks == []
+
+
+def test_publish_error_is_retried_with_backoff():
+    ch = FakeChannel(fail_publishes=1)
+    pub = _publisher(ch)
+    pub.acks.delivered(1)
+    pub.publish_and_ack("resp", b"x", 1)
+    assert ch.published == [] and len(ch.scheduled) == 1
+
+    ch.run_scheduled()
+    pub.on_confirm(1, multiple=False, ack=True)
+    assert ch.acks == [(1, False)]
+
+
+def test_ack_batcher_skips_inputs_acked_elsewhere():
+    acks = []
+    batcher = AckBatcher(lambda tag, multiple: acks.append((tag, multiple)))
+    for tag in (1, 2, 3):
+        batcher.delivered(tag)
+    batcher.discard(1)  # clarify 등으로 이미 개별 ack
+    batcher.done([2, 3])
+    assert acks == [(3, True)]
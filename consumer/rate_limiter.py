@@ -0,0 +1,141 @@
+"""
+OpenAI 호출용 client 측 rate limiter (프로세스 내 모든 worker 스레드 공유).
+
+model/endpoint 별로
+- token bucket: 분당 요청 수(RPM). 응답의 x-ratelimit-limit-requests 로 갱신
+- 동시 요청 수: AIMD (성공 시 +1/limit, 429 시 절반)
+- 일시 정지: 429 의 Retry-After, 또는 x-ratelimit-remaining-requests == 0 이면 x-ratelimit-reset-requests 까지
+한도에 걸린 요청은 실패시키지 않고 대기열에서 기다린다 (max_wait_sec 초과 시에만 TimeoutError).
+"""
+import re
+import threading
+import time
+from typing import Callable, Dict, Mapping, Optional
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """'1s', '6m0s', '20ms', '1.5' 같은 값을 초로 변환"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION.findall(value)
+    if not parts:
+        return None
+    return sum(float(n) * _UNITS[unit] for n, unit in parts)
+
+
+class AdaptiveLimiter:
+    def __init__(self, rpm: float, initial_concurrency: int, max_concurrency: int, min_concurrency: int = 1,
+                 max_wait_sec: float = 600, default_backoff_sec: float = 1.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = rpm / 60.0
+        self.capacity = max(1.0, self.rate)  # 최대 1초치 burst
+        self.limit = float(initial_concurrency)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.max_wait_sec = max_wait_sec
+        self.default_backoff_sec = default_backoff_sec
+        self.clock = clock
+        self._cond = threading.Condition()
+        self._tokens = self.capacity
+        self._refilled_at = clock()
+        self._paused_until = 0.0
+        self.in_flight = 0
+        self.waiting = 0
+        self.throttled = 0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _wait_time(self, now: float) -> Optional[float]:
+        """바로 보낼 수 있으면 0, 시간이 지나면 풀리면 그 시간, 다른 요청 완료를 기다려야 하면 None"""
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self.in_flight >= int(self.limit):
+            return None
+        if self._tokens < 1:
+            return (1 - self._tokens) / self.rate if self.rate > 0 else None
+        return 0.0
+
+    def acquire(self):
+        with self._cond:
+            deadline = self.clock() + self.max_wait_sec
+            self.waiting += 1
+            try:
+                while True:
+                    now = self.clock()
+                    self._refill(now)
+                    wait = self._wait_time(now)
+                    if wait == 0.0:
+                        self._tokens -= 1
+                        self.in_flight += 1
+                        return
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise TimeoutError(f"rate limit 대기 시간 초과({self.max_wait_sec}s)")
+                    self._cond.wait(remaining if wait is None else min(wait, remaining))
+            finally:
+                self.waiting -= 1
+
+    def release(self, status_code: Optional[int] = None, headers: Optional[Mapping[str, str]] = None):
+        """요청 완료 보고. status_code=None 은 네트워크 오류(한도 조정 없음)"""
+        headers = headers or {}
+        with self._cond:
+            now = self.clock()
+            self.in_flight -= 1
+            if status_code == 429:
+                self.throttled += 1
+                self.limit = max(float(self.min_concurrency), self.limit / 2)
+                pause = parse_duration(headers.get("retry-after")) or self.default_backoff_sec
+                self._paused_until = max(self._paused_until, now + pause)
+                self._tokens = 0.0
+            elif status_code is not None and status_code < 500:
+                self.limit = min(float(self.max_concurrency), self.limit + 1.0 / self.limit)
+            self._apply_headers(headers, now)
+            self._cond.notify_all()
+
+    def _apply_headers(self, headers: Mapping[str, str], now: float):
+        limit_rpm = headers.get("x-ratelimit-limit-requests")
+        if limit_rpm and limit_rpm.isdigit() and int(limit_rpm) > 0:
+            # 서버가 알려 준 분당 한도에 맞춤
+            self.rate = int(limit_rpm) / 60.0
+            self.capacity = max(1.0, self.rate)
+        remaining = headers.get("x-ratelimit-remaining-requests")
+        if remaining is not None and remaining.strip() == "0":
+            reset = parse_duration(headers.get("x-ratelimit-reset-requests"))
+            if reset:
+                self._paused_until = max(self._paused_until, now + reset)
+
+    def stats(self) -> Dict[str, float]:
+        with self._cond:
+            return {"limit": self.limit, "rpm": self.rate * 60, "in_flight": self.in_flight,
+                    "waiting": self.waiting, "throttled": self.throttled}
+
+
+class LimiterRegistry:
+    """key(model/endpoint) 별 AdaptiveLimiter"""
+
+    def __init__(self, factory: Callable[[], AdaptiveLimiter]):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._limiters: Dict[str, AdaptiveLimiter] = {}
+
+    def get(self, key: str) -> AdaptiveLimiter:
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                limiter = self._limiters[key] = self._factory()
+            return limiter
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {key: limiter.stats() for key, limiter in limiters.items()}
@@ -0,0 +1,62 @@
+import threading
+import time
+
+from rate_limiter import AdaptiveLimiter, parse_duration
+
+
+def _limiter(**kwargs):
+    options = dict(rpm=60000, initial_concurrency=4, max_concurrency=8, max_wait_sec=5)
+    options.update(kwargs)
+    return AdaptiveLimiter(**options)
+
+
+def test_parse_duration():
+    assert parse_duration("2") == 2.0
+    assert parse_duration("1s") == 1.0
+    assert parse_duration("6m0s") == 360.0
+    assert parse_duration("20ms") == 0.02
+    assert parse_duration("") is None
+    assert parse_duration("soon") is None
+
+
+def test_aimd_concurrency():
+    limiter = _limiter()
+    limiter.acquire()
+    limiter.release(200)
+    assert limiter.limit == 4.25  # +1/limit
+
+    limiter.acquire()
+    limiter.release(429, {"retry-after": "0"})
+    assert limiter.limit == 2.125  # 절반
+    assert limiter.stats()["throttled"] == 1
+
+
+def test_waiters_are_queued_until_slot_frees():
+    limiter = _limiter(initial_concurrency=1)
+    limiter.acquire()
+    acquired = threading.Event()
+
+    def worker():
+        limiter.acquire()
+        acquired.set()
+
+    threading.Thread(target=worker, daemon=True).start()
+    assert not acquired.wait(0.2)  # 동시 요청 한도 1 → 대기
+    limiter.release(200)
+    assert acquired.wait(1)
+
+
+def test_retry_after_and_exhausted_quota_pause_requests():
+    limiter = _limiter()
+    limiter.acquire()
+    limiter.release(429, {"retry-after": "0.3"})
+    started = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - started >= 0.25
+
+    limiter.release(200, {"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "300ms",
+                          "x-ratelimit-limit-requests": "600"})
+    assert limiter.stats()["rpm"] == 600
+    started = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - started >= 0.25
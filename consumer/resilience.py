@@ -0,0 +1,196 @@
+"""
+S3/OpenAI 호출 재시도 정책과 의존성별 circuit breaker.
+
+- 재시도: 지수 backoff + full jitter (random(0, min(max_delay, base * 2^n)))
+- 멱등성 기준 재시도 규칙
+  · 멱등 호출(S3 GET/PUT(고정 key), chat.completions): 연결 실패, timeout, 5xx, 429
+  · 비멱등 호출(images.generate / edits, 과금·중복 생성 위험): 요청이 처리되지 않은 것이 확실한
+    연결 실패, 429, 503 만 재시도
+  · 429 는 공용 HTTP client 의 RateLimitedTransport 가 한도 회복 후 재전송하므로
+    RATE_LIMIT_ENABLED 면 이 계층에서는 다시 재시도하지 않음 (한 계층에서만 재시도)
+- circuit breaker: 연속 실패가 임계값을 넘으면 reset_timeout 동안 바로 CircuitOpenError (timeout 대기 없이 빠른 실패),
+  이후 1건만 시험 호출(half-open) → 성공하면 닫힘
+SDK/boto3 자체 재시도는 끄고 이 계층에서만 재시도한다.
+"""
+import random
+import sys
+import threading
+import time
+from typing import Callable, Optional, TypeVar
+
+from static.http import RATE_LIMIT_ENABLED
+from static.retry import *
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout_sec: float = CIRCUIT_RESET_TIMEOUT_SEC, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_sec = reset_timeout_sec
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.state = "closed"  # closed | open | half_open
+        self._failures = 0
+        self._opened_at = 0.0
+
+    def allow(self):
+        """호출 가능 여부 확인. open 이면 CircuitOpenError"""
+        with self._lock:
+            if self.state == "open":
+                if self.clock() - self._opened_at < self.reset_timeout_sec:
+                    raise CircuitOpenError(f"{self.name} circuit open → 빠른 실패")
+                self.state = "half_open"  # 이 호출이 시험 호출
+                return
+            if self.state == "half_open":
+                raise CircuitOpenError(f"{self.name} circuit half-open (시험 호출 진행 중)")
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                print(f"[정보] {self.name} circuit closed")
+            self.state = "closed"
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                if self.state != "open":
+                    print(f"[경고] {self.name} circuit open ({self._failures}회 연속 실패, "
+                          f"{self.reset_timeout_sec:.0f}s 동안 빠른 실패)")
+                self.state = "open"
+                self._opened_at = self.clock()
+
+    def record_neutral(self):
+        """upstream 장애가 아닌 실패(4xx 등): half-open 시험 호출이면 정상 응답으로 간주"""
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "closed"
+                self._failures = 0
+
+
+def backoff_delay(attempt: int, base: float = RETRY_BASE_DELAY_SEC, cap: float = RETRY_MAX_DELAY_SEC,
+                  rng: Callable[[], float] = random.random) -> float:
+    """attempt(1부터) 번째 실패 후 대기 시간 (full jitter)"""
+    return rng() * min(cap, base * (2 ** (attempt - 1)))
+
+
+def retry_call(fn: Callable[[], T], *, breaker: CircuitBreaker, is_upstream_failure: Callable[[Exception], bool],
+               is_retryable: Callable[[Exception], bool], max_attempts: int = RETRY_MAX_ATTEMPTS,
+               sleep: Callable[[float], None] = time.sleep, label: str = "") -> T:
+    """
+    fn 호출. is_retryable 이면 backoff 후 재시도, is_upstream_failure 면 breaker 실패로 기록.
+    breaker 가 open 이면 호출하지 않고 CircuitOpenError.
+    """
+    for attempt in range(1, max_attempts + 1):
+        breaker.allow()
+        try:
+            result = fn()
+        except Exception as e:
+            if is_upstream_failure(e):
+                breaker.record_failure()
+            else:
+                breaker.record_neutral()
+            if attempt == max_attempts or not is_retryable(e):
+                raise
+            delay = backoff_delay(attempt)
+            print(f"[재시도] {label or breaker.name} {attempt}/{max_attempts} 실패: {e} → {delay:.2f}s 후 재시도")
+            sleep(delay)
+            continue
+        breaker.record_success()
+        return result
+    raise AssertionError("unreachable")
+
+
+# botocore/openai/httpx 는 첫 호출 때 import 되므로 여기서 import 하지 않는다.
+# 아직 import 되지 않았다면 그 모듈의 예외가 발생했을 수도 없음
+def _loaded(name: str):
+    return sys.modules.get(name)
+
+
+# ── S3 ────────────────────────────────────────────────────────────────
+_S3_RETRYABLE_CODES = {"500", "502", "503", "504", "InternalError", "ServiceUnavailable", "SlowDown",
+                       "RequestTimeout", "Throttling", "ThrottlingException", "RequestTimeTooSkewed"}
+
+
+def is_transient_s3_error(e: Exception) -> bool:
+    exceptions = _loaded("botocore.exceptions")
+    if exceptions is None:
+        return False
+    if isinstance(e, (exceptions.EndpointConnectionError, exceptions.ConnectTimeoutError,
+                      exceptions.ReadTimeoutError, exceptions.ConnectionClosedError)):
+        return True
+    if isinstance(e, exceptions.ClientError):
+        error = e.response.get("Error", {})
+        status = str(e.response.get("ResponseMetadata", {}).get("HTTPStatusCode", ""))
+        return error.get("Code") in _S3_RETRYABLE_CODES or status in _S3_RETRYABLE_CODES
+    return False
+
+
+# ── OpenAI (SDK + raw httpx) ─────────────────────────────────────────
+def _status_of(e: Exception) -> Optional[int]:
+    openai, httpx = _loaded("openai"), _loaded("httpx")
+    if openai is not None and isinstance(e, openai.APIStatusError):
+        return e.status_code
+    if httpx is not None and isinstance(e, httpx.HTTPStatusError):
+        return e.response.status_code
+    return None
+
+
+def _is_connect_failure(e: Exception) -> bool:
+    """요청이 서버에 도달하지 못한 것이 확실한 실패"""
+    openai, httpx = _loaded("openai"), _loaded("httpx")
+    if httpx is None:
+        return False
+    cause = e.__cause__ if openai is not None and isinstance(e, openai.APIConnectionError) else e
+    return isinstance(cause, (httpx.ConnectError, httpx.ConnectTimeout))
+
+
+def is_transient_openai_error(e: Exception, idempotent: bool, retry_429: bool = True) -> bool:
+    """retry_429=False: 429 는 transport 계층에서 이미 재전송했으므로 재시도하지 않음"""
+    if _is_connect_failure(e):
+        return True
+    status = _status_of(e)
+    if status == 429:
+        return retry_429
+    if status == 503:
+        return True
+    if not idempotent:
+        return False
+    if status is not None:
+        return status >= 500
+    openai, httpx = _loaded("openai"), _loaded("httpx")
+    return (openai is not None and isinstance(e, openai.APIConnectionError)) or \
+        (httpx is not None and isinstance(e, httpx.TransportError))
+
+
+def _is_openai_outage(e: Exception) -> bool:
+    """breaker 에 실패로 기록할 오류. 429 는 한도 초과(rate limiter 가 조절)일 뿐 장애가 아니므로 제외"""
+    return _status_of(e) != 429 and is_transient_openai_error(e, idempotent=True)
+
+
+breakers = {
+    "s3": CircuitBreaker("s3"),
+    "openai": CircuitBreaker("openai"),
+}
+
+
+def s3_call(fn: Callable[[], T], label: str = "s3") -> T:
+    """S3 호출 (GET, 고정 key PUT 은 모두 멱등)"""
+    return retry_call(fn, breaker=breakers["s3"], is_upstream_failure=is_transient_s3_error,
+                      is_retryable=is_transient_s3_error, label=label)
+
+
+def openai_call(fn: Callable[[], T], idempotent: bool, label: str = "openai") -> T:
+    """OpenAI 호출. idempotent=False(이미지 생성/편집)는 처리되지 않은 것이 확실한 실패만 재시도"""
+    return retry_call(fn, breaker=breakers["openai"],
+                      is_upstream_failure=_is_openai_outage,
+                      is_retryable=lambda e: is_transient_openai_error(e, idempotent, retry_429=not RATE_LIMIT_ENABLED),
+                      label=label)
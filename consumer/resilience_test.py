@@ -0,0 +1,110 @@
+import httpx
+import openai
+import pytest
+from botocore.exceptions import ClientError, EndpointConnectionError
+
+from resilience import (CircuitBreaker, CircuitOpenError, backoff_delay, is_transient_openai_error,
+                        is_transient_s3_error, retry_call)
+
+
+def _status_error(status):
+    request = httpx.Request("POST", "https://api.openai.com/v1/images/edits")
+    return httpx.HTTPStatusError("err", request=request, response=httpx.Response(status, request=request))
+
+
+def _flaky(failures, exc):
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise exc
+        return "ok"
+
+    return fn, calls
+
+
+def test_backoff_delay_is_capped_full_jitter():
+    assert backoff_delay(1, base=0.5, cap=8, rng=lambda: 1.0) == 0.5
+    assert backoff_delay(3, base=0.5, cap=8, rng=lambda: 1.0) == 2.0
+    assert backoff_delay(10, base=0.5, cap=8, rng=lambda: 1.0) == 8
+    assert backoff_delay(4, base=0.5, cap=8, rng=lambda: 0.0) == 0.0
+
+
+def test_retry_call_retries_transient_then_succeeds():
+    breaker = CircuitBreaker("t", failure_threshold=5)
+    fn, calls = _flaky(2, EndpointConnectionError(endpoint_url="https://s3"))
+    sleeps = []
+    result = retry_call(fn, breaker=breaker, is_upstream_failure=is_transient_s3_error,
+                        is_retryable=is_transient_s3_error, max_attempts=3, sleep=sleeps.append)
+    assert result == "ok" and len(calls) == 3 and len(sleeps) == 2
+    assert breaker.state == "closed"
+
+
+def test_retry_call_does_not_retry_client_errors():
+    breaker = CircuitBreaker("t", failure_threshold=1)
+    denied = ClientError({"Error": {"Code": "AccessDenied"}, "ResponseMetadata": {"HTTPStatusCode": 403}}, "GetObject")
+    fn, calls = _flaky(5, denied)
+    with pytest.raises(ClientError):
+        retry_call(fn, breaker=breaker, is_upstream_failure=is_transient_s3_error,
+                   is_retryable=is_transient_s3_error, max_attempts=3, sleep=lambda _: None)
+    assert len(calls) == 1
+    assert breaker.state == "closed"  # 4xx 는 장애로 보지 않음
+
+
+def test_non_idempotent_openai_calls_only_retry_unsent_requests():
+    connect = openai.APIConnectionError(request=httpx.Request("POST", "https://api.openai.com"))
+    connect.__cause__ = httpx.ConnectError("refused")
+    read_timeout = httpx.ReadTimeout("slow")
+
+    assert is_transient_openai_error(connect, idempotent=False)
+    assert is_transient_openai_error(_status_error(429), idempotent=False)
+    assert is_transient_openai_error(_status_error(503), idempotent=False)
+    assert not is_transient_openai_error(_status_error(500), idempotent=False)
+    assert not is_transient_openai_error(read_timeout, idempotent=False)
+
+    assert is_transient_openai_error(_status_error(500), idempotent=True)
+    assert is_transient_openai_error(read_timeout, idempotent=True)
+    assert not is_transient_openai_error(_status_error(400), idempotent=True)
+
+
+def test_429_not_retried_again_when_transport_already_retries():
+    # RateLimitedTransport 가 429 를 재전송했으면 호출 계층에서는 재시도하지 않음
+    assert not is_transient_openai_error(_status_error(429), idempotent=True, retry_429=False)
+    assert not is_transient_openai_error(_status_error(429), idempotent=False, retry_429=False)
+    assert is_transient_openai_error(_status_error(503), idempotent=False, retry_429=False)
+
+
+def test_circuit_opens_fails_fast_and_recovers_after_probe(clock):
+    breaker = CircuitBreaker("t", failure_threshold=2, reset_timeout_sec=30, clock=clock)
+    fn, calls = _flaky(2, httpx.ConnectError("down"))
+    kwargs = dict(breaker=breaker, is_upstream_failure=lambda e: True, is_retryable=lambda e: False,
+                  max_attempts=1, sleep=lambda _: None)
+
+    for _ in range(2):
+        with pytest.raises(httpx.ConnectError):
+            retry_call(fn, **kwargs)
+    assert breaker.state == "open"
+
+    with pytest.raises(CircuitOpenError):
+        retry_call(fn, **kwargs)
+    assert len(calls) == 2  # open 동안은 호출하지 않음
+
+    clock.now += 31
+    assert retry_call(fn, **kwargs) == "ok"  # half-open 시험 호출 성공
+    assert breaker.state == "closed"
+
+
+def test_failed_probe_reopens_circuit(clock):
+    breaker = CircuitBreaker("t", failure_threshold=1, reset_timeout_sec=10, clock=clock)
+    breaker.allow()
+    breaker.record_failure()
+    clock.now += 11
+    breaker.allow()  # half-open
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()  # 시험 호출은 한 건만
+    breaker.record_failure()
+    assert breaker.state == "open"
+    clock.now += 4
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
@@ -0,0 +1,215 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from static.route_cache import *
+
+
+def route_cache_key(model: str, prompt: str, uploads: List[str], chat_images: List[Dict],
+                    chat_summary: str, router_version: str = "") -> str:
+    """
+    router 입력을 정규화한 JSON의 sha256.
+    chat_images 는 LLM 결정에 영향을 주는 path/role/description/fromOriginImage 만 사용하고,
+    router_version(시스템 프롬프트/툴 정의 해시)이 바뀌면 이전 결정은 자동으로 무효가 된다.
+    """
+    canonical = {
+        "model": model,
+        "router": router_version,
+        "prompt": (prompt or "").strip(),
+        "uploads": list(uploads or []),
+        "chat_images": [
+            [c.get("path", ""), c.get("role", ""), c.get("description", ""), bool(c.get("fromOriginImage"))]
+            for c in (chat_images or [])
+        ],
+        "chat_summary": (chat_summary or "").strip(),
+    }
+    raw = json.dumps(canonical, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def router_fingerprint(*parts) -> str:
+    """시스템 프롬프트/툴 정의 등 router 동작을 바꾸는 값들의 짧은 해시"""
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+class RouteCache:
+    """
+    router 결정(route_scenario args) 캐시.
+    - 1계층: in-memory LRU (max_entries, ttl_sec)
+    - 2계층(선택): sqlite 파일 (db_path 지정 시). 메모리 miss 시 조회하고 hit 이면 메모리로 올림
+    worker 스레드들이 공유하므로 모든 접근은 lock 안에서 수행.
+    """
+
+    def __init__(self, max_entries: int = ROUTE_CACHE_MAX_ENTRIES, ttl_sec: int = ROUTE_CACHE_TTL_SEC,
+                 db_path: str = ROUTE_CACHE_DB_PATH, log_every: int = ROUTE_CACHE_LOG_EVERY,
+                 clock: Callable[[], float] = time.time):
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self.db_path = db_path
+        self.log_every = log_every
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (저장 시각, args JSON)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._evictor: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if not self.db_path:
+            return None
+        if self._conn is not None:
+            return self._conn
+        dirname = os.path.dirname(self.db_path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS route_cache (
+                cache_key TEXT PRIMARY KEY,
+                args TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn = conn
+        return conn
+
+    def _reset(self, e: Exception):
+        print(f"[경고] router 캐시 DB 오류: {e}")
+        try:
+            if self._conn is not None:
+                self._conn.close()
+        except sqlite3.Error:
+            pass
+        self._conn = None
+
+    def _remember(self, key: str, created_at: float, raw: str):
+        self._entries[key] = (created_at, raw)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load_persistent(self, key: str, now: float) -> Optional[tuple]:
+        try:
+            conn = self._connect()
+            if conn is None:
+                return None
+            row = conn.execute("SELECT created_at, args FROM route_cache WHERE cache_key=?", (key,)).fetchone()
+            if not row:
+                return None
+            if row[0] <= now - self.ttl_sec:
+                conn.execute("DELETE FROM route_cache WHERE cache_key=?", (key,))
+                return None
+            return row
+        except sqlite3.Error as e:
+            self._reset(e)
+            return None
+
+    def get(self, key: str) -> Optional[Dict]:
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now - self.ttl_sec:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                entry = self._load_persistent(key, now)
+                if entry is not None:
+                    self._remember(key, entry[0], entry[1])
+                    self.hits += 1
+                    self.persistent_hits += 1
+                else:
+                    self.misses += 1
+            self._maybe_log()
+        # 호출자가 args 를 수정해도 캐시에 영향이 없도록 매번 새 객체로 반환
+        return json.loads(entry[1]) if entry is not None else None
+
+    def put(self, key: str, args: Dict):
+        raw = json.dumps(args, ensure_ascii=False)
+        now = self.clock()
+        with self._lock:
+            self._remember(key, now, raw)
+            try:
+                conn = self._connect()
+                if conn is not None:
+                    conn.execute(
+                        "INSERT INTO route_cache(cache_key, args, created_at) VALUES(?,?,?) "
+                        "ON CONFLICT(cache_key) DO UPDATE SET args=excluded.args, created_at=excluded.created_at",
+                        (key, raw, now))
+            except sqlite3.Error as e:
+                self._reset(e)
+
+    def evict_expired(self) -> int:
+        """ttl 이 지난 항목 삭제 (메모리 + 영속 계층). 삭제한 항목 수 반환"""
+        cutoff = self.clock() - self.ttl_sec
+        with self._lock:
+            expired = [k for k, (created_at, _) in self._entries.items() if created_at <= cutoff]
+            for k in expired:
+                del self._entries[k]
+            removed = len(expired)
+            try:
+                conn = self._connect()
+                if conn is not None:
+                    removed += conn.execute("DELETE FROM route_cache WHERE created_at <= ?", (cutoff,)).rowcount
+            except sqlite3.Error as e:
+                self._reset(e)
+        return removed
+
+    def start_eviction(self, interval_sec: Optional[int] = None):
+        """영속 계층이 있으면 만료 항목을 주기적으로 삭제 (메모리 계층은 LRU 로 크기 제한)"""
+        if not self.db_path or self._evictor is not None:
+            return
+
+        def loop():
+            while not self._stop.wait(interval_sec or self.ttl_sec):
+                removed = self.evict_expired()
+                if removed:
+                    print(f"[정리] router 캐시 {removed}건 삭제")
+
+        self._evictor = threading.Thread(target=loop, name="route-cache-evictor", daemon=True)
+        self._evictor.start()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return self._stats()
+
+    def _stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+    def _maybe_log(self):
+        lookups = self.hits + self.misses
+        if self.log_every and lookups % self.log_every == 0:
+            s = self._stats()
+            print(f"[캐시] router 결정 hit_rate={s['hit_rate']:.1%} (hit {s['hits']}, "
+                  f"영속 hit {s['persistent_hits']}, miss {s['misses']}, 항목 {s['entries']})")
+
+    def close(self):
+        self._stop.set()
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._conn.close()
+                except sqlite3.Error:
+                    pass
+                self._conn = None
@@ -0,0 +1,62 @@
+import os
+import tempfile
+
+from route_cache import RouteCache, route_cache_key
+
+
+CHAT = [{"i": 0, "path": "generated-images/a.png", "role": "assistant", "description": "고양이",
+         "fromOriginImage": False}]
+
+
+def test_key_is_canonical():
+    a = route_cache_key("gpt-4.1", " 고양이 그려줘 ", ["u/1.png"], CHAT, "", "v1")
+    b = route_cache_key("gpt-4.1", "고양이 그려줘", ["u/1.png"], [dict(CHAT[0], i=3)], "", "v1")
+    assert a == b  # 앞뒤 공백과 chat 인덱스 번호는 결정에 영향 없음
+
+    assert a != route_cache_key("gpt-4.1-mini", "고양이 그려줘", ["u/1.png"], CHAT, "", "v1")
+    assert a != route_cache_key("gpt-4.1", "고양이 그려줘", ["u/2.png"], CHAT, "", "v1")
+    assert a != route_cache_key("gpt-4.1", "고양이 그려줘", ["u/1.png"], [dict(CHAT[0], description="개")], "", "v1")
+    assert a != route_cache_key("gpt-4.1", "고양이 그려줘", ["u/1.png"], CHAT, "요약", "v1")
+    assert a != route_cache_key("gpt-4.1", "고양이 그려줘", ["u/1.png"], CHAT, "", "v2")
+
+
+def test_lru_ttl_and_stats(clock):
+    cache = RouteCache(max_entries=2, ttl_sec=60, db_path="", log_every=0, clock=clock)
+
+    assert cache.get("a") is None
+    cache.put("a", {"subtype": "generate"})
+    cache.put("b", {"subtype": "edit"})
+    assert cache.get("a") == {"subtype": "generate"}  # a 가 최근 사용
+    cache.put("c", {"subtype": "style_transfer"})      # → b 가 밀려남
+    assert cache.get("b") is None
+
+    got = cache.get("a")
+    got["subtype"] = "changed"
+    assert cache.get("a") == {"subtype": "generate"}  # 반환값 수정이 캐시에 영향 없음
+
+    clock.now += 61
+    assert cache.get("a") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 3
+    assert stats["misses"] == 3
+    assert stats["hit_rate"] == 0.5
+
+
+def test_persistent_tier_survives_restart(clock):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "db", "route_cache.db")
+        first = RouteCache(db_path=path, ttl_sec=60, log_every=0, clock=clock)
+        first.put("k", {"subtype": "generate", "needs_clarification": False})
+        first.close()
+
+        second = RouteCache(db_path=path, ttl_sec=60, log_every=0, clock=clock)
+        try:
+            assert second.get("k") == {"subtype": "generate", "needs_clarification": False}
+            assert second.stats()["persistent_hits"] == 1
+
+            clock.now += 61
+            assert second.evict_expired() == 2  # 메모리 + 영속 계층
+            assert second.get("k") is None
+        finally:
+            second.close()
@@ -0,0 +1,145 @@
+"""
+router LLM 입력(user 메시지 content) 빌더.
+
+- 토큰 예산(ROUTER_CONTEXT_TOKEN_BUDGET) 안에서 chat 이미지를 선택
+  (prompt 가 설명을 지칭하는 이미지 → 최신 이미지 순, 같은 path 는 가장 최근 것 하나만)
+- 이미지 설명은 ROUTER_DESC_MAX_CHARS 로 자름
+- 블록 순서는 고정 안내문 → chat_summary → chat_images → uploads → prompt
+  (시스템 프롬프트 + 안내문이 항상 같은 바이트로 시작해 provider 측 prompt caching 이 적용되도록,
+   대화 중 잘 바뀌지 않는 항목을 앞에, 매 요청 바뀌는 항목을 뒤에 둠)
+토큰 수는 tokenizer 없이 문자 기반으로 추정한다 (ASCII 4자당 1, 그 외 문자 1자당 1).
+"""
+import json
+import re
+from typing import Dict, List, Tuple
+
+from static.model import ROUTER_CONTEXT_TOKEN_BUDGET, ROUTER_DESC_MAX_CHARS
+
+ROUTER_INSTRUCTION_TEXT = (
+    "아래는 하나의 JSON 기반 대화 컨텍스트입니다.\n"
+    "- prompt: 이번 요청의 사용자 텍스트\n"
+    "- chat_images: 과거 대화 중 이미지 목록 (chat#i)\n"
+    "- uploads: 이번 요청에 포함된 업로드 이미지 목록 (S3 Key 또는 URL)\n"
+    "- chat_summary: 이전 대화의 요약 (선택)\n"
+    "⚠ 모든 항목은 JSON 객체로 제공되며, 사람 읽기용 텍스트는 포함되지 않습니다.\n"
+    "툴은 prompt / chat_images / uploads를 기반으로 base 및 references를 결정해야 합니다."
+)
+
+_WORD = re.compile(r"[0-9A-Za-z가-힣]{2,}")
+
+
+def _safe(s):
+    return (s or "").replace("\n", " ").strip()
+
+
+def _bool(v):
+    if v is True or v is False:
+        return v
+    if isinstance(v, str):
+        t = v.strip().lower()
+        if t in ("true", "1", "yes", "y"): return True
+        if t in ("false", "0", "no", "n"): return False
+    raise ValueError(f"bool 값이 잘못됨 {v}")
+
+
+def _json_text_block(obj: dict):
+    return {
+        "type": "text",
+        "text": json.dumps(obj, ensure_ascii=False)
+    }
+
+
+def estimate_tokens(text: str) -> int:
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+def _truncate(text: str, limit: int) -> str:
+    if limit and len(text) > limit:
+        return text[:limit - 1] + "…"
+    return text
+
+
+def _is_referenced(prompt_words: set, desc: str) -> bool:
+    """prompt 에 이미지 설명의 단어(2자 이상)가 등장하면 지칭된 이미지로 간주 (조사 차이는 부분 일치로 흡수)"""
+    return any(w in word or word in w for word in _WORD.findall(desc) for w in prompt_words)
+
+
+def _collect_chat_images(recent_chat: list) -> List[dict]:
+    """recent_chat(index 0 이 최신) 의 이미지 turn 을 같은 순서(최신 우선)로. 같은 path 는 가장 최근(첫) 것만 남김"""
+    images: Dict[str, dict] = {}
+    for turn in list(recent_chat or []):
+        role = turn.get("role", "user")
+        for c in turn.get("contents", []):
+            if (c.get("type") or "").lower() != "image":
+                continue
+            img_path = _safe(c.get("imagePath", ""))
+            desc = _safe(c.get("description", ""))
+            from_origin_image = _bool(c.get("fromOriginImage"))
+            if not img_path:
+                continue
+            prev = images.get(img_path)
+            if prev is not None:
+                # 최근 등장에 설명이 없으면 이전(더 오래된) 등장의 설명 사용
+                if not prev["description"]:
+                    prev["description"] = desc
+                continue
+            images[img_path] = {
+                "path": img_path,
+                "role": role,
+                "description": desc,
+                "fromOriginImage": from_origin_image,
+            }
+    return list(images.values())
+
+
+def build_router_content(prompt: str, uploads: List[str], recent_chat: list, chat_summary: str,
+                         token_budget: int = ROUTER_CONTEXT_TOKEN_BUDGET,
+                         desc_max_chars: int = ROUTER_DESC_MAX_CHARS) -> Tuple[list, list, Dict[int, str], int]:
+    """
+    router user 메시지 content 를 만든다.
+    반환: (content, chat_images, chat_image_map{i: path}, 추정 토큰 수)
+    chat_images 의 i 는 포함된 이미지만 chat 순서(0 이 최신)대로 0부터 다시 매김 (router 가 고르는 chat#i 와 동일).
+    최신 이미지(candidates[0]) 1개는 예산과 관계없이 포함한다.
+    """
+    prompt = _safe(prompt)
+    head = [{"type": "text", "text": ROUTER_INSTRUCTION_TEXT}]
+    if chat_summary:
+        head.append(_json_text_block({"type": "chat_summary", "value": _safe(chat_summary)}))
+    tail = [
+        _json_text_block({"type": "uploads", "value": list(uploads or [])}),
+        _json_text_block({"type": "prompt", "value": prompt}),
+    ]
+    used = sum(estimate_tokens(block["text"]) for block in head + tail)
+    used += estimate_tokens(json.dumps({"type": "chat_images", "value": []}, ensure_ascii=False))
+
+    candidates = _collect_chat_images(recent_chat)
+    for img in candidates:
+        img["description"] = _truncate(img["description"], desc_max_chars)
+
+    prompt_words = set(_WORD.findall(prompt))
+    latest = 0  # recent_chat 은 index 0 이 최신
+    others = list(range(1, len(candidates)))  # 최신 우선
+    others.sort(key=lambda k: not _is_referenced(prompt_words, candidates[k]["description"]))  # 지칭 우선 (stable)
+
+    keep = set()
+    for k in ([latest] if candidates else []) + others:
+        cost = estimate_tokens(json.dumps(dict(candidates[k], i=k), ensure_ascii=False)) + 1
+        if keep and used + cost > token_budget:
+            continue
+        keep.add(k)
+        used += cost
+
+    chat_images = []
+    chat_image_map: Dict[int, str] = {}
+    for k in sorted(keep):
+        i = len(chat_images)
+        chat_images.append(dict({"i": i}, **candidates[k]))
+        chat_image_map[i] = candidates[k]["path"]
+
+    content = head + [_json_text_block({"type": "chat_images", "value": chat_images})] + tail
+    tokens = sum(estimate_tokens(block["text"]) for block in content)
+    if len(chat_images) < len(candidates):
+        print(f"[정보] router 컨텍스트: chat 이미지 {len(candidates)}개 중 {len(chat_images)}개 포함 "
+              f"(예산 {token_budget} 토큰)")
+    return content, chat_images, chat_image_map, tokens
@@ -0,0 +1,62 @@
+import json
+import os
+
+from router_context import ROUTER_INSTRUCTION_TEXT, build_router_content
+
+
+def _image(path, desc="", role="assistant"):
+    return {"role": role, "contents": [{"type": "IMAGE", "imagePath": path, "description": desc,
+                                        "fromOriginImage": False}]}
+
+
+def _block(content, block_type):
+    for block in content:
+        if block["text"].startswith("{"):
+            obj = json.loads(block["text"])
+            if obj["type"] == block_type:
+                return obj["value"]
+    return None
+
+
+def test_prefix_is_stable_and_prompt_last():
+    a, _, _, _ = build_router_content("고양이 그려줘", [], [], "")
+    b, _, _, _ = build_router_content("강아지로 바꿔줘", ["u/1.png"], [_image("g/1.png")], "요약")
+    assert a[0] == b[0] == {"type": "text", "text": ROUTER_INSTRUCTION_TEXT}
+    assert _block(b, "prompt") == "강아지로 바꿔줘"
+    assert json.loads(b[-1]["text"])["type"] == "prompt"
+
+
+def test_dedup_and_truncate():
+    # index 0 이 최신
+    chat = [_image("g/1.png", ""), _image("g/2.png", "가" * 50), _image("g/1.png", "예전 설명", role="user")]
+    _, images, image_map, _ = build_router_content("", [], chat, "", desc_max_chars=10)
+    assert [img["path"] for img in images] == ["g/1.png", "g/2.png"]  # 같은 path 는 최신 위치 하나만
+    assert images[0]["role"] == "assistant"                            # 최신 등장의 role 유지
+    assert images[0]["description"] == "예전 설명"                       # 설명 없는 최신 등장은 이전 설명 사용
+    assert len(images[1]["description"]) == 10
+    assert image_map == {0: "g/1.png", 1: "g/2.png"}
+
+
+def test_budget_keeps_latest_and_referenced():
+    # index 0 이 최신, 가장 오래된 이미지를 prompt 가 지칭
+    chat = [_image(f"g/{n}.png", "풍경 사진 " * 5) for n in range(20)] + [_image("g/cat.png", "고양이 그림")]
+    content, images, _, tokens = build_router_content("아까 고양이를 수영하게 해줘", [], chat, "", token_budget=300)
+    paths = [img["path"] for img in images]
+    assert paths[0] == "g/0.png"     # 최신 이미지
+    assert "g/cat.png" in paths      # prompt 가 지칭한 이미지
+    assert "g/19.png" not in paths   # 예산 초과분은 오래된 것부터 제외
+    assert paths == sorted(paths, key=lambda p: [img["imagePath"] for t in chat for img in t["contents"]].index(p))
+    assert [img["i"] for img in images] == list(range(len(images)))
+    assert tokens <= 300
+
+
+def test_tight_budget_keeps_newest_fixture_image():
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "generation_test",
+                           "R2_스타일전용_최근AI이미지.json"), encoding="utf-8-sig") as f:
+        case = json.load(f)
+    for turn in case["chat"]:
+        for c in turn["contents"]:
+            c.setdefault("fromOriginImage", False)
+    _, images, _, _ = build_router_content(case["prompt"], case["uploads"], case["chat"], case.get("chatSummary", ""),
+                                           token_budget=10)
+    assert [img["path"] for img in images] == [case["expected"]["base"]["path"]]
@@ -0,0 +1,226 @@
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+# loader(etag) -> None(304, 변경 없음) 또는 (bytes, content-type, etag)
+Loader = Callable[[Optional[str]], Optional[Tuple[bytes, str, Optional[str]]]]
+
+
+class S3ObjectCache:
+    """
+    S3 객체 로컬 캐시 (같은 호스트의 worker 프로세스들이 디렉토리 하나를 공유).
+    - 디스크: 내용 sha256 으로 저장한 blob 파일 + sqlite(WAL) 인덱스 {bucket/key → etag, digest, size, 접근 시각}
+      같은 내용의 객체는 blob 하나를 공유하고, blob 은 임시 파일 → os.replace 로 원자적으로 기록
+    - 메모리: 최근 객체 bytes LRU (memory_max_bytes)
+    - revalidate_sec 이 지난 항목은 ETag 조건부 GET(If-None-Match)으로 확인 → 304 면 본문 재다운로드 없음
+    - 디스크 총 크기가 max_bytes 를 넘으면 접근한 지 오래된 항목부터 삭제
+    """
+
+    def __init__(self, root: str, max_bytes: int, memory_max_bytes: int, revalidate_sec: float,
+                 clock: Callable[[], float] = time.time):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.memory_max_bytes = memory_max_bytes
+        self.revalidate_sec = revalidate_sec
+        self.clock = clock
+        self._blob_dir = os.path.join(root, "blobs")
+        os.makedirs(self._blob_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()  # cache_key -> (data, ctype, etag, validated_at)
+        self._memory_bytes = 0
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    # ── sqlite 인덱스 ─────────────────────────────────────────────
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is not None:
+            return self._conn
+        conn = sqlite3.connect(os.path.join(self.root, "index.db"), timeout=5, check_same_thread=False,
+                               isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS objects (
+                cache_key TEXT PRIMARY KEY,
+                etag TEXT,
+                ctype TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                validated_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_objects_accessed_at ON objects(accessed_at)")
+        self._conn = conn
+        return conn
+
+    def _reset(self, e: Exception):
+        print(f"[경고] S3 캐시 DB 오류: {e}")
+        try:
+            if self._conn is not None:
+                self._conn.close()
+        except sqlite3.Error:
+            pass
+        self._conn = None
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self._blob_dir, digest[:2], digest)
+
+    def _read_blob(self, digest: str) -> Optional[bytes]:
+        try:
+            with open(self._blob_path(digest), "rb") as fp:
+                return fp.read()
+        except FileNotFoundError:
+            return None  # 다른 프로세스가 evict 함
+
+    def _write_blob(self, digest: str, data: bytes):
+        path = self._blob_path(digest)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                fp.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    # ── 메모리 LRU ───────────────────────────────────────────────
+    def _remember(self, cache_key: str, data: bytes, ctype: str, etag: Optional[str], validated_at: float):
+        old = self._memory.pop(cache_key, None)
+        if old is not None:
+            self._memory_bytes -= len(old[0])
+        if len(data) > self.memory_max_bytes:
+            return
+        self._memory[cache_key] = (data, ctype, etag, validated_at)
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.memory_max_bytes:
+            _, (evicted, _, _, _) = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    # ── 조회 ───────────────────────────────────────────────────
+    def get(self, bucket: str, key: str, loader: Loader) -> Tuple[bytes, str]:
+        """(bytes, content-type). 캐시에 없거나 revalidate 시 변경됐으면 loader 로 다운로드"""
+        cache_key = f"{bucket}/{key}"
+        now = self.clock()
+        with self._lock:
+            cached = self._memory.get(cache_key)
+            if cached is not None:
+                self._memory.move_to_end(cache_key)
+            else:
+                cached = self._load_disk(cache_key)
+                if cached is not None:
+                    self._remember(cache_key, *cached)
+
+        if cached is not None:
+            data, ctype, etag, validated_at = cached
+            if now - validated_at < self.revalidate_sec:
+                self.hits += 1
+                self._touch(cache_key, now, validated=False)
+                return data, ctype
+            # 오래된 항목: ETag 조건부 GET
+            result = loader(etag)
+            if result is None:
+                self.revalidated += 1
+                with self._lock:
+                    self._remember(cache_key, data, ctype, etag, now)
+                self._touch(cache_key, now, validated=True)
+                return data, ctype
+        else:
+            self.misses += 1
+            result = loader(None)
+
+        data, ctype, etag = result
+        self._store(cache_key, data, ctype, etag, now)
+        return data, ctype
+
+    def _load_disk(self, cache_key: str) -> Optional[tuple]:
+        try:
+            row = self._connect().execute(
+                "SELECT etag, ctype, digest, validated_at FROM objects WHERE cache_key=?", (cache_key,)).fetchone()
+        except sqlite3.Error as e:
+            self._reset(e)
+            return None
+        if not row:
+            return None
+        etag, ctype, digest, validated_at = row
+        data = self._read_blob(digest)
+        if data is None:
+            return None
+        return data, ctype, etag, validated_at
+
+    def _touch(self, cache_key: str, now: float, validated: bool):
+        column = "accessed_at=?, validated_at=?" if validated else "accessed_at=?"
+        params = (now, now, cache_key) if validated else (now, cache_key)
+        with self._lock:
+            try:
+                self._connect().execute(f"UPDATE objects SET {column} WHERE cache_key=?", params)
+            except sqlite3.Error as e:
+                self._reset(e)
+
+    def _store(self, cache_key: str, data: bytes, ctype: str, etag: Optional[str], now: float):
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            self._remember(cache_key, data, ctype, etag, now)
+            try:
+                self._write_blob(digest, data)
+                conn = self._connect()
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.execute(
+                        "INSERT INTO objects(cache_key, etag, ctype, digest, size, validated_at, accessed_at) "
+                        "VALUES(?,?,?,?,?,?,?) ON CONFLICT(cache_key) DO UPDATE SET etag=excluded.etag, "
+                        "ctype=excluded.ctype, digest=excluded.digest, size=excluded.size, "
+                        "validated_at=excluded.validated_at, accessed_at=excluded.accessed_at",
+                        (cache_key, etag, ctype, digest, len(data), now, now))
+                    orphans = self._evict(conn)
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+            except (sqlite3.Error, OSError) as e:
+                self._reset(e)
+                return
+        for orphan in orphans:
+            try:
+                os.remove(self._blob_path(orphan))
+            except FileNotFoundError:
+                pass
+
+    def _evict(self, conn: sqlite3.Connection) -> list:
+        """총 크기가 max_bytes 이하가 될 때까지 LRU 삭제 → 더 이상 참조되지 않는 blob digest 목록"""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+        removed_digests = set()
+        if total > self.max_bytes:
+            for cache_key, digest, size in conn.execute(
+                    "SELECT cache_key, digest, size FROM objects ORDER BY accessed_at").fetchall():
+                if total <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM objects WHERE cache_key=?", (cache_key,))
+                removed_digests.add(digest)
+                total -= size
+                mem = self._memory.pop(cache_key, None)
+                if mem is not None:
+                    self._memory_bytes -= len(mem[0])
+        return [d for d in removed_digests
+                if not conn.execute("SELECT 1 FROM objects WHERE digest=? LIMIT 1", (d,)).fetchone()]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._conn.close()
+                except sqlite3.Error:
+                    pass
+                self._conn = None
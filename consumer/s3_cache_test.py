@@ -0,0 +1,71 @@
+import tempfile
+
+from s3_cache import S3ObjectCache
+
+
+class FakeBucket:
+    """loader(etag) 흉내: etag 가 같으면 None(304)"""
+
+    def __init__(self, objects):
+        self.objects = objects  # key -> (bytes, etag)
+        self.calls = []
+
+    def loader(self, key):
+        def load(etag):
+            self.calls.append((key, etag))
+            data, current = self.objects[key]
+            if etag == current:
+                return None
+            return data, "image/png", current
+        return load
+
+
+def _cache(root, clock, **kwargs):
+    options = dict(max_bytes=1024, memory_max_bytes=1024, revalidate_sec=60)
+    options.update(kwargs)
+    return S3ObjectCache(root, clock=clock, **options)
+
+
+def test_hit_revalidate_and_change(clock):
+    bucket = FakeBucket({"a.png": (b"v1", '"e1"')})
+    with tempfile.TemporaryDirectory() as root:
+        cache = _cache(root, clock)
+        try:
+            assert cache.get("b", "a.png", bucket.loader("a.png")) == (b"v1", "image/png")
+            assert cache.get("b", "a.png", bucket.loader("a.png")) == (b"v1", "image/png")
+            assert bucket.calls == [("a.png", None)]  # 두 번째는 네트워크 없음
+
+            clock.now += 61
+            assert cache.get("b", "a.png", bucket.loader("a.png")) == (b"v1", "image/png")
+            assert bucket.calls[-1] == ("a.png", '"e1"')  # 조건부 GET → 304
+
+            bucket.objects["a.png"] = (b"v2", '"e2"')
+            clock.now += 61
+            assert cache.get("b", "a.png", bucket.loader("a.png")) == (b"v2", "image/png")
+            assert (cache.hits, cache.revalidated, cache.misses) == (1, 1, 1)
+        finally:
+            cache.close()
+
+
+def test_disk_tier_shared_and_lru_by_bytes(clock):
+    bucket = FakeBucket({k: (k.encode() * 400, f'"{k}"') for k in ("a", "b", "c")})
+    with tempfile.TemporaryDirectory() as root:
+        writer = _cache(root, clock)
+        reader = _cache(root, clock, memory_max_bytes=0)
+        try:
+            for key in ("a", "b"):
+                writer.get("bucket", key, bucket.loader(key))
+                clock.now += 1
+            # 다른 인스턴스(프로세스)도 디스크 계층에서 바로 읽음
+            assert reader.get("bucket", "a", bucket.loader("a"))[0] == b"a" * 400
+            assert len(bucket.calls) == 2
+
+            clock.now += 1
+            writer.get("bucket", "c", bucket.loader("c"))  # 1200 > 1024 → 가장 오래 접근 안 한 b 삭제
+            reader.get("bucket", "a", bucket.loader("a"))
+            assert len(bucket.calls) == 3  # a 는 남아 있음
+            reader.get("bucket", "b", bucket.loader("b"))
+            assert bucket.calls[-1] == ("b", None)
+        finally:
+            writer.close()
+            reader.close()
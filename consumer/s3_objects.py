@@ -0,0 +1,85 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from io import BytesIO
+from typing import List, Optional, Tuple
+
+from static.s3 import *
+from s3_cache import S3ObjectCache
+from resilience import s3_call
+
+# 입력 이미지 병렬 다운로드용 공유 스레드 풀 (boto3 client 와 connection pool 은 스레드 간 공유)
+s3_fetch_executor = ThreadPoolExecutor(max_workers=S3_FETCH_WORKERS, thread_name_prefix="s3-fetch")
+
+
+def _create_cache() -> Optional[S3ObjectCache]:
+    if not S3_CACHE_DIR:
+        return None
+    try:
+        return S3ObjectCache(S3_CACHE_DIR, S3_CACHE_MAX_BYTES, S3_CACHE_MEMORY_MAX_BYTES, S3_CACHE_REVALIDATE_SEC)
+    except OSError as e:
+        print(f"[경고] S3 캐시 디렉토리 사용 불가 → 캐시 없이 진행: {e}")
+        return None
+
+
+s3_cache = _create_cache()
+
+
+def _download(key: str, etag: Optional[str] = None):
+    """get_object. etag 가 주어지면 조건부 GET → 변경 없으면(304) None. 일시적 오류는 재시도(GET 은 멱등)"""
+    kwargs = {"IfNoneMatch": etag} if etag else {}
+
+    def get():
+        from botocore.exceptions import ClientError  # get_s3_client() 가 boto3 를 import 한 뒤에만 필요
+
+        try:
+            resp = get_s3_client().get_object(Bucket=S3_BUCKET, Key=key, **kwargs)
+        except ClientError as e:
+            if etag and e.response.get("Error", {}).get("Code") in ("304", "NotModified"):
+                return None
+            raise
+        # 본문 읽기 중 끊겨도 다시 받도록 read() 까지 재시도 범위에 포함
+        return resp["Body"].read(), resp.get("ContentType", "image/png"), resp.get("ETag")
+
+    return s3_call(get, label=f"s3 get {key}")
+
+
+def fetch_s3_object(image_path: str) -> Tuple[str, bytes, str]:
+    """S3 객체 다운로드 → (파일명, bytes, content-type)"""
+    key = image_path.lstrip("/")
+    if s3_cache is not None:
+        data, ctype = s3_cache.get(S3_BUCKET, key, lambda etag: _download(key, etag))
+    else:
+        data, ctype, _ = _download(key)  # ContentType 은 S3에 저장한 값 재사용
+    return os.path.basename(key), data, ctype
+
+
+def open_binary(image_path: str):
+    fname, data, ctype = fetch_s3_object(image_path)
+    return fname, BytesIO(data), ctype
+
+
+def open_binaries(image_paths: List[str], timeout: float = S3_FETCH_TIMEOUT_SEC, fetch=fetch_s3_object):
+    """
+    여러 S3 객체를 동시에 다운로드 → 요청 순서대로 [(파일명, BytesIO, content-type), ...].
+    전체 지연은 각 다운로드의 합이 아니라 최댓값. 객체마다 timeout 초 안에 끝나야 하며
+    하나라도 실패/초과하면 나머지를 취소하고 예외를 올린다.
+    """
+    if len(image_paths) <= 1:
+        return [open_binary(p) for p in image_paths]
+
+    futures = [s3_fetch_executor.submit(fetch, p) for p in image_paths]
+    deadline = time.monotonic() + timeout
+    results = []
+    try:
+        for path, future in zip(image_paths, futures):
+            try:
+                fname, data, ctype = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                raise TimeoutError(f"S3 다운로드 시간 초과({timeout}s): {path}")
+            results.append((fname, BytesIO(data), ctype))
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+    return results
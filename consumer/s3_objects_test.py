@@ -0,0 +1,29 @@
+import time
+
+import pytest
+
+from s3_objects import open_binaries
+
+
+def _slow_fetch(delays):
+    def fetch(path):
+        time.sleep(delays[path])
+        return path.rsplit("/", 1)[-1], path.encode(), "image/png"
+    return fetch
+
+
+def test_open_binaries_is_concurrent_and_ordered():
+    delays = {"a/base.png": 0.3, "a/ref1.png": 0.1, "a/ref2.png": 0.2}
+    started = time.monotonic()
+    opened = open_binaries(list(delays), fetch=_slow_fetch(delays))
+    elapsed = time.monotonic() - started
+
+    assert [(name, fh.read()) for name, fh, _ in opened] == [
+        ("base.png", b"a/base.png"), ("ref1.png", b"a/ref1.png"), ("ref2.png", b"a/ref2.png")]
+    assert elapsed < 0.55  # 합(0.6s)이 아니라 최댓값(0.3s) 근처
+
+
+def test_open_binaries_timeout():
+    delays = {"a/fast.png": 0.0, "a/slow.png": 1.0}
+    with pytest.raises(TimeoutError):
+        open_binaries(list(delays), timeout=0.2, fetch=_slow_fetch(delays))
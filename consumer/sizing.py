@@ -0,0 +1,113 @@
+"""
+이미지 크기 정책: 요청 출력 크기를 만족하는 가장 싼 API size 를 고르고,
+입력은 보내기 전에 로컬에서 축소, 결과는 로컬에서 요청 크기로 resize.
+
+gpt-image-1 이 받는 size 는 1024x1024 / 1536x1024 / 1024x1536 뿐이고 비용(출력 토큰)은 정사각형이 가장 싸다.
+- 요청 비율과 API size 비율 차이로 잘려 나가는 비율이 max_crop 이하인 size 중 가장 싼 것 선택
+- 입력 이미지는 API 출력 크기를 덮는 데 필요한 해상도까지만 축소 (원본 해상도 그대로 업로드하지 않음)
+- 결과는 가운데를 요청 비율로 잘라 요청 크기로 resize
+"""
+import os
+from io import BytesIO
+from typing import Optional, Tuple
+
+from PIL import Image
+
+Size = Tuple[int, int]
+
+# API size → 출력 토큰 수(medium 품질 기준, 상대 비용)
+API_SIZES = {(1024, 1024): 1056, (1536, 1024): 1584, (1024, 1536): 1584}
+# API 기본 출력 해상도 (편집 결과의 긴 변 최솟값)
+BASE_SIDE = 1024
+
+
+def parse_size(size: Optional[str]) -> Optional[Size]:
+    """'1024x768' → (1024, 768). 'auto' 나 잘못된 값이면 None"""
+    try:
+        w, h = (int(v) for v in (size or "").lower().split("x"))
+    except ValueError:
+        return None
+    return (w, h) if w > 0 and h > 0 else None
+
+
+def size_str(size: Size) -> str:
+    return f"{size[0]}x{size[1]}"
+
+
+def crop_fraction(source: Size, target: Size) -> float:
+    """source 를 target 비율로 가운데 자를 때 잘려 나가는 면적 비율"""
+    a, b = source[0] / source[1], target[0] / target[1]
+    return 1 - min(a, b) / max(a, b)
+
+
+def choose_api_size(target: Size, max_crop: float = 0.15) -> Size:
+    """max_crop 이하로 잘리는 API size 중 가장 싼 것 (없으면 가장 적게 잘리는 것)"""
+    for size in sorted(API_SIZES, key=lambda s: (API_SIZES[s], crop_fraction(s, target))):
+        if crop_fraction(size, target) <= max_crop:
+            return size
+    return min(API_SIZES, key=lambda s: (crop_fraction(s, target), API_SIZES[s]))
+
+
+def edit_target(base: Size, max_side: int) -> Size:
+    """편집 결과 크기: base 비율 유지, 긴 변은 [BASE_SIDE, max_side] 범위"""
+    w, h = base
+    long_side = min(max(max(w, h), BASE_SIDE), max(max_side, 1))
+    scale = long_side / max(w, h)
+    return max(1, round(w * scale)), max(1, round(h * scale))
+
+
+def image_size(data) -> Size:
+    """헤더만 읽어 (width, height)"""
+    raw = data.getvalue() if isinstance(data, BytesIO) else data
+    with Image.open(BytesIO(raw)) as im:
+        return im.size
+
+
+def shrink_part(part, bound: Size):
+    """
+    (filename, data, content-type) 이미지가 bound 를 덮는 데 필요한 것보다 크면 축소한 part 반환.
+    JPEG 는 JPEG 로, 나머지는 PNG(알파 유지)로 다시 인코딩. 작거나 읽을 수 없으면 그대로 반환
+    """
+    filename, data, ctype = part
+    raw = data.getvalue() if isinstance(data, BytesIO) else bytes(data)
+    try:
+        with Image.open(BytesIO(raw)) as im:
+            w, h = im.size
+            scale = max(bound[0] / w, bound[1] / h)
+            if scale >= 1:
+                return part
+            new_size = (max(1, round(w * scale)), max(1, round(h * scale)))
+            fmt = im.format
+            if fmt == "JPEG":
+                im.draft(im.mode, new_size)  # DCT 단계에서 1/2~1/8 로 줄여 디코딩 → 큰 사진도 빠름
+            small = im.resize(new_size, Image.Resampling.BILINEAR, reducing_gap=2.0)
+    except Exception as e:
+        print(f"[경고] 입력 이미지 축소 실패(원본 사용) {filename}: {e}")
+        return part
+
+    buf = BytesIO()
+    if fmt == "JPEG":
+        small.save(buf, format="JPEG", quality=90)
+        ctype = "image/jpeg"
+    else:
+        small.save(buf, format="PNG")
+        filename, ctype = os.path.splitext(filename)[0] + ".png", "image/png"
+    print(f"[정보] 입력 축소 {filename}: {w}x{h} → {new_size[0]}x{new_size[1]} "
+          f"({len(raw) // 1024}KB → {buf.tell() // 1024}KB)")
+    buf.seek(0)
+    return filename, buf, ctype
+
+
+def fit_to_size(img: Image.Image, target: Size) -> Image.Image:
+    """가운데를 target 비율로 잘라 target 크기로 resize (이미 같으면 그대로)"""
+    w, h = img.size
+    tw, th = target
+    if (w, h) == (tw, th):
+        return img
+    if w * th > h * tw:  # 더 넓음 → 좌우를 자름
+        cw = h * tw / th
+        box = ((w - cw) / 2, 0, (w + cw) / 2, h)
+    else:
+        ch = w * th / tw
+        box = (0, (h - ch) / 2, w, (h + ch) / 2)
+    return img.resize(target, Image.Resampling.BICUBIC, box=box, reducing_gap=2.0)
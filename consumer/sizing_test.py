@@ -0,0 +1,68 @@
+from io import BytesIO
+
+from PIL import Image
+
+from sizing import choose_api_size, edit_target, fit_to_size, image_size, parse_size, shrink_part
+
+
+def _encoded(size, fmt="PNG", mode="RGB", color="red"):
+    buf = BytesIO()
+    Image.new(mode, size, color).save(buf, format=fmt)
+    buf.seek(0)
+    return buf
+
+
+def test_parse_size():
+    assert parse_size("1536x1024") == (1536, 1024)
+    assert parse_size("auto") is None
+    assert parse_size(None) is None
+    assert parse_size("0x10") is None
+
+
+def test_cheapest_size_within_crop_tolerance():
+    assert choose_api_size((1024, 1024)) == (1024, 1024)
+    assert choose_api_size((512, 512)) == (1024, 1024)
+    # 4:3 을 정사각형으로 만들면 25% 가 잘림 → 가로형
+    assert choose_api_size((1600, 1200)) == (1536, 1024)
+    assert choose_api_size((1200, 1600)) == (1024, 1536)
+    # 거의 정사각형이면 싼 정사각형
+    assert choose_api_size((1100, 1000)) == (1024, 1024)
+    # 어떤 size 로도 허용 범위를 넘으면 가장 적게 잘리는 size
+    assert choose_api_size((3000, 1000), max_crop=0.1) == (1536, 1024)
+
+
+def test_edit_target_keeps_base_ratio_within_bounds():
+    assert edit_target((4000, 3000), 1536) == (1536, 1152)
+    assert edit_target((400, 300), 1536) == (1024, 768)
+    assert edit_target((1200, 1200), 1536) == (1200, 1200)
+
+
+def test_shrink_part_downscales_to_cover_bound():
+    part = ("photo.jpg", _encoded((4000, 3000), "JPEG"), "image/jpeg")
+    filename, data, ctype = shrink_part(part, (1536, 1024))
+    assert (filename, ctype) == ("photo.jpg", "image/jpeg")
+    assert image_size(data) == (1536, 1152)
+
+
+def test_shrink_part_reencodes_non_jpeg_as_png_with_alpha():
+    part = ("art.webp", _encoded((2048, 2048), "WEBP", "RGBA", (255, 0, 0, 128)), "image/webp")
+    filename, data, ctype = shrink_part(part, (1024, 1024))
+    assert (filename, ctype) == ("art.png", "image/png")
+    with Image.open(data) as im:
+        assert im.size == (1024, 1024) and im.mode == "RGBA"
+
+
+def test_shrink_part_keeps_small_or_unreadable_input():
+    small = ("s.png", _encoded((800, 600)), "image/png")
+    assert shrink_part(small, (1024, 1024)) is small
+    broken = ("x.png", b"not an image", "image/png")
+    assert shrink_part(broken, (1024, 1024)) is broken
+
+
+def test_fit_to_size_center_crops_to_target_ratio():
+    img = Image.new("RGB", (1536, 1024), "blue")
+    img.paste((255, 0, 0), (0, 0, 60, 1024))  # 왼쪽 띠는 잘려 나가야 함
+    out = fit_to_size(img, (800, 600))
+    assert out.size == (800, 600)
+    assert out.getpixel((0, 300)) == (0, 0, 255)
+    assert fit_to_size(img, (1536, 1024)) is img
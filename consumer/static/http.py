@@ -0,0 +1,22 @@
+import os
+
+# OpenAI SDK 와 편집(raw multipart) 호출이 공유하는 HTTP connection pool
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "32"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "16"))
+HTTP_KEEPALIVE_EXPIRY_SEC = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SEC", "90"))
+HTTP_CONNECT_TIMEOUT_SEC = float(os.getenv("HTTP_CONNECT_TIMEOUT_SEC", "5"))
+# 이미지 생성/편집은 응답까지 오래 걸리므로 read timeout 은 넉넉하게
+HTTP_READ_TIMEOUT_SEC = float(os.getenv("HTTP_READ_TIMEOUT_SEC", "180"))
+# 이 요청 수마다 endpoint 별 지연시간 로그 출력 (0이면 출력 안 함)
+HTTP_METRICS_LOG_EVERY = int(os.getenv("HTTP_METRICS_LOG_EVERY", "50"))
+
+# OpenAI 호출 client 측 rate limit (model/endpoint 별, 프로세스 내 공유)
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+# 응답 헤더로 한도를 알기 전 기본 분당 요청 수
+RATE_LIMIT_DEFAULT_RPM = float(os.getenv("RATE_LIMIT_DEFAULT_RPM", "500"))
+# 동시 요청 수 AIMD 시작값/상한
+RATE_LIMIT_INITIAL_CONCURRENCY = int(os.getenv("RATE_LIMIT_INITIAL_CONCURRENCY", "4"))
+RATE_LIMIT_MAX_CONCURRENCY = int(os.getenv("RATE_LIMIT_MAX_CONCURRENCY", "32"))
+# 한도 대기 최대 시간(초)과 429 응답 시 대기 후 재전송 횟수
+RATE_LIMIT_MAX_WAIT_SEC = float(os.getenv("RATE_LIMIT_MAX_WAIT_SEC", "600"))
+RATE_LIMIT_MAX_429_RETRIES = int(os.getenv("RATE_LIMIT_MAX_429_RETRIES", "5"))
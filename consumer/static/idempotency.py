@@ -0,0 +1,10 @@
+import os
+
+# 멱등성 저장소 설정
+IDEMPOTENT_BACKEND = os.getenv("IDEMPOTENT_BACKEND", "sqlite")  # sqlite | memory
+IDEMPOTENT_DB_PATH = os.getenv("IDEMPOTENT_DB_PATH", "/db/processed.db")
+# in_progress 상태가 이 시간(초)보다 오래되면 크래시로 간주하고 재처리 허용
+IDEMPOTENT_LEASE_SEC = int(os.getenv("IDEMPOTENT_LEASE_SEC", "1800"))
+# done/failed 기록 보관 기간(초)과 백그라운드 정리 주기(초)
+IDEMPOTENT_TTL_SEC = int(os.getenv("IDEMPOTENT_TTL_SEC", str(7 * 24 * 3600)))
+IDEMPOTENT_EVICT_INTERVAL_SEC = int(os.getenv("IDEMPOTENT_EVICT_INTERVAL_SEC", "3600"))
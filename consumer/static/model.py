@@ -4,3 +4,22 @@ import os
 API_KEY = os.getenv("OPENAI_API_KEY")
 MODEL = os.getenv("OPENAI_MODEL", "gpt-4.1")
 IMAGES_MODEL = os.getenv("OPENAI_IMAGE_MODEL", "gpt-image-1")
+# 이미지 편집 엔드포인트 (로컬 stub 서버로 테스트할 때 변경)
+IMAGES_EDIT_URL = os.getenv("OPENAI_IMAGES_EDIT_URL", "https://api.openai.com/v1/images/edits")
+IMAGES_GENERATE_URL = os.getenv("OPENAI_IMAGES_GENERATE_URL", "https://api.openai.com/v1/images/generations")
+# 생성/편집 중 partial image(저해상도 미리보기) 스트리밍 → 미리보기마다 업로드 후 진행 메시지 publish
+IMAGE_PREVIEW_ENABLED = os.getenv("IMAGE_PREVIEW_ENABLED", "false").lower() == "true"
+# 요청당 받을 미리보기 수 (API 허용 범위 1~3)
+IMAGE_PREVIEW_PARTIAL_IMAGES = int(os.getenv("IMAGE_PREVIEW_PARTIAL_IMAGES", "2"))
+# 요청 출력 크기를 만족하는 가장 싼 API size 선택 + 입력 로컬 축소 + 결과 로컬 resize (sizing.py)
+IMAGE_SIZING_ENABLED = os.getenv("IMAGE_SIZING_ENABLED", "true").lower() == "true"
+# 생성 결과 크기 (WxH), 편집 결과는 base 이미지 비율로 긴 변 IMAGE_OUTPUT_MAX_SIDE 이하
+IMAGE_OUTPUT_SIZE = os.getenv("IMAGE_OUTPUT_SIZE", "1024x1024")
+IMAGE_OUTPUT_MAX_SIDE = int(os.getenv("IMAGE_OUTPUT_MAX_SIDE", "1536"))
+# API size 비율이 요청 비율과 달라 잘려 나가도 되는 최대 비율 (넘으면 더 비싼 size 선택)
+IMAGE_SIZING_MAX_CROP = float(os.getenv("IMAGE_SIZING_MAX_CROP", "0.15"))
+# router LLM 호출 전에 규칙 기반 pre-router(local_router.py) 사용 여부
+ROUTER_LOCAL_RULES = os.getenv("ROUTER_LOCAL_RULES", "true").lower() == "true"
+# router user 메시지 전체의 토큰 예산(추정치, 초과분은 오래된 chat 이미지부터 제외)과 이미지 설명 최대 길이
+ROUTER_CONTEXT_TOKEN_BUDGET = int(os.getenv("ROUTER_CONTEXT_TOKEN_BUDGET", "2000"))
+ROUTER_DESC_MAX_CHARS = int(os.getenv("ROUTER_DESC_MAX_CHARS", "200"))
@@ -7,6 +7,23 @@ IMAGE_GENERATION_CHAT_RESPONSE_QUEUE = os.getenv('IMAGE_GENERATION_CHAT_RESPONSE
 IMAGE_GENERATION_CHAT_PORT = os.getenv('IMAGE_GENERATION_CHAT_PORT')
 IMAGE_GENERATION_CHAT_USERNAME = os.getenv('IMAGE_GENERATION_CHAT_USERNAME')
 IMAGE_GENERATION_CHAT_PASSWORD = os.getenv('IMAGE_GENERATION_CHAT_PASSWORD')
+# 동시 처리 수 (prefetch = worker 수). channel 작업은 connection 스레드에서만 수행
+IMAGE_GENERATION_CHAT_CONCURRENCY = int(os.getenv('IMAGE_GENERATION_CHAT_CONCURRENCY', '1'))
+# 응답 publish 를 비동기 publisher confirm 으로 (confirm 이 오면 입력 ACK, 여러 건이면 multiple ACK). false 면 publish 마다 confirm 대기
+IMAGE_GENERATION_ASYNC_CONFIRMS = os.getenv('IMAGE_GENERATION_ASYNC_CONFIRMS', 'true').lower() == 'true'
+# 처리 단계: all(router+실행 한 프로세스) | router(라우팅 + clarify 응답, 이미지 작업은 내부 큐로) | executor(이미지 작업 실행)
+IMAGE_GENERATION_STAGE = os.getenv('IMAGE_GENERATION_STAGE', 'all').lower()
+# router → executor 내부 큐 이름 접두사 (subtype 별 큐: <prefix>.generate / .edit / .style_transfer)
+IMAGE_GENERATION_EXECUTE_QUEUE_PREFIX = os.getenv('IMAGE_GENERATION_EXECUTE_QUEUE_PREFIX', 'ai.image.execute')
+# executor 가 소비할 subtype (쉼표 구분). subtype 별로 worker 를 나눠 확장할 때 사용
+IMAGE_GENERATION_EXECUTOR_SUBTYPES = [
+    s.strip() for s in os.getenv('IMAGE_GENERATION_EXECUTOR_SUBTYPES', 'generate,edit,style_transfer').split(',')
+    if s.strip()
+]
+# executor 에서 실패한 job 은 <queue>.retry 큐에서 이 시간(ms) 대기 후 원래 큐로 돌아감
+IMAGE_GENERATION_EXECUTE_RETRY_DELAY_MS = int(os.getenv('IMAGE_GENERATION_EXECUTE_RETRY_DELAY_MS', '30000'))
+# 이 횟수만큼 재시도해도 실패하면 job 을 ACK 후 폐기
+IMAGE_GENERATION_EXECUTE_MAX_RETRIES = int(os.getenv('IMAGE_GENERATION_EXECUTE_MAX_RETRIES', '3'))
 
 # Vote AI
 VOTE_AI_HOST = os.getenv('VOTE_AI_HOST')
@@ -0,0 +1,9 @@
+import os
+
+# 외부 호출(S3/OpenAI) 재시도: 지수 backoff + full jitter
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "3"))
+RETRY_BASE_DELAY_SEC = float(os.getenv("RETRY_BASE_DELAY_SEC", "0.5"))
+RETRY_MAX_DELAY_SEC = float(os.getenv("RETRY_MAX_DELAY_SEC", "8"))
+# 의존성(s3/openai)별 circuit breaker: 연속 실패 횟수 임계값, open 유지 시간(초)
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT_SEC = float(os.getenv("CIRCUIT_RESET_TIMEOUT_SEC", "30"))
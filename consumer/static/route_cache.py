@@ -0,0 +1,10 @@
+import os
+
+# router 결정 캐시 설정 (같은 prompt/업로드/대화 이미지/요약/모델이면 LLM 재호출 생략)
+ROUTE_CACHE_ENABLED = os.getenv("ROUTE_CACHE_ENABLED", "true").lower() == "true"
+ROUTE_CACHE_MAX_ENTRIES = int(os.getenv("ROUTE_CACHE_MAX_ENTRIES", "1024"))
+ROUTE_CACHE_TTL_SEC = int(os.getenv("ROUTE_CACHE_TTL_SEC", "3600"))
+# 비어 있으면 in-memory LRU만 사용. 경로를 주면 sqlite 영속 계층 추가 (재시작/여러 프로세스 간 공유)
+ROUTE_CACHE_DB_PATH = os.getenv("ROUTE_CACHE_DB_PATH", "")
+# 이 횟수마다 hit rate 로그 출력
+ROUTE_CACHE_LOG_EVERY = int(os.getenv("ROUTE_CACHE_LOG_EVERY", "100"))
@@ -1,6 +1,5 @@
 import os
-import boto3
-from botocore.client import Config
+import threading
 
 
 # S3 setup
@@ -10,11 +9,49 @@ AWS_REGION = os.getenv('AWS_REGION')
 S3_BUCKET = os.getenv('S3_BUCKET')
 PUBLIC_BASE_URL = os.getenv('PUBLIC_BASE_URL')
 S3_PATH_PREFIX = os.getenv('S3_PATH_PREFIX', '/generated-images')
+# 생성 중 미리보기(partial image) 업로드 경로
+S3_PREVIEW_PATH_PREFIX = os.getenv('S3_PREVIEW_PATH_PREFIX', '/generated-images/previews')
+# router 호출 중 base/reference/style 후보 이미지를 미리 받는 스레드 수 (0이면 prefetch 사용 안 함)
+S3_PREFETCH_WORKERS = int(os.getenv('S3_PREFETCH_WORKERS', '4'))
+# 요청당 prefetch 할 최대 이미지 수
+S3_PREFETCH_MAX_IMAGES = int(os.getenv('S3_PREFETCH_MAX_IMAGES', '4'))
+# 요청 하나의 입력 이미지들(base/mask/refs/style)을 동시에 받는 스레드 수와 객체당 timeout(초)
+S3_FETCH_WORKERS = int(os.getenv('S3_FETCH_WORKERS', '8'))
+S3_FETCH_TIMEOUT_SEC = float(os.getenv('S3_FETCH_TIMEOUT_SEC', '30'))
+# 모든 다운로드 스레드가 공유하는 HTTP connection pool 크기
+S3_MAX_POOL_CONNECTIONS = int(os.getenv('S3_MAX_POOL_CONNECTIONS', str(S3_FETCH_WORKERS + S3_PREFETCH_WORKERS)))
+# S3 객체 로컬 캐시 (비어 있으면 사용 안 함). 같은 호스트의 worker 들이 디렉토리를 공유
+S3_CACHE_DIR = os.getenv('S3_CACHE_DIR', '/db/s3-cache')
+S3_CACHE_MAX_BYTES = int(os.getenv('S3_CACHE_MAX_BYTES', str(2 * 1024 ** 3)))
+S3_CACHE_MEMORY_MAX_BYTES = int(os.getenv('S3_CACHE_MEMORY_MAX_BYTES', str(256 * 1024 ** 2)))
+# 이 시간(초)이 지난 캐시 항목은 ETag 조건부 GET 으로 변경 여부 확인
+S3_CACHE_REVALIDATE_SEC = float(os.getenv('S3_CACHE_REVALIDATE_SEC', '300'))
 
-s3_client = boto3.client(
-    's3',
-    aws_access_key_id=AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-    region_name=AWS_REGION,
-    config=Config(signature_version='s3v4')
-)
+_s3_client = None
+_s3_client_lock = threading.Lock()
+
+
+def get_s3_client():
+    """boto3 S3 client (첫 사용 시 생성 → S3 를 쓰지 않는 프로세스는 boto3 를 import 하지 않음)"""
+    global _s3_client
+    if _s3_client is None:
+        with _s3_client_lock:
+            if _s3_client is None:
+                import boto3
+                from botocore.client import Config
+
+                _s3_client = boto3.client(
+                    's3',
+                    aws_access_key_id=AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
+                    region_name=AWS_REGION,
+                    config=Config(
+                        signature_version='s3v4',
+                        max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+                        connect_timeout=5,
+                        read_timeout=S3_FETCH_TIMEOUT_SEC,
+                        # 재시도는 resilience.s3_call 에서만 (botocore 자체 재시도와 겹치지 않도록)
+                        retries={'total_max_attempts': 1, 'mode': 'standard'},
+                    )
+                )
+    return _s3_client
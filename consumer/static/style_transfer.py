@@ -0,0 +1,12 @@
+import os
+
+# 스타일 변환 실행 위치: local(이 프로세스에서 StyTR2 실행, torch 필요) | remote(style_transfer_consumer 서비스에 요청)
+STYLE_TRANSFER_BACKEND = os.getenv("STYLE_TRANSFER_BACKEND", "local").lower()
+# remote 요청 큐 (응답은 호출 프로세스 전용 exclusive 큐로 받음)
+STYLE_TRANSFER_REQUEST_QUEUE = os.getenv("STYLE_TRANSFER_REQUEST_QUEUE", "ai.image.style_transfer.request")
+# remote 응답 대기 시간(초). 넘으면 실패 처리하고 요청 메시지도 브로커에서 만료
+STYLE_TRANSFER_TIMEOUT_SEC = float(os.getenv("STYLE_TRANSFER_TIMEOUT_SEC", "120"))
+# worker 서비스: 한 번에 추론할 최대 요청 수와 batch 를 채우기 위해 기다리는 최대 시간(ms)
+STYLE_TRANSFER_BATCH_SIZE = int(os.getenv("STYLE_TRANSFER_BATCH_SIZE", "4"))
+STYLE_TRANSFER_BATCH_WAIT_MS = int(os.getenv("STYLE_TRANSFER_BATCH_WAIT_MS", "50"))
+STYLE_TRANSFER_VARIANT = os.getenv("STYLE_TRANSFER_VARIANT", "full")
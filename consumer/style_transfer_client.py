@@ -0,0 +1,173 @@
+"""
+style transfer worker 서비스(style_transfer_consumer.py) request/reply 클라이언트.
+
+요청: STYLE_TRANSFER_REQUEST_QUEUE 로 {content, style(base64), preserve_color} publish
+     (reply_to = 프로세스 전용 exclusive 큐, correlation_id = 요청 id, expiration = 응답 대기 시간)
+응답: reply 큐에서 correlation_id 로 대기 중인 Future 를 찾아 결과 전달.
+연결은 백그라운드 스레드 하나가 소유하고, worker 스레드들은 add_callback_threadsafe 로 publish 만 넘긴다.
+"""
+import base64
+import json
+import ssl
+import threading
+import time
+import uuid
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from io import BytesIO
+from typing import Dict, Optional
+
+from static.rabbitmq import *
+from static.style_transfer import *
+
+
+# ── 메시지 형식 ───────────────────────────────────────────────────────
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+
+def _read(fp) -> bytes:
+    if isinstance(fp, (bytes, bytearray)):
+        return bytes(fp)
+    fp.seek(0)
+    return fp.read()
+
+
+def encode_request(content, style, preserve_color: bool) -> bytes:
+    return json.dumps({"content": _b64(_read(content)), "style": _b64(_read(style)),
+                       "preserve_color": bool(preserve_color)}).encode("utf-8")
+
+
+def decode_request(body: bytes) -> tuple:
+    """→ (content BytesIO, style BytesIO, preserve_color)"""
+    req = json.loads(body.decode("utf-8"))
+    return (BytesIO(base64.b64decode(req["content"])), BytesIO(base64.b64decode(req["style"])),
+            bool(req.get("preserve_color", False)))
+
+
+def encode_reply(result: Optional[BytesIO], error: str = "") -> bytes:
+    if result is None:
+        return json.dumps({"ok": False, "error": error or "style transfer 실패"}).encode("utf-8")
+    return json.dumps({"ok": True, "image": _b64(_read(result))}).encode("utf-8")
+
+
+def decode_reply(body: bytes) -> Optional[BytesIO]:
+    reply = json.loads(body.decode("utf-8"))
+    if not reply.get("ok"):
+        print(f"[에러] style transfer 서비스 실패: {reply.get('error')}")
+        return None
+    return BytesIO(base64.b64decode(reply["image"]))
+
+
+def connection_params(connection_name: str):
+    import pika
+
+    return pika.ConnectionParameters(
+        host=IMAGE_GENERATION_CHAT_HOST,
+        port=int(IMAGE_GENERATION_CHAT_PORT),
+        credentials=pika.PlainCredentials(IMAGE_GENERATION_CHAT_USERNAME, IMAGE_GENERATION_CHAT_PASSWORD),
+        ssl_options=pika.SSLOptions(ssl.create_default_context()),
+        heartbeat=120,
+        blocked_connection_timeout=300,
+        client_properties={"connection_name": connection_name},
+    )
+
+
+# ── 클라이언트 ────────────────────────────────────────────────────────
+class StyleTransferClient:
+    def __init__(self, request_queue: str = STYLE_TRANSFER_REQUEST_QUEUE,
+                 timeout_sec: float = STYLE_TRANSFER_TIMEOUT_SEC, params_factory=connection_params):
+        self.request_queue = request_queue
+        self.timeout_sec = timeout_sec
+        self._params_factory = params_factory
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Future] = {}
+        self._connection = None
+        self._channel = None
+        self._reply_queue: Optional[str] = None
+        self._ready = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="style-transfer-client", daemon=True)
+                self._thread.start()
+        if not self._ready.wait(self.timeout_sec):
+            raise TimeoutError("style transfer 서비스 연결 시간 초과")
+
+    def _run(self):
+        import pika
+
+        while True:
+            try:
+                connection = pika.BlockingConnection(self._params_factory("style-transfer-client"))
+                channel = connection.channel()
+                channel.queue_declare(queue=self.request_queue, durable=True)
+                reply_queue = channel.queue_declare(queue="", exclusive=True, auto_delete=True).method.queue
+                channel.basic_consume(queue=reply_queue, on_message_callback=self._on_reply, auto_ack=True)
+                self._connection, self._channel, self._reply_queue = connection, channel, reply_queue
+                self._ready.set()
+                channel.start_consuming()
+            except Exception as e:
+                print(f"[경고] style transfer 클라이언트 연결 예외: {e}")
+            finally:
+                self._ready.clear()
+                self._fail_pending("style transfer 서비스 연결 끊김")
+            time.sleep(2.0)
+
+    def _on_reply(self, ch, method, properties, body):
+        with self._lock:
+            future = self._pending.pop(properties.correlation_id, None)
+        if future is None:
+            return  # 이미 timeout 된 요청의 늦은 응답
+        try:
+            future.set_result(decode_reply(body))
+        except Exception as e:
+            future.set_exception(e)
+
+    def _fail_pending(self, reason: str):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(ConnectionError(reason))
+
+    def transfer(self, content, style, preserve_color: bool = False) -> Optional[BytesIO]:
+        """wait_for_result 와 같은 계약: 결과 PNG BytesIO, 실패/timeout 시 None"""
+        import pika
+
+        try:
+            self._start()
+            corr_id = uuid.uuid4().hex
+            future = Future()
+            with self._lock:
+                self._pending[corr_id] = future
+            body = encode_request(content, style, preserve_color)
+            properties = pika.BasicProperties(reply_to=self._reply_queue, correlation_id=corr_id,
+                                              expiration=str(int(self.timeout_sec * 1000)))
+            channel = self._channel
+            self._connection.add_callback_threadsafe(lambda: channel.basic_publish(
+                exchange="", routing_key=self.request_queue, properties=properties, body=body))
+            try:
+                return future.result(timeout=self.timeout_sec)
+            except FutureTimeoutError:
+                print(f"[에러] style transfer 응답 시간 초과({self.timeout_sec}s)")
+                return None
+            finally:
+                with self._lock:
+                    self._pending.pop(corr_id, None)
+        except Exception as e:
+            print(f"[에러] style transfer 요청 실패: {e}")
+            return None
+
+
+_client: Optional[StyleTransferClient] = None
+_client_lock = threading.Lock()
+
+
+def style_transfer_client() -> StyleTransferClient:
+    """프로세스 공용 클라이언트 (reply 큐/연결 하나를 worker 스레드들이 공유)"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = StyleTransferClient()
+        return _client
@@ -0,0 +1,92 @@
+from concurrent.futures import Future
+from io import BytesIO
+from types import SimpleNamespace
+
+import pytest
+
+from style_transfer_client import StyleTransferClient, decode_reply, decode_request, encode_reply, encode_request
+
+
+class StalledConnection:
+    """publish 콜백을 실행하지 않고 쌓아 둠 (서비스가 응답하지 않는 상황)"""
+
+    def __init__(self):
+        self.callbacks = []
+
+    def add_callback_threadsafe(self, callback):
+        self.callbacks.append(callback)
+
+
+class RecordingChannel:
+    def __init__(self):
+        self.published = []
+
+    def basic_publish(self, exchange, routing_key, properties, body):
+        self.published.append((routing_key, properties))
+
+
+def _connected_client(timeout_sec=5.0):
+    # 연결 스레드 없이 연결된 상태로 만듦 (_on_reply / _fail_pending 을 직접 호출)
+    client = StyleTransferClient(request_queue="style.req", timeout_sec=timeout_sec)
+    client._thread = object()
+    client._ready.set()
+    client._connection, client._channel, client._reply_queue = StalledConnection(), RecordingChannel(), "amq.gen-reply"
+    return client
+
+
+def _reply(client, corr_id, body):
+    client._on_reply(None, None, SimpleNamespace(correlation_id=corr_id), body)
+
+
+def test_request_round_trip():
+    content, style, preserve_color = decode_request(encode_request(BytesIO(b"content"), b"style", True))
+    assert (content.read(), style.read(), preserve_color) == (b"content", b"style", True)
+
+
+def test_reply_round_trip_and_failure():
+    result = BytesIO(b"png")
+    result.read()  # 이미 읽은 버퍼도 처음부터 전송
+    assert decode_reply(encode_reply(result)).read() == b"png"
+    assert decode_reply(encode_reply(None, "model error")) is None
+
+
+def test_reply_resolves_only_matching_request():
+    client = _connected_client()
+    first, second = Future(), Future()
+    client._pending.update({"a": first, "b": second})
+
+    _reply(client, "b", encode_reply(BytesIO(b"png-b")))
+
+    assert second.result(timeout=0).read() == b"png-b"
+    assert not first.done()
+    assert list(client._pending) == ["a"]
+
+    _reply(client, "a", encode_reply(None, "model error"))
+    assert first.result(timeout=0) is None
+
+
+def test_late_reply_after_timeout_is_ignored():
+    client = _connected_client(timeout_sec=0.05)
+
+    assert client.transfer(b"content", b"style") is None  # 응답 없이 timeout
+    assert client._pending == {}
+    for publish in client._connection.callbacks:
+        publish()
+    (routing_key, properties), = client._channel.published
+    assert (routing_key, properties.reply_to) == ("style.req", "amq.gen-reply")
+
+    _reply(client, properties.correlation_id, encode_reply(BytesIO(b"late")))  # 예외 없이 버림
+    assert client._pending == {}
+
+
+def test_fail_pending_fails_every_waiter_on_disconnect():
+    client = _connected_client()
+    futures = [Future(), Future()]
+    client._pending.update({"a": futures[0], "b": futures[1]})
+
+    client._fail_pending("style transfer 서비스 연결 끊김")
+
+    assert client._pending == {}
+    for future in futures:
+        with pytest.raises(ConnectionError):
+            future.result(timeout=0)
@@ -0,0 +1,106 @@
+"""
+style transfer worker 서비스.
+
+StyTR2 모델을 GPU 에 한 번만 올려 두고(resident), STYLE_TRANSFER_REQUEST_QUEUE 의 요청을
+여러 호출자(generation_consumer 프로세스들)에 걸쳐 batch 로 묶어 추론한 뒤 각 reply_to 큐로 응답한다.
+- pika connection 스레드는 메시지 수신/응답/ack 만 처리 (추론은 MicroBatcher 스레드)
+- prefetch = batch 크기의 2배 → 한 batch 를 추론하는 동안 다음 batch 가 모임
+"""
+import time
+
+from static.style_transfer import *
+from micro_batch import MicroBatcher
+from style_transfer_client import connection_params, decode_request, encode_reply
+
+
+def load_model():
+    from styletransfer.StyTR2.stytr2 import StyTR2
+    from styletransfer.utills import get_gpu_memory
+
+    while not get_gpu_memory("StyTR2"):
+        print("[정보] GPU 메모리 부족 → 10초 후 다시 확인")
+        time.sleep(10)
+    model = StyTR2(variant=STYLE_TRANSFER_VARIANT, resident=True)
+    print(f"[정보] StyTR2({STYLE_TRANSFER_VARIANT}) 로드 완료")
+    return model
+
+
+def create_batcher(model) -> MicroBatcher:
+    def run_batch(items):
+        started = time.perf_counter()
+        results = model.inference_batch(items)
+        print(f"[정보] style transfer batch {len(items)}건 {time.perf_counter() - started:.2f}s")
+        return results
+
+    return MicroBatcher(run_batch, STYLE_TRANSFER_BATCH_SIZE, STYLE_TRANSFER_BATCH_WAIT_MS / 1000.0,
+                        name="style-transfer-batch")
+
+
+def create_handler(connection, channel, batcher: MicroBatcher, basic_properties):
+    """요청을 batcher 에 넘기고, 결과가 나오면 reply_to 로 응답한 뒤 ack 하는 on_message 콜백"""
+    def reply(method, properties, body: bytes):
+        if properties.reply_to:
+            channel.basic_publish(
+                exchange="", routing_key=properties.reply_to, body=body,
+                properties=basic_properties(correlation_id=properties.correlation_id))
+        channel.basic_ack(delivery_tag=method.delivery_tag)
+
+    def on_message(ch, method, properties, body):
+        try:
+            future = batcher.submit(decode_request(body))
+        except Exception as e:
+            print(f"[에러] 잘못된 style transfer 요청: {e}")
+            reply(method, properties, encode_reply(None, str(e)))
+            return
+
+        def done(f):
+            try:
+                result = f.result()
+                out = encode_reply(result)
+            except Exception as e:
+                print(f"[에러] style transfer 추론 실패: {e}")
+                out = encode_reply(None, str(e))
+            # channel 작업은 connection 스레드에서
+            connection.add_callback_threadsafe(lambda: reply(method, properties, out))
+
+        future.add_done_callback(done)
+
+    return on_message
+
+
+def main():
+    import pika
+
+    batcher = create_batcher(load_model())
+
+    while True:
+        connection = None
+        try:
+            connection = pika.BlockingConnection(connection_params("style-transfer-worker"))
+            channel = connection.channel()
+            channel.basic_qos(prefetch_count=STYLE_TRANSFER_BATCH_SIZE * 2)
+            channel.queue_declare(queue=STYLE_TRANSFER_REQUEST_QUEUE, durable=True)
+
+            on_message = create_handler(connection, channel, batcher, pika.BasicProperties)
+            channel.basic_consume(queue=STYLE_TRANSFER_REQUEST_QUEUE, on_message_callback=on_message,
+                                  auto_ack=False)
+            print(f"[🚀] style transfer 요청 대기 중... (batch {STYLE_TRANSFER_BATCH_SIZE}, "
+                  f"대기 {STYLE_TRANSFER_BATCH_WAIT_MS}ms)")
+            channel.start_consuming()
+
+        except KeyboardInterrupt:
+            print("[🧩] 사용자 종료 요청")
+            batcher.close()
+            break
+        except Exception as e:
+            print(f"[경고] 소비자 루프 예외 발생: {e}")
+            time.sleep(2.0)
+            continue
+        finally:
+            if connection and not connection.is_closed:
+                connection.close()
+            print("[✔] 연결 종료")
+
+
+if __name__ == "__main__":
+    main()
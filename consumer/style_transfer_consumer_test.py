@@ -0,0 +1,92 @@
+from concurrent.futures import Future
+from io import BytesIO
+from types import SimpleNamespace
+
+from style_transfer_client import decode_reply, encode_request
+from style_transfer_consumer import create_handler
+
+
+class FakeConnection:
+    def __init__(self):
+        self.callbacks = []
+
+    def add_callback_threadsafe(self, callback):
+        self.callbacks.append(callback)
+
+    def run_callbacks(self):
+        callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            callback()
+
+
+class FakeChannel:
+    def __init__(self):
+        self.ops = []
+
+    def basic_publish(self, exchange, routing_key, body, properties):
+        self.ops.append(("publish", routing_key, properties.correlation_id, body))
+
+    def basic_ack(self, delivery_tag):
+        self.ops.append(("ack", delivery_tag))
+
+
+class FakeBatcher:
+    def __init__(self):
+        self.futures = []
+
+    def submit(self, item):
+        future = Future()
+        self.futures.append((item, future))
+        return future
+
+
+def _handler():
+    connection, channel, batcher = FakeConnection(), FakeChannel(), FakeBatcher()
+    return create_handler(connection, channel, batcher, SimpleNamespace), connection, channel, batcher
+
+
+def _props(reply_to="reply-q", correlation_id="c1"):
+    return SimpleNamespace(reply_to=reply_to, correlation_id=correlation_id)
+
+
+def test_replies_then_acks_on_connection_thread():
+    on_message, connection, channel, batcher = _handler()
+    on_message(None, SimpleNamespace(delivery_tag=7), _props(), encode_request(b"c", b"s", True))
+
+    (content, style, preserve_color), future = batcher.futures[0]
+    assert (content.read(), style.read(), preserve_color) == (b"c", b"s", True)
+    future.set_result(BytesIO(b"png"))
+    assert channel.ops == []  # batch 스레드에서는 channel 을 건드리지 않음
+
+    connection.run_callbacks()
+    (op, key, corr_id, body), ack = channel.ops
+    assert (op, key, corr_id) == ("publish", "reply-q", "c1")
+    assert decode_reply(body).read() == b"png"
+    assert ack == ("ack", 7)
+
+
+def test_inference_failure_replies_error():
+    on_message, connection, channel, batcher = _handler()
+    on_message(None, SimpleNamespace(delivery_tag=1), _props(), encode_request(b"c", b"s", False))
+    batcher.futures[0][1].set_exception(RuntimeError("CUDA OOM"))
+
+    connection.run_callbacks()
+    assert decode_reply(channel.ops[0][3]) is None
+    assert channel.ops[1] == ("ack", 1)
+
+
+def test_bad_request_replies_immediately_and_acks():
+    on_message, connection, channel, batcher = _handler()
+    on_message(None, SimpleNamespace(delivery_tag=3), _props(), b"not json")
+
+    assert batcher.futures == [] and connection.callbacks == []
+    assert [op[0] for op in channel.ops] == ["publish", "ack"]
+
+
+def test_no_reply_to_only_acks():
+    on_message, connection, channel, batcher = _handler()
+    on_message(None, SimpleNamespace(delivery_tag=4), _props(reply_to=None), encode_request(b"c", b"s", False))
+    batcher.futures[0][1].set_result(BytesIO(b"png"))
+
+    connection.run_callbacks()
+    assert channel.ops == [("ack", 4)]
@@ -0,0 +1,72 @@
+import os
+import torch.utils.data as data
+from PIL import Image
+from torchvision import transforms
+from pathlib import Path
+
+
+def train_transform(crop_size=256):
+    # resize is kept at 2x the crop so every stage sees the same field of view
+    # (crop_size=256 is the original 512 -> 256 setting)
+    transform_list = [
+        transforms.Resize(size=(crop_size * 2, crop_size * 2)),
+        transforms.RandomCrop(crop_size),
+        transforms.ToTensor()
+    ]
+    return transforms.Compose(transform_list)
+
+
+def parse_curriculum(spec, default_crop=256, patch_size=8):
+    """ "0:128,20000:192,60000:256" -> [(0, 128), (20000, 192), (60000, 256)]
+    Each entry is (start iteration, crop size). An empty spec is a single full-size stage.
+    Every crop must be a multiple of patch_size, otherwise the patch grid would drop the border.
+    """
+    if not spec:
+        return [(0, default_crop)]
+    stages = []
+    for item in spec.split(','):
+        start, crop = item.split(':')
+        crop = int(crop)
+        if crop <= 0 or crop % patch_size:
+            raise ValueError(f"curriculum crop {crop} is not a positive multiple of patch size {patch_size}: {spec}")
+        stages.append((int(start), crop))
+    stages.sort()
+    if stages[0][0] != 0:
+        raise ValueError(f"curriculum must start at iteration 0: {spec}")
+    return stages
+
+
+def scaled_batch_size(base_batch_size, crop_size, base_crop=256, max_batch_size=None):
+    """ Batch size that keeps pixels per step constant relative to base_batch_size at base_crop.
+    Conv/VGG memory scales with pixels and attention memory with tokens^2, so at smaller crops
+    this never uses more memory than the base setting.
+    """
+    batch_size = int(base_batch_size * (base_crop / crop_size) ** 2)
+    if max_batch_size:
+        batch_size = min(batch_size, max_batch_size)
+    return max(1, batch_size)
+
+
+class FlatFolderDataset(data.Dataset):
+    def __init__(self, root, transform):
+        super(FlatFolderDataset, self).__init__()
+        self.root = root
+        print(self.root)
+        self.path = os.listdir(self.root)
+        if os.path.isdir(os.path.join(self.root,self.path[0])):
+            self.paths = []
+            for file_name in os.listdir(self.root):
+                for file_name1 in os.listdir(os.path.join(self.root,file_name)):
+                    self.paths.append(self.root+"/"+file_name+"/"+file_name1)             
+        else:
+            self.paths = list(Path(self.root).glob('*'))
+        self.transform = transform
+    def __getitem__(self, index):
+        path = self.paths[index]
+        img = Image.open(str(path)).convert('RGB')
+        img = self.transform(img)
+        return img
+    def __len__(self):
+        return len(self.paths)
+    def name(self):
+        return 'FlatFolderDataset'
@@ -0,0 +1,34 @@
+import pytest
+
+from styletransfer.StyTR2.dataset import parse_curriculum, scaled_batch_size
+
+
+def test_parse_curriculum_sorts_stages():
+    assert parse_curriculum("60000:256,0:128,20000:192") == [(0, 128), (20000, 192), (60000, 256)]
+
+
+def test_empty_curriculum_is_single_stage_from_zero():
+    assert parse_curriculum("") == [(0, 256)]
+    assert parse_curriculum(None, default_crop=192) == [(0, 192)]
+
+
+def test_curriculum_must_start_at_zero():
+    with pytest.raises(ValueError, match="iteration 0"):
+        parse_curriculum("100:128,2000:256")
+
+
+def test_curriculum_rejects_crops_off_the_patch_grid():
+    with pytest.raises(ValueError, match="patch size 8"):
+        parse_curriculum("0:100,2000:256")
+    with pytest.raises(ValueError, match="patch size 16"):
+        parse_curriculum("0:136", patch_size=16)
+    with pytest.raises(ValueError):
+        parse_curriculum("0:0")
+    assert parse_curriculum("0:144", patch_size=16) == [(0, 144)]
+
+
+def test_scaled_batch_size_keeps_pixels_and_respects_cap():
+    assert scaled_batch_size(8, 256) == 8
+    assert scaled_batch_size(8, 128) == 32
+    assert scaled_batch_size(8, 128, max_batch_size=16) == 16
+    assert scaled_batch_size(1, 512) == 1  # never below 1
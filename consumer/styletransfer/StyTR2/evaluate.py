@@ -0,0 +1,204 @@
+"""
+StyTR2 오프라인 평가 하네스.
+
+고정된 content × style 그리드를 배치로 StyTR2에 통과시켜
+- 품질: VGG encoder 기반 content loss / style loss (StyTrans 학습 손실과 동일한 정의)
+- 성능: 이미지당 지연시간(p50/p95)과 처리량
+을 표로 출력한다. --baseline 으로 이전 결과 JSON을 주면 지표 변화량도 함께 출력하므로
+정밀도/해상도/배치 등 추론 경로 변경을 배포 전에 비교할 수 있다.
+
+실행 (consumer/ 에서):
+    python -m styletransfer.StyTR2.evaluate --content_dir ... --style_dir ... --batch_size 4 --save_json base.json
+    python -m styletransfer.StyTR2.evaluate ... --precision fp16 --baseline base.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import time
+from pathlib import Path
+
+import torch
+import torch.nn.functional as F
+from PIL import Image
+from torchvision import transforms
+from torchvision.utils import save_image
+
+from .function import calc_mean_std, normal, coral_batch
+from .stytr2 import StyTR2, device
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+PRECISIONS = {"fp32": None, "fp16": torch.float16, "bf16": torch.bfloat16}
+
+
+def list_images(root, limit):
+    paths = sorted(p for p in Path(root).iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+    return paths[:limit] if limit else paths
+
+
+def load_images(paths, size):
+    tf = transforms.Compose([transforms.Resize((size, size)), transforms.ToTensor()])
+    return [tf(Image.open(str(p)).convert("RGB")) for p in paths]
+
+
+def content_loss(out_feats, content_feats):
+    """StyTrans.forward의 loss_c와 동일: relu4_1, relu5_1 정규화 feature MSE"""
+    return (F.mse_loss(normal(out_feats[-1]), normal(content_feats[-1]), reduction="none").mean(dim=(1, 2, 3))
+            + F.mse_loss(normal(out_feats[-2]), normal(content_feats[-2]), reduction="none").mean(dim=(1, 2, 3)))
+
+
+def style_loss(out_feats, style_feats):
+    """StyTrans.forward의 loss_s와 동일: 5개 relu 층의 채널 평균/표준편차 MSE 합"""
+    total = 0
+    for out_f, style_f in zip(out_feats, style_feats):
+        out_mean, out_std = calc_mean_std(out_f)
+        style_mean, style_std = calc_mean_std(style_f)
+        total = total + (out_mean - style_mean).pow(2).mean(dim=(1, 2, 3)) \
+                      + (out_std - style_std).pow(2).mean(dim=(1, 2, 3))
+    return total
+
+
+def _sync():
+    if device.type == "cuda":
+        torch.cuda.synchronize(device)
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    idx = min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+@torch.no_grad()
+def run(args):
+    model = StyTR2(variant=args.variant).model
+    dtype = PRECISIONS[args.precision]
+    if dtype == torch.float16 and device.type != "cuda":
+        raise ValueError("fp16 평가는 CUDA 장치에서만 지원합니다.")
+
+    content_paths = list_images(args.content_dir, args.max_content)
+    style_paths = list_images(args.style_dir, args.max_style)
+    contents = load_images(content_paths, args.size)
+    styles = load_images(style_paths, args.size)
+    grid = [(ci, si) for ci in range(len(contents)) for si in range(len(styles))]
+    if not grid:
+        print("[정보] 평가할 content/style 이미지가 없습니다.")
+        return None
+
+    if args.save_images:
+        os.makedirs(args.save_images, exist_ok=True)
+
+    def autocast():
+        if dtype is None:
+            return contextlib.nullcontext()
+        return torch.autocast(device_type=device.type, dtype=dtype)
+
+    batches = [grid[i:i + args.batch_size] for i in range(0, len(grid), args.batch_size)]
+
+    # warmup (cudnn autotune / 메모리 할당)
+    c0 = torch.stack([contents[ci] for ci, _ in batches[0]]).to(device)
+    s0 = torch.stack([styles[si] for _, si in batches[0]]).to(device)
+    with autocast():
+        model.stylize(c0, s0)
+    _sync()
+
+    per_image_ms, content_losses, style_losses = [], [], []
+    total_start = time.perf_counter()
+    for batch in batches:
+        content = torch.stack([contents[ci] for ci, _ in batch]).to(device)
+        style = torch.stack([styles[si] for _, si in batch]).to(device)
+
+        _sync()
+        start = time.perf_counter()
+        with autocast():
+            out = model.stylize(content, style)
+        if args.preserve_color:
+            out = coral_batch(torch.clamp(out, 0, 1), content)
+        _sync()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        per_image_ms.extend([elapsed_ms / len(batch)] * len(batch))
+
+        # 품질 지표는 fp32로 계산 (정밀도 변경 효과만 출력 이미지에 반영되도록)
+        out = torch.clamp(out.float(), 0, 1)
+        out_feats = model.encode_with_intermediate(out)
+        content_losses.extend(content_loss(out_feats, model.encode_with_intermediate(content)).tolist())
+        style_losses.extend(style_loss(out_feats, model.encode_with_intermediate(style)).tolist())
+
+        if args.save_images:
+            for (ci, si), img in zip(batch, out):
+                save_image(img, os.path.join(args.save_images, f"{content_paths[ci].stem}__{style_paths[si].stem}.png"))
+    total_s = time.perf_counter() - total_start
+
+    n = len(grid)
+    result = {
+        "variant": args.variant,
+        "precision": args.precision,
+        "preserve_color": args.preserve_color,
+        "size": args.size,
+        "batch_size": args.batch_size,
+        "images": n,
+        "content_loss": sum(content_losses) / n,
+        "style_loss": sum(style_losses) / n,
+        "latency_ms_p50": _percentile(per_image_ms, 50),
+        "latency_ms_p95": _percentile(per_image_ms, 95),
+        "latency_ms_mean": sum(per_image_ms) / n,
+        "throughput_img_s": n / total_s if total_s > 0 else 0.0,
+    }
+    report(result, load_baseline(args.baseline))
+
+    if args.save_json:
+        with open(args.save_json, "w", encoding="utf-8") as fp:
+            json.dump(result, fp, ensure_ascii=False, indent=2)
+        print(f"[저장] {args.save_json}")
+    return result
+
+
+def load_baseline(path):
+    if not path:
+        return None
+    with open(path, "r", encoding="utf-8") as fp:
+        return json.load(fp)
+
+
+def report(result, baseline=None):
+    print("\n=== STYTR2 EVAL ===")
+    print(f"variant={result['variant']} precision={result['precision']} "
+          f"preserve_color={result.get('preserve_color', False)} size={result['size']} "
+          f"batch={result['batch_size']} images={result['images']}")
+    rows = [
+        ("content_loss", "{:.4f}"),
+        ("style_loss", "{:.4f}"),
+        ("latency_ms_p50", "{:.2f}"),
+        ("latency_ms_p95", "{:.2f}"),
+        ("latency_ms_mean", "{:.2f}"),
+        ("throughput_img_s", "{:.2f}"),
+    ]
+    for key, fmt in rows:
+        line = f"{key:>18}: {fmt.format(result[key]):>10}"
+        if baseline and key in baseline and baseline[key]:
+            delta = (result[key] - baseline[key]) / baseline[key] * 100
+            line += f"   (baseline {fmt.format(baseline[key])}, {delta:+.1f}%)"
+        print(line)
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="StyTR2 배치 평가 (품질 지표 + 지연시간 표)")
+    p.add_argument("--content_dir", required=True, help="content 이미지 디렉토리 (정렬 순서로 고정)")
+    p.add_argument("--style_dir", required=True, help="style 이미지 디렉토리 (정렬 순서로 고정)")
+    p.add_argument("--max_content", type=int, default=8)
+    p.add_argument("--max_style", type=int, default=8)
+    p.add_argument("--variant", default="full", choices=("full", "fast"))
+    p.add_argument("--precision", default="fp32", choices=tuple(PRECISIONS))
+    p.add_argument("--size", type=int, default=512, help="content/style 입력 해상도 (정사각)")
+    p.add_argument("--batch_size", type=int, default=4)
+    p.add_argument("--preserve_color", action="store_true", help="coral 색감 유지 후처리 포함 (지연시간에 포함)")
+    p.add_argument("--baseline", default="", help="비교할 이전 결과 JSON")
+    p.add_argument("--save_json", default="", help="결과 JSON 저장 경로")
+    p.add_argument("--save_images", default="", help="출력 이미지 저장 디렉토리 (선택)")
+    return p.parse_args()
+
+
+if __name__ == "__main__":
+    run(parse_args())
@@ -71,3 +71,35 @@ def coral(source, target):
                         target_f_mean.expand_as(source_f_norm)
 
     return source_f_transfer.view(source.size())
+
+
+def _batch_mat_pow(cov, power):
+    # cov: (N, C, C) symmetric positive definite -> cov ** power via eigendecomposition
+    eigvals, eigvecs = torch.linalg.eigh(cov)
+    eigvals = eigvals.clamp_min(1e-8).pow(power)
+    return eigvecs @ torch.diag_embed(eigvals) @ eigvecs.transpose(-1, -2)
+
+
+def coral_batch(source, target, eps=1e-5):
+    # batched, device-agnostic coral: source (N, C, H, W) takes the colour statistics of
+    # target (N or 1, C, H', W'). Covariances are normalised by pixel count, so source and
+    # target may differ in resolution; eigh on the CxC matrices replaces the full SVD + inverse.
+    N, C = source.size()[:2]
+    source_f = source.reshape(N, C, -1).float()
+    target_f = target.reshape(target.size(0), C, -1).float()
+
+    source_f_mean = source_f.mean(dim=-1, keepdim=True)
+    source_f_std = source_f.std(dim=-1, keepdim=True) + eps
+    target_f_mean = target_f.mean(dim=-1, keepdim=True)
+    target_f_std = target_f.std(dim=-1, keepdim=True) + eps
+
+    source_f_norm = (source_f - source_f_mean) / source_f_std
+    target_f_norm = (target_f - target_f_mean) / target_f_std
+
+    eye = eps * torch.eye(C, device=source_f.device, dtype=source_f.dtype)
+    source_f_cov = source_f_norm @ source_f_norm.transpose(1, 2) / source_f.size(-1) + eye
+    target_f_cov = target_f_norm @ target_f_norm.transpose(1, 2) / target_f.size(-1) + eye
+
+    transfer = _batch_mat_pow(target_f_cov, 0.5) @ _batch_mat_pow(source_f_cov, -0.5)
+    source_f_transfer = (transfer @ source_f_norm) * target_f_std + target_f_mean
+    return source_f_transfer.view(source.size()).to(source.dtype)
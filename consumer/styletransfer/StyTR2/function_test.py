@@ -0,0 +1,26 @@
+import torch
+
+from styletransfer.StyTR2.function import coral, coral_batch
+
+
+def _batch(n, size, seed):
+    generator = torch.Generator().manual_seed(seed)
+    # mix channels so the colour covariance is not close to identity
+    mix = torch.tensor([[1.0, 0.5, 0.2], [0.0, 1.0, 0.3], [0.0, 0.0, 1.0]])
+    return torch.einsum('ij,njhw->nihw', mix, torch.rand(n, 3, size, size, generator=generator))
+
+
+def test_coral_batch_matches_per_image_coral():
+    # coral() does not normalise covariance by pixel count, so compare at equal resolution
+    source, target = _batch(2, 32, seed=0), _batch(2, 32, seed=1) * 0.5 + 0.2
+    out = coral_batch(source, target)
+    assert out.shape == source.shape
+    for i in range(2):
+        assert torch.allclose(out[i], coral(source[i], target[i]), atol=1e-3)
+
+
+def test_coral_batch_broadcasts_single_style():
+    source, target = _batch(2, 32, seed=2), _batch(1, 32, seed=3)
+    out = coral_batch(source, target)
+    for i in range(2):
+        assert torch.allclose(out[i], coral(source[i], target[0]), atol=1e-3)
@@ -60,6 +60,31 @@ decoder = nn.Sequential(
     nn.Conv2d(64, 3, (3, 3)),
 )
 
+
+def build_decoder(in_dim=512, width=256, patch_size=8):
+    """ Decoder with configurable input/hidden width.
+    The defaults rebuild exactly the `decoder` above (same layer indices, so the same
+    state_dict keys). Each doubling of patch_size beyond 8 adds one more upsample block.
+    """
+    extra_up = patch_size.bit_length() - 4
+    if extra_up < 0 or patch_size != 2 ** (extra_up + 3):
+        raise ValueError(f"patch_size must be a power of two >= 8, not {patch_size}")
+
+    def block(c_in, c_out):
+        return [nn.ReflectionPad2d((1, 1, 1, 1)), nn.Conv2d(c_in, c_out, (3, 3)), nn.ReLU()]
+
+    half, quarter = width // 2, width // 4
+    layers = block(in_dim, width) + [nn.Upsample(scale_factor=2, mode='nearest')]
+    for _ in range(extra_up):
+        layers += block(width, width) + [nn.Upsample(scale_factor=2, mode='nearest')]
+    layers += block(width, width) + block(width, width) + block(width, width)
+    layers += block(width, half) + [nn.Upsample(scale_factor=2, mode='nearest')]
+    layers += block(half, half) + block(half, quarter) + [nn.Upsample(scale_factor=2, mode='nearest')]
+    layers += block(quarter, quarter)
+    layers += [nn.ReflectionPad2d((1, 1, 1, 1)), nn.Conv2d(quarter, 3, (3, 3))]
+    return nn.Sequential(*layers)
+
+
 vgg = nn.Sequential(
     nn.Conv2d(3, 3, (1, 1)),
     nn.ReflectionPad2d((1, 1, 1, 1)),
@@ -171,6 +196,15 @@ class StyTrans(nn.Module):
         target_mean, target_std = calc_mean_std(target)
         return self.mse_loss(input_mean, target_mean) + \
                self.mse_loss(input_std, target_std)
+    def stylize(self, content_input, style_input):
+        """ Inference-only path: returns Ics without the VGG loss features and identity passes.
+        Both inputs are already batched tensors of shape [batch_size x 3 x H x W].
+        """
+        style = self.embedding(style_input)
+        content = self.embedding(content_input)
+        hs = self.transformer(style, None, content, None, None)
+        return self.decode(hs)
+
     def forward(self, samples_c: NestedTensor,samples_s: NestedTensor):
         """ The forward expects a NestedTensor, which consists of:
                - samples.tensor: batched images, of shape [batch_size x 3 x H x W]
@@ -6,9 +6,6 @@ import torch.nn.functional as F
 from torch import nn, Tensor
 from ..function import normal,normal_style
 import numpy as np
-import os
-device = torch.device("cuda:2" if torch.cuda.is_available() else "cpu")
-os.environ["CUDA_VISIBLE_DEVICES"] = "2, 3"
 class Transformer(nn.Module):
 
     def __init__(self, d_model=512, nhead=8, num_encoder_layers=3,
@@ -34,7 +31,7 @@ class Transformer(nn.Module):
         self.d_model = d_model
         self.nhead = nhead
 
-        self.new_ps = nn.Conv2d(512 , 512 , (1,1))
+        self.new_ps = nn.Conv2d(d_model , d_model , (1,1))
         self.averagepooling = nn.AdaptiveAvgPool2d(18)
 
     def _reset_parameters(self):
@@ -294,6 +291,149 @@ class TransformerDecoderLayer(nn.Module):
                                  tgt_key_padding_mask, memory_key_padding_mask, pos, query_pos)
 
 
+class PrunedMultiheadAttention(nn.Module):
+    """ Multi-head attention whose heads can be physically removed.
+    Same call convention and (L, N, E) layout as nn.MultiheadAttention, but q/k/v/out
+    projections are separate Linears of width num_heads * head_dim, so after pruning the
+    weights really shrink. `head_mask` (None by default) scales each head's output and is
+    only used to score heads by gradient.
+    """
+
+    def __init__(self, embed_dim, num_heads, head_dim, dropout=0.):
+        super().__init__()
+        if num_heads < 1:
+            raise ValueError("PrunedMultiheadAttention needs at least one head")
+        self.embed_dim = embed_dim
+        self.num_heads = num_heads
+        self.head_dim = head_dim
+        self.dropout = dropout
+        inner_dim = num_heads * head_dim
+        self.q_proj = nn.Linear(embed_dim, inner_dim)
+        self.k_proj = nn.Linear(embed_dim, inner_dim)
+        self.v_proj = nn.Linear(embed_dim, inner_dim)
+        self.out_proj = nn.Linear(inner_dim, embed_dim)
+        self.head_mask = None
+
+    @classmethod
+    def from_multihead_attention(cls, mha):
+        """ Exact conversion of a trained nn.MultiheadAttention (all heads kept). """
+        head_dim = mha.embed_dim // mha.num_heads
+        attn = cls(mha.embed_dim, mha.num_heads, head_dim, dropout=mha.dropout)
+        w_q, w_k, w_v = mha.in_proj_weight.chunk(3)
+        b_q, b_k, b_v = mha.in_proj_bias.chunk(3)
+        with torch.no_grad():
+            for proj, w, b in ((attn.q_proj, w_q, b_q), (attn.k_proj, w_k, b_k), (attn.v_proj, w_v, b_v)):
+                proj.weight.copy_(w)
+                proj.bias.copy_(b)
+            attn.out_proj.weight.copy_(mha.out_proj.weight)
+            attn.out_proj.bias.copy_(mha.out_proj.bias)
+        return attn.to(mha.in_proj_weight.device)
+
+    def prune_heads(self, keep_heads):
+        """ Keep only the heads listed in keep_heads (indices into the current heads). """
+        keep_heads = sorted(keep_heads)
+        idx = torch.cat([torch.arange(h * self.head_dim, (h + 1) * self.head_dim) for h in keep_heads])
+        idx = idx.to(self.q_proj.weight.device)
+        self.q_proj = _select_linear(self.q_proj, idx, dim=0)
+        self.k_proj = _select_linear(self.k_proj, idx, dim=0)
+        self.v_proj = _select_linear(self.v_proj, idx, dim=0)
+        self.out_proj = _select_linear(self.out_proj, idx, dim=1)
+        self.num_heads = len(keep_heads)
+        self.head_mask = None
+
+    def forward(self, query, key, value, attn_mask=None, key_padding_mask=None):
+        L, N, _ = query.shape
+        S = key.shape[0]
+        H, D = self.num_heads, self.head_dim
+
+        q = self.q_proj(query).contiguous().view(L, N * H, D).transpose(0, 1) * (D ** -0.5)
+        k = self.k_proj(key).contiguous().view(S, N * H, D).transpose(0, 1)
+        v = self.v_proj(value).contiguous().view(S, N * H, D).transpose(0, 1)
+
+        attn = torch.bmm(q, k.transpose(1, 2))
+        if attn_mask is not None:
+            if attn_mask.dtype == torch.bool:
+                attn = attn.masked_fill(attn_mask, float('-inf'))
+            else:
+                attn = attn + attn_mask
+        if key_padding_mask is not None:
+            attn = attn.view(N, H, L, S).masked_fill(key_padding_mask[:, None, None, :], float('-inf'))
+            attn = attn.view(N * H, L, S)
+        attn = F.dropout(F.softmax(attn, dim=-1), p=self.dropout, training=self.training)
+
+        out = torch.bmm(attn, v)
+        if self.head_mask is not None:
+            out = (out.view(N, H, L, D) * self.head_mask.view(1, H, 1, 1)).view(N * H, L, D)
+        out = out.transpose(0, 1).contiguous().view(L, N, H * D)
+        return self.out_proj(out), None
+
+
+def _select_linear(linear, idx, dim):
+    """ New nn.Linear keeping only rows (dim=0, outputs) or columns (dim=1, inputs) in idx. """
+    weight = linear.weight.detach().index_select(dim, idx)
+    out_features, in_features = weight.shape
+    new = nn.Linear(in_features, out_features, bias=linear.bias is not None).to(weight.device)
+    with torch.no_grad():
+        new.weight.copy_(weight)
+        if linear.bias is not None:
+            new.bias.copy_(linear.bias.detach() if dim == 1 else linear.bias.detach().index_select(0, idx))
+    return new
+
+
+def prune_ffn(layer, keep_channels):
+    """ Physically keep only the given hidden channels of layer.linear1/linear2. """
+    idx = torch.as_tensor(sorted(keep_channels), device=layer.linear1.weight.device)
+    layer.linear1 = _select_linear(layer.linear1, idx, dim=0)
+    layer.linear2 = _select_linear(layer.linear2, idx, dim=1)
+
+
+def attention_modules(layer):
+    """ ('self_attn', module) / ('multihead_attn', module) pairs of an encoder/decoder layer. """
+    names = ('self_attn', 'multihead_attn') if isinstance(layer, TransformerDecoderLayer) else ('self_attn',)
+    return [(name, getattr(layer, name)) for name in names]
+
+
+def transformer_layers(model):
+    """ (qualified name, layer) for every encoder/decoder layer in a Transformer. """
+    return [(name, m) for name, m in model.named_modules()
+            if isinstance(m, (TransformerEncoderLayer, TransformerDecoderLayer))]
+
+
+def make_prunable(model):
+    """ Swap every nn.MultiheadAttention for an equivalent PrunedMultiheadAttention. """
+    for _, layer in transformer_layers(model):
+        for name, attn in attention_modules(layer):
+            if isinstance(attn, nn.MultiheadAttention):
+                setattr(layer, name, PrunedMultiheadAttention.from_multihead_attention(attn))
+    return model
+
+
+def layer_shapes(model):
+    """ Per-layer head counts / FFN widths, enough to rebuild a pruned model before load_state_dict. """
+    shapes = {}
+    for name, layer in transformer_layers(model):
+        shape = {'ffn': layer.linear1.out_features}
+        for attn_name, attn in attention_modules(layer):
+            shape[attn_name] = attn.num_heads
+        shapes[name] = shape
+    return shapes
+
+
+def apply_layer_shapes(model, shapes):
+    """ Reshape a freshly built Transformer to match layer_shapes() of a pruned one (weights re-initialised). """
+    head_dim = model.d_model // model.nhead
+    for name, layer in transformer_layers(model):
+        shape = shapes.get(name)
+        if not shape:
+            continue
+        for attn_name, attn in attention_modules(layer):
+            setattr(layer, attn_name, PrunedMultiheadAttention(model.d_model, shape[attn_name], head_dim,
+                                                                dropout=attn.dropout))
+        layer.linear1 = nn.Linear(model.d_model, shape['ffn'])
+        layer.linear2 = nn.Linear(shape['ffn'], model.d_model)
+    return model
+
+
 def _get_clones(module, N):
     return nn.ModuleList([copy.deepcopy(module) for i in range(N)])
 
@@ -0,0 +1,275 @@
+"""
+StyTR2 transformer 구조적 pruning 도구.
+
+calibration 이미지로 attention head / FFN 채널 중요도를 측정(gradient 기반 Taylor score)하고,
+중요도가 낮은 것을 실제로 제거(가중치 shape 자체를 줄임)한 뒤 짧게 fine-tune 한다.
+비율별 품질/지연시간 trade-off 표를 출력하고, 각 결과를 서빙 포맷으로 export 한다.
+
+실행 (consumer/ 에서):
+    python -m styletransfer.StyTR2.prune --content_dir ... --style_dir ... --ratios 0.25 0.5
+"""
+import argparse
+import copy
+import json
+import os
+import time
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+import torch.utils.data as data
+from torchvision import transforms
+
+from .models import StyTR as StyTR
+from .models import transformer as transformer
+from .sampler import InfiniteSamplerWrapper
+from .dataset import FlatFolderDataset, train_transform
+from . import student
+
+
+def eval_transform(size=256):
+    return transforms.Compose([
+        transforms.Resize((size, size)),
+        transforms.ToTensor()
+    ])
+
+
+def load_network(model_dir, model_iter, vgg_path, device):
+    config = student.load_config(model_dir)
+    decoder, Trans, embedding = student.build_modules(config)
+    for name, module in (("decoder", decoder), ("transformer", Trans), ("embedding", embedding)):
+        path = '{:s}/{:s}_iter_{:d}.pth'.format(model_dir, name, model_iter)
+        module.load_state_dict(torch.load(path, map_location='cpu'))
+
+    vgg = StyTR.vgg
+    vgg.load_state_dict(torch.load(vgg_path, map_location='cpu'))
+    vgg = nn.Sequential(*list(vgg.children())[:44])
+
+    network = StyTR.StyTrans(vgg, decoder, embedding, Trans).to(device)
+    network.eval()
+    return network, config
+
+
+def task_loss(network, content, style, args):
+    """train.py와 동일한 가중합 손실"""
+    out, loss_c, loss_s, l_identity1, l_identity2 = network(content, style)
+    loss = args.content_weight * loss_c + args.style_weight * loss_s + l_identity1 * 70 + l_identity2 * 1
+    return out, loss, loss_c, loss_s
+
+
+def _taylor_hook(scores):
+    """linear1 출력(activation)과 그 gradient 곱의 절댓값을 채널별로 누적"""
+    def hook(module, inputs, output):
+        if output.requires_grad:
+            act = output.detach()
+            output.register_hook(lambda grad: scores.add_((act * grad).abs().sum(dim=(0, 1))))
+    return hook
+
+
+def score(network, batches, args):
+    """
+    network.transformer의 head / FFN 채널 중요도 계산.
+    head: head_mask(=1)에 대한 |dL/dmask| 누적, FFN: |activation * grad| 누적.
+    """
+    layers = transformer.transformer_layers(network.transformer)
+    head_scores, ffn_scores, handles = {}, {}, []
+    for name, layer in layers:
+        for attn_name, attn in transformer.attention_modules(layer):
+            attn.head_mask = torch.ones(attn.num_heads, device=args.device, requires_grad=True)
+            head_scores[(name, attn_name)] = torch.zeros(attn.num_heads, device=args.device)
+        ffn_scores[name] = torch.zeros(layer.linear1.out_features, device=args.device)
+        handles.append(layer.linear1.register_forward_hook(_taylor_hook(ffn_scores[name])))
+
+    network.eval()
+    for content, style in batches:
+        network.zero_grad()
+        _, loss, _, _ = task_loss(network, content, style, args)
+        loss.backward()
+        for name, layer in layers:
+            for attn_name, attn in transformer.attention_modules(layer):
+                head_scores[(name, attn_name)] += attn.head_mask.grad.abs()
+                attn.head_mask.grad = None
+
+    for handle in handles:
+        handle.remove()
+    for name, layer in layers:
+        for _, attn in transformer.attention_modules(layer):
+            attn.head_mask = None
+    network.zero_grad()
+    return head_scores, ffn_scores
+
+
+def prune(network, head_scores, ffn_scores, ratio):
+    """레이어마다 ratio 만큼 head / FFN 채널 제거 (각 attention은 최소 1 head 유지)"""
+    for name, layer in transformer.transformer_layers(network.transformer):
+        for attn_name, attn in transformer.attention_modules(layer):
+            n_keep = max(1, round(attn.num_heads * (1 - ratio)))
+            attn.prune_heads(head_scores[(name, attn_name)].topk(n_keep).indices.tolist())
+        scores = ffn_scores[name]
+        n_keep = max(1, round(len(scores) * (1 - ratio)))
+        transformer.prune_ffn(layer, scores.topk(n_keep).indices.tolist())
+    return network
+
+
+def finetune(network, reference, batch_iter, args):
+    """pruning 후 짧은 fine-tune: 원래 손실 + 원본 모델 출력에 대한 distillation"""
+    if args.finetune_iters <= 0:
+        return network
+    optimizer = torch.optim.Adam([
+        {'params': network.transformer.parameters()},
+        {'params': network.decode.parameters()},
+        {'params': network.embedding.parameters()},
+    ], lr=args.lr)
+    network.train()
+    for i in range(args.finetune_iters):
+        content, style = next(batch_iter)
+        with torch.no_grad():
+            target = reference.stylize(content, style)
+        out, loss, _, _ = task_loss(network, content, style, args)
+        loss = loss + args.distill_weight * F.mse_loss(out, target)
+        optimizer.zero_grad()
+        loss.backward()
+        optimizer.step()
+        if (i + 1) % 100 == 0:
+            print(f"  finetune {i + 1}/{args.finetune_iters} loss={loss.item():.4f}")
+    network.eval()
+    return network
+
+
+def _sync(device):
+    if device.type == "cuda":
+        torch.cuda.synchronize(device)
+
+
+@torch.no_grad()
+def measure_latency(network, args):
+    """1장(batch=1) stylize 평균 지연시간(ms)"""
+    network.eval()
+    content = torch.rand(1, 3, args.latency_size, args.latency_size, device=args.device)
+    style = torch.rand(1, 3, args.latency_size, args.latency_size, device=args.device)
+    for _ in range(3):
+        network.stylize(content, style)
+    _sync(args.device)
+    start = time.perf_counter()
+    for _ in range(args.latency_runs):
+        network.stylize(content, style)
+    _sync(args.device)
+    return (time.perf_counter() - start) / args.latency_runs * 1000
+
+
+@torch.no_grad()
+def evaluate(network, reference, batches, args):
+    network.eval()
+    content_loss = style_loss = ref_mse = 0.0
+    for content, style in batches:
+        out, _, loss_c, loss_s = task_loss(network, content, style, args)
+        content_loss += loss_c.item()
+        style_loss += loss_s.item()
+        ref_mse += F.mse_loss(out, reference.stylize(content, style)).item()
+    n = max(1, len(batches))
+    return {
+        "content_loss": content_loss / n,
+        "style_loss": style_loss / n,
+        "mse_vs_original": ref_mse / n,
+        "transformer_params": sum(p.numel() for p in network.transformer.parameters()),
+        "latency_ms": measure_latency(network, args),
+    }
+
+
+def _take(content_iter, style_iter, n, device):
+    return [(next(content_iter).to(device), next(style_iter).to(device)) for _ in range(n)]
+
+
+def _loader_iter(dataset, batch_size, n_threads):
+    return iter(data.DataLoader(
+        dataset, batch_size=batch_size,
+        sampler=InfiniteSamplerWrapper(dataset),
+        num_workers=n_threads))
+
+
+def run(args):
+    os.makedirs(args.save_dir, exist_ok=True)
+    reference, config = load_network(args.model_dir, args.model_iter, args.vgg, args.device)
+    for param in reference.parameters():
+        param.requires_grad = False
+
+    train_content = FlatFolderDataset(args.content_dir, train_transform())
+    train_style = FlatFolderDataset(args.style_dir, train_transform())
+    content_iter = _loader_iter(train_content, args.batch_size, args.n_threads)
+    style_iter = _loader_iter(train_style, args.batch_size, args.n_threads)
+
+    eval_content = FlatFolderDataset(args.content_dir, eval_transform())
+    eval_style = FlatFolderDataset(args.style_dir, eval_transform())
+    eval_batches = _take(iter(data.DataLoader(eval_content, batch_size=args.batch_size)),
+                         iter(data.DataLoader(eval_style, batch_size=args.batch_size)),
+                         args.eval_batches, args.device)
+
+    def batch_iter():
+        while True:
+            yield next(content_iter).to(args.device), next(style_iter).to(args.device)
+
+    batches = batch_iter()
+
+    # 원본 가중치 그대로 head를 분리 가능한 형태로 바꾼 뒤 중요도 측정
+    scored = copy.deepcopy(reference)
+    for param in scored.parameters():
+        param.requires_grad = True
+    for name in ['enc_1', 'enc_2', 'enc_3', 'enc_4', 'enc_5']:
+        for param in getattr(scored, name).parameters():
+            param.requires_grad = False
+    transformer.make_prunable(scored.transformer)
+    head_scores, ffn_scores = score(scored, [next(batches) for _ in range(args.calib_batches)], args)
+
+    results = [dict(ratio=0.0, **evaluate(reference, reference, eval_batches, args))]
+    for ratio in args.ratios:
+        print(f"[prune] ratio={ratio}")
+        pruned = prune(copy.deepcopy(scored), head_scores, ffn_scores, ratio)
+        finetune(pruned, reference, batches, args)
+        result = dict(ratio=ratio, **evaluate(pruned, reference, eval_batches, args))
+
+        out_dir = os.path.join(args.save_dir, f"prune_{int(round(ratio * 100))}")
+        pruned_config = dict(config, layer_shapes=transformer.layer_shapes(pruned.transformer))
+        student.export(pruned.decode, pruned.transformer, pruned.embedding, pruned_config, out_dir, args.model_iter)
+        result["export_dir"] = out_dir
+        results.append(result)
+
+    print("\n=== PRUNING TRADE-OFF ===")
+    print(f"{'ratio':>6} {'params':>10} {'latency(ms)':>12} {'content':>9} {'style':>9} {'mse_vs_orig':>12}")
+    for r in results:
+        print(f"{r['ratio']:>6.2f} {r['transformer_params']:>10d} {r['latency_ms']:>12.2f} "
+              f"{r['content_loss']:>9.4f} {r['style_loss']:>9.4f} {r['mse_vs_original']:>12.5f}")
+
+    with open(os.path.join(args.save_dir, "tradeoff.json"), "w", encoding="utf-8") as fp:
+        json.dump(results, fp, indent=2)
+    return results
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="StyTR2 transformer head/FFN 구조적 pruning")
+    p.add_argument('--content_dir', required=True, type=str, help='calibration/fine-tune content 이미지 디렉토리')
+    p.add_argument('--style_dir', required=True, type=str, help='calibration/fine-tune style 이미지 디렉토리')
+    p.add_argument('--vgg', type=str, default='./experiments/vgg_normalised.pth')
+    p.add_argument('--model_dir', type=str, default='./experiments',
+                   help='pruning 대상 {transformer,decoder,embedding}_iter_N.pth 디렉토리')
+    p.add_argument('--model_iter', type=int, default=160000)
+    p.add_argument('--save_dir', type=str, default='./experiments/pruned')
+    p.add_argument('--ratios', type=float, nargs='+', default=[0.25, 0.5, 0.75],
+                   help='레이어별 제거 비율 목록 (trade-off 곡선의 각 점)')
+    p.add_argument('--calib_batches', type=int, default=32)
+    p.add_argument('--eval_batches', type=int, default=8)
+    p.add_argument('--finetune_iters', type=int, default=2000)
+    p.add_argument('--batch_size', type=int, default=8)
+    p.add_argument('--n_threads', type=int, default=8)
+    p.add_argument('--lr', type=float, default=1e-4)
+    p.add_argument('--style_weight', type=float, default=10.0)
+    p.add_argument('--content_weight', type=float, default=7.0)
+    p.add_argument('--distill_weight', type=float, default=10.0)
+    p.add_argument('--latency_size', type=int, default=512)
+    p.add_argument('--latency_runs', type=int, default=20)
+    args = p.parse_args()
+    args.device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
+    return args
+
+
+if __name__ == "__main__":
+    run(parse_args())
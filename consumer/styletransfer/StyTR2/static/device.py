@@ -0,0 +1,7 @@
+import os
+
+import torch
+
+# 추론 device (예: STYTR2_DEVICE=cuda:1). 미지정 시 cuda 사용 가능하면 cuda, 아니면 cpu
+# GPU 선택은 프로세스 환경변수(CUDA_VISIBLE_DEVICES)를 바꾸지 않고 여기서만 한다
+DEVICE = torch.device(os.getenv("STYTR2_DEVICE") or ("cuda" if torch.cuda.is_available() else "cpu"))
@@ -1,4 +1,8 @@
 vgg_path = "./experiments/vgg_normalised.pth"
 decoder_path = "./experiments/decoder_iter_160000.pth"
 Trans_path = "./experiments/transformer_iter_160000.pth"
-embedding_path = "./experiments/embedding_iter_160000.pth"
\ No newline at end of file
+embedding_path = "./experiments/embedding_iter_160000.pth"
+
+# fast tier: train.py --distill 로 학습한 student (student_config.json 포함)
+student_dir = "./experiments/student"
+student_iter = 160000
@@ -0,0 +1,81 @@
+import json
+import os
+
+import torch
+
+from .models import StyTR as StyTR
+from .models import transformer as transformer
+
+
+# 서빙 중인 StyTR2(teacher)와 동일한 구조. student 설정은 이 값들 중 일부만 덮어쓴다.
+DEFAULT_CONFIG = {
+    "d_model": 512,
+    "nhead": 8,
+    "enc_layers": 3,
+    "dec_layers": 3,
+    "dim_feedforward": 2048,
+    "patch_size": 8,
+    "decoder_width": 256,
+    # prune.py 결과물: {레이어 이름: {"self_attn": heads, "multihead_attn": heads, "ffn": width}}
+    "layer_shapes": None,
+}
+
+CONFIG_FILENAME = "student_config.json"
+
+
+def make_config(**overrides):
+    """None이 아닌 값만 DEFAULT_CONFIG 위에 덮어쓴 설정 dict 반환"""
+    config = dict(DEFAULT_CONFIG)
+    unknown = set(overrides) - set(config)
+    if unknown:
+        raise ValueError(f"알 수 없는 student 설정: {sorted(unknown)}")
+    config.update({k: v for k, v in overrides.items() if v is not None})
+    if config["d_model"] % config["nhead"] != 0:
+        raise ValueError(f"d_model({config['d_model']})은 nhead({config['nhead']})로 나누어져야 합니다.")
+    return config
+
+
+def build_modules(config):
+    """설정으로 (decoder, Trans, embedding) 생성. 가중치는 초기값 상태."""
+    decoder = StyTR.build_decoder(
+        in_dim=config["d_model"],
+        width=config["decoder_width"],
+        patch_size=config["patch_size"],
+    )
+    Trans = transformer.Transformer(
+        d_model=config["d_model"],
+        nhead=config["nhead"],
+        num_encoder_layers=config["enc_layers"],
+        num_decoder_layers=config["dec_layers"],
+        dim_feedforward=config["dim_feedforward"],
+    )
+    if config.get("layer_shapes"):
+        transformer.apply_layer_shapes(Trans, config["layer_shapes"])
+    embedding = StyTR.PatchEmbed(patch_size=config["patch_size"], embed_dim=config["d_model"])
+    return decoder, Trans, embedding
+
+
+def save_config(config, save_dir):
+    with open(os.path.join(save_dir, CONFIG_FILENAME), "w", encoding="utf-8") as fp:
+        json.dump(config, fp, indent=2)
+
+
+def load_config(model_dir):
+    """model_dir에 student_config.json이 없으면 teacher와 같은 기본 구조로 간주"""
+    path = os.path.join(model_dir, CONFIG_FILENAME)
+    if not os.path.exists(path):
+        return dict(DEFAULT_CONFIG)
+    with open(path, "r", encoding="utf-8") as fp:
+        return make_config(**json.load(fp))
+
+
+def export(decoder, Trans, embedding, config, save_dir, iteration):
+    """
+    서빙 포맷으로 저장: train.py와 동일한 {transformer,decoder,embedding}_iter_N.pth
+    + 구조 복원용 student_config.json
+    """
+    os.makedirs(save_dir, exist_ok=True)
+    for name, module in (("transformer", Trans), ("decoder", decoder), ("embedding", embedding)):
+        state_dict = {k: v.to(torch.device('cpu')) for k, v in module.state_dict().items()}
+        torch.save(state_dict, '{:s}/{:s}_iter_{:d}.pth'.format(save_dir, name, iteration))
+    save_config(config, save_dir)
@@ -10,9 +10,10 @@ from torchvision import transforms
 from .models import StyTR as StyTR
 from .models import transformer as transformer
 from .static.model_path import *
+from .function import coral_batch
+from . import student
+from .static.device import DEVICE as device
 
-
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 def content_transform(size=512):
@@ -36,17 +37,72 @@ def output_resolution(orig_w, orig_h):
     return new_w, new_h
 
 class StyTR2:
-    def __init__(self):
+    def __init__(self, variant="full", resident=False):
+        """
+        variant: "full"(기본 모델) | "fast"(distill된 student, 미리보기/저비용 요청용)
+        resident: True 면 추론 후에도 모델을 GPU 에 유지 (style transfer worker 서비스용)
+        """
+        self.variant = variant
+        self.resident = resident
         self.model = self.load_model()
 
-    def inference(self, content, style):
+    def inference(self, content, style, preserve_color=False):
         try:
-            result = self.run_model(content, style)
+            result = self.run_model(content, style, preserve_color=preserve_color)
             return result
         except Exception as e:
             print(e)
             return None
 
+    def inference_batch(self, items):
+        """
+        items: [(content, style, preserve_color), ...] → [PNG BytesIO 또는 None(해당 요청 실패), ...]
+        content 는 512x512, style 은 content 와 같은 크기로 맞추므로 모든 요청을 한 batch 로 묶어 한 번에 추론
+        """
+        results = [None] * len(items)
+        prepared = []
+        for i, (content_file, style_file, preserve_color) in enumerate(items):
+            try:
+                content_img = self.validate_and_load_image(content_file)
+                style_img = self.validate_and_load_image(style_file)
+            except ValueError as e:
+                print(f"[ERROR] StyTR2 batch item {i}: {e}")
+                continue
+            content_tensor = content_transform(512)(content_img)
+            h, w = content_tensor.shape[1], content_tensor.shape[2]
+            prepared.append((i, content_tensor, style_transform(h, w)(style_img), preserve_color,
+                             output_resolution(*content_img.size)))
+        if not prepared:
+            return results
+
+        content_batch = torch.stack([p[1] for p in prepared]).to(device)
+        style_batch = torch.stack([p[2] for p in prepared]).to(device)
+        try:
+            with torch.no_grad():
+                stylized = torch.clamp(self.model.stylize(content_batch, style_batch), 0, 1)
+                color_idx = [k for k, p in enumerate(prepared) if p[3]]
+                if color_idx:
+                    idx = torch.tensor(color_idx, device=stylized.device)
+                    stylized[idx] = coral_batch(stylized[idx], content_batch[idx])
+            stylized = stylized.cpu()
+        finally:
+            del content_batch, style_batch
+            if not self.resident:
+                self._release()
+
+        for k, (i, _, _, _, (output_w, output_h)) in enumerate(prepared):
+            output_image = transforms.ToPILImage()(torch.clamp(stylized[k], 0, 1))
+            output_image = output_image.resize((output_w, output_h), Image.Resampling.LANCZOS)
+            buf = BytesIO()
+            output_image.save(buf, format="PNG")
+            buf.seek(0)
+            results[i] = buf
+        return results
+
+    def _release(self):
+        del self.model
+        torch.cuda.empty_cache()
+
     def validate_and_load_image(self, file_obj, use_cv=False, max_size=300):
         try:
             mime = magic.Magic(mime=True)
@@ -89,13 +145,20 @@ class StyTR2:
         vgg.load_state_dict(torch.load(os.path.join(BASE_DIR, vgg_path)))
         vgg = nn.Sequential(*list(vgg.children())[:44])
 
-        decoder = StyTR.decoder
-        Trans = transformer.Transformer()
-        embedding = StyTR.PatchEmbed()
-
-        decoder.load_state_dict(self._load_weights(os.path.join(BASE_DIR, decoder_path)))
-        Trans.load_state_dict(self._load_weights(os.path.join(BASE_DIR, Trans_path)))
-        embedding.load_state_dict(self._load_weights(os.path.join(BASE_DIR, embedding_path)))
+        if self.variant == "fast":
+            model_dir = os.path.join(BASE_DIR, student_dir)
+            decoder, Trans, embedding = student.build_modules(student.load_config(model_dir))
+            weight_paths = [os.path.join(model_dir, f"{name}_iter_{student_iter}.pth")
+                            for name in ("decoder", "transformer", "embedding")]
+        else:
+            decoder = StyTR.decoder
+            Trans = transformer.Transformer()
+            embedding = StyTR.PatchEmbed()
+            weight_paths = [os.path.join(BASE_DIR, p) for p in (decoder_path, Trans_path, embedding_path)]
+
+        decoder.load_state_dict(self._load_weights(weight_paths[0]))
+        Trans.load_state_dict(self._load_weights(weight_paths[1]))
+        embedding.load_state_dict(self._load_weights(weight_paths[2]))
 
         vgg.eval()
         decoder.eval()
@@ -110,7 +173,7 @@ class StyTR2:
         state_dict = torch.load(path)
         return {k: v for k, v in state_dict.items()}
 
-    def run_model(self, content_file, style_file):
+    def run_model(self, content_file, style_file, preserve_color=False):
         try:
             content_img = self.validate_and_load_image(content_file)
             style_img = self.validate_and_load_image(style_file)
@@ -136,7 +199,11 @@ class StyTR2:
 
             with torch.no_grad():
                 output = self.model(content_tensor, style_tensor)
-            output_image = output[0].cpu()
+                stylized = output[0]
+                if preserve_color:
+                    # 원본(content) 색감 유지: 결과 이미지의 색 통계를 content에 맞춤 (모델과 같은 장치에서 수행)
+                    stylized = coral_batch(torch.clamp(stylized, 0, 1), content_tensor)
+            output_image = stylized.cpu()
 
             # 💡 Tensor -> PIL.Image
             output_image = transforms.ToPILImage()(torch.clamp(output_image[0], 0, 1))
@@ -153,12 +220,12 @@ class StyTR2:
             # save_image(output_image, buf, format="PNG")
             output_image.save(buf, format="PNG")
             buf.seek(0)
-            del self.model
-            torch.cuda.empty_cache()
+            if not self.resident:
+                self._release()
 
             return buf
         except Exception as e:
             print(f"[ERROR] StyTR2 failed: {e}")
-            del self.model
-            torch.cuda.empty_cache()
+            if not self.resident:
+                self._release()
             raise
@@ -3,50 +3,17 @@ import os
 import torch
 import torch.nn as nn
 import torch.utils.data as data
-from PIL import Image
 from tensorboardX import SummaryWriter
-from torchvision import transforms
 from tqdm import tqdm
-from pathlib import Path
-import models.transformer as transformer
-import models.StyTR  as StyTR 
-from sampler import InfiniteSamplerWrapper
+import torch.nn.functional as F
+from .models import transformer as transformer
+from .models import StyTR as StyTR
+from .sampler import InfiniteSamplerWrapper
+from .dataset import FlatFolderDataset, train_transform, parse_curriculum, scaled_batch_size
+from . import student
 from torchvision.utils import save_image
 
 
-def train_transform():
-    transform_list = [
-        transforms.Resize(size=(512, 512)),
-        transforms.RandomCrop(256),
-        transforms.ToTensor()
-    ]
-    return transforms.Compose(transform_list)
-
-
-class FlatFolderDataset(data.Dataset):
-    def __init__(self, root, transform):
-        super(FlatFolderDataset, self).__init__()
-        self.root = root
-        print(self.root)
-        self.path = os.listdir(self.root)
-        if os.path.isdir(os.path.join(self.root,self.path[0])):
-            self.paths = []
-            for file_name in os.listdir(self.root):
-                for file_name1 in os.listdir(os.path.join(self.root,file_name)):
-                    self.paths.append(self.root+"/"+file_name+"/"+file_name1)             
-        else:
-            self.paths = list(Path(self.root).glob('*'))
-        self.transform = transform
-    def __getitem__(self, index):
-        path = self.paths[index]
-        img = Image.open(str(path)).convert('RGB')
-        img = self.transform(img)
-        return img
-    def __len__(self):
-        return len(self.paths)
-    def name(self):
-        return 'FlatFolderDataset'
-
 def adjust_learning_rate(optimizer, iteration_count):
     """Imitating the original implementation"""
     lr = 2e-4 / (1.0 + args.lr_decay * (iteration_count - 1e4))
@@ -86,6 +53,32 @@ parser.add_argument('--position_embedding', default='sine', type=str, choices=('
                         help="Type of positional embedding to use on top of the image features")
 parser.add_argument('--hidden_dim', default=512, type=int,
                         help="Size of the embeddings (dimension of the transformer)")
+parser.add_argument('--curriculum', default='', type=str,
+                    help='Progressive crop schedule "iter:crop,...", e.g. "0:128,20000:192,60000:256". '
+                         'Crops must be multiples of the patch size. Empty keeps the fixed 256 crop. Batch size is rescaled per stage by (256/crop)^2 '
+                         'so each step processes the same number of pixels as --batch_size at 256')
+parser.add_argument('--max_batch_size', type=int, default=64,
+                    help='Upper bound for the curriculum-scaled batch size')
+
+# distillation options (python -m styletransfer.StyTR2.train --distill ...)
+parser.add_argument('--distill', action='store_true',
+                    help='Train a smaller student against a trained teacher checkpoint')
+parser.add_argument('--teacher_dir', default='./experiments', type=str,
+                    help='Directory holding the teacher {transformer,decoder,embedding}_iter_N.pth')
+parser.add_argument('--teacher_iter', default=160000, type=int)
+parser.add_argument('--student_d_model', type=int, default=None)
+parser.add_argument('--student_nhead', type=int, default=None)
+parser.add_argument('--student_enc_layers', type=int, default=None)
+parser.add_argument('--student_dec_layers', type=int, default=None)
+parser.add_argument('--student_ffn', type=int, default=None,
+                    help='dim_feedforward of the student transformer layers')
+parser.add_argument('--student_patch_size', type=int, default=None,
+                    help='Power of two >= 8; the student decoder gains one upsample per doubling')
+parser.add_argument('--student_decoder_width', type=int, default=None)
+parser.add_argument('--distill_weight', type=float, default=10.0,
+                    help='Weight of the pixel MSE between student and teacher outputs')
+parser.add_argument('--distill_feat_weight', type=float, default=1.0,
+                    help='Weight of the relu4_1 feature MSE between student and teacher outputs')
 args = parser.parse_args()
 
 USE_CUDA = torch.cuda.is_available()
@@ -102,32 +95,61 @@ vgg = StyTR.vgg
 vgg.load_state_dict(torch.load(args.vgg))
 vgg = nn.Sequential(*list(vgg.children())[:44])
 
-decoder = StyTR.decoder
-embedding = StyTR.PatchEmbed()
+if args.distill:
+    student_config = student.make_config(
+        d_model=args.student_d_model,
+        nhead=args.student_nhead,
+        enc_layers=args.student_enc_layers,
+        dec_layers=args.student_dec_layers,
+        dim_feedforward=args.student_ffn,
+        patch_size=args.student_patch_size,
+        decoder_width=args.student_decoder_width,
+    )
+    print('student config:', student_config)
+    decoder, Trans, embedding = student.build_modules(student_config)
+else:
+    decoder = StyTR.decoder
+    embedding = StyTR.PatchEmbed()
+    Trans = transformer.Transformer()
 
-Trans = transformer.Transformer()
 with torch.no_grad():
-    network = StyTR.StyTrans(vgg, decoder, embedding, Trans, args)
+    network = StyTR.StyTrans(vgg, decoder, embedding, Trans)
 network.train()
 
+if args.distill:
+    # teacher: frozen, eval mode, inference-only path (no loss features / identity passes)
+    t_decoder, t_Trans, t_embedding = student.build_modules(student.load_config(args.teacher_dir))
+    for name, module in (('decoder', t_decoder), ('transformer', t_Trans), ('embedding', t_embedding)):
+        module.load_state_dict(torch.load(
+            '{:s}/{:s}_iter_{:d}.pth'.format(args.teacher_dir, name, args.teacher_iter), map_location='cpu'))
+    teacher = StyTR.StyTrans(vgg, t_decoder, t_embedding, t_Trans)
+    teacher.eval().to(device)
+    for param in teacher.parameters():
+        param.requires_grad = False
+
 network.to(device)
 network = nn.DataParallel(network, device_ids=[0,1])
-content_tf = train_transform()
-style_tf = train_transform()
+
+content_dataset = FlatFolderDataset(args.content_dir, train_transform())
+style_dataset = FlatFolderDataset(args.style_dir, train_transform())
 
 
+def make_iters(crop_size, batch_size):
+    """(Re)build the infinite loaders for one curriculum stage"""
+    content_dataset.transform = train_transform(crop_size)
+    style_dataset.transform = train_transform(crop_size)
+    content_iter = iter(data.DataLoader(
+        content_dataset, batch_size=batch_size,
+        sampler=InfiniteSamplerWrapper(content_dataset),
+        num_workers=args.n_threads))
+    style_iter = iter(data.DataLoader(
+        style_dataset, batch_size=batch_size,
+        sampler=InfiniteSamplerWrapper(style_dataset),
+        num_workers=args.n_threads))
+    return content_iter, style_iter
 
-content_dataset = FlatFolderDataset(args.content_dir, content_tf)
-style_dataset = FlatFolderDataset(args.style_dir, style_tf)
 
-content_iter = iter(data.DataLoader(
-    content_dataset, batch_size=args.batch_size,
-    sampler=InfiniteSamplerWrapper(content_dataset),
-    num_workers=args.n_threads))
-style_iter = iter(data.DataLoader(
-    style_dataset, batch_size=args.batch_size,
-    sampler=InfiniteSamplerWrapper(style_dataset),
-    num_workers=args.n_threads))
+curriculum = dict(parse_curriculum(args.curriculum, patch_size=embedding.patch_size[0]))
  
 
 optimizer = torch.optim.Adam([ 
@@ -144,6 +166,15 @@ if not os.path.exists(args.save_dir+"/test"):
 
 for i in tqdm(range(args.max_iter)):
 
+    if i in curriculum:
+        crop_size = curriculum[i]
+        batch_size = args.batch_size if not args.curriculum else \
+            scaled_batch_size(args.batch_size, crop_size, max_batch_size=args.max_batch_size)
+        print('curriculum: iter {:d} crop={:d} batch_size={:d}'.format(i, crop_size, batch_size))
+        content_iter, style_iter = make_iters(crop_size, batch_size)
+        writer.add_scalar('crop_size', crop_size, i + 1)
+        writer.add_scalar('batch_size', batch_size, i + 1)
+
     if i < 1e4:
         warmup_learning_rate(optimizer, iteration_count=i)
     else:
@@ -154,6 +185,14 @@ for i in tqdm(range(args.max_iter)):
     style_images = next(style_iter).to(device)  
     out, loss_c, loss_s,l_identity1, l_identity2 = network(content_images, style_images)
 
+    if args.distill:
+        with torch.no_grad():
+            teacher_out = teacher.stylize(content_images, style_images)
+            teacher_feat = teacher.encode_with_intermediate(teacher_out)[3]  # relu4_1
+        student_feat = network.module.encode_with_intermediate(out)[3]
+        loss_kd = F.mse_loss(out, teacher_out)
+        loss_kd_feat = F.mse_loss(student_feat, teacher_feat)
+
     if i % 100 == 0:
         output_name = '{:s}/test/{:s}{:s}'.format(
                         args.save_dir, str(i),".jpg"
@@ -166,6 +205,10 @@ for i in tqdm(range(args.max_iter)):
     loss_c = args.content_weight * loss_c
     loss_s = args.style_weight * loss_s
     loss = loss_c + loss_s + (l_identity1 * 70) + (l_identity2 * 1) 
+    if args.distill:
+        loss = loss.sum() + args.distill_weight * loss_kd + args.distill_feat_weight * loss_kd_feat
+        writer.add_scalar('loss_distill', loss_kd.item(), i + 1)
+        writer.add_scalar('loss_distill_feat', loss_kd_feat.item(), i + 1)
   
     print(loss.sum().cpu().detach().numpy(),"-content:",loss_c.sum().cpu().detach().numpy(),"-style:",loss_s.sum().cpu().detach().numpy()
               ,"-l1:",l_identity1.sum().cpu().detach().numpy(),"-l2:",l_identity2.sum().cpu().detach().numpy()
@@ -181,7 +224,11 @@ for i in tqdm(range(args.max_iter)):
     writer.add_scalar('loss_identity2', l_identity2.sum().item(), i + 1)
     writer.add_scalar('total_loss', loss.sum().item(), i + 1)
 
-    if (i + 1) % args.save_model_interval == 0 or (i + 1) == args.max_iter:
+    if args.distill and ((i + 1) % args.save_model_interval == 0 or (i + 1) == args.max_iter):
+        student.export(network.module.decode, network.module.transformer, network.module.embedding,
+                       student_config, args.save_dir, i + 1)
+
+    elif (i + 1) % args.save_model_interval == 0 or (i + 1) == args.max_iter:
         state_dict = network.module.transformer.state_dict()
         for key in state_dict.keys():
             state_dict[key] = state_dict[key].to(torch.device('cpu'))
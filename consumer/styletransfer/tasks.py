@@ -4,13 +4,13 @@ from .StyTR2.stytr2 import StyTR2
 from .utills import get_gpu_memory
 
 
-def wait_for_result(content, style, prompt, preprocessor):
+def wait_for_result(content, style, prompt, preprocessor, variant="full", preserve_color=False):
     try:
         while not get_gpu_memory("StyTR2"):
             time.sleep(10)
 
-        strtr2 = StyTR2()
-        result = strtr2.inference(content, style)
+        strtr2 = StyTR2(variant=variant)
+        result = strtr2.inference(content, style, preserve_color=preserve_color)
 
         return result
 
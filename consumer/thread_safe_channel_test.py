@@ -0,0 +1,38 @@
+import os
+
+os.environ.setdefault("IDEMPOTENT_BACKEND", "memory")
+os.environ.setdefault("S3_CACHE_DIR", "")
+
+import pytest
+from pika.exceptions import AMQPError
+
+from generation_consumer import ThreadSafeChannel
+
+
+class StalledConnection:
+    """add_callback_threadsafe 로 받은 콜백을 바로 실행하지 않고 쌓아 둠 (connection 스레드 지연 흉내)"""
+
+    def __init__(self):
+        self.callbacks = []
+
+    def add_callback_threadsafe(self, callback):
+        self.callbacks.append(callback)
+
+
+class RecordingChannel:
+    def __init__(self):
+        self.acks = []
+
+    def basic_ack(self, delivery_tag, multiple=False):
+        self.acks.append(delivery_tag)
+
+
+def test_timed_out_call_is_not_executed_later():
+    connection, channel = StalledConnection(), RecordingChannel()
+    proxy = ThreadSafeChannel(connection, channel, timeout=0.05)
+    with pytest.raises(AMQPError):
+        proxy.basic_ack(delivery_tag=7)
+    # timeout 뒤에 connection 스레드가 콜백을 실행해도 ack 는 나가지 않음 (호출자의 nack 과 이중 처리 방지)
+    for callback in connection.callbacks:
+        callback()
+    assert channel.acks == []
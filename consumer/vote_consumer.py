@@ -1,6 +1,5 @@
 import os
 import ssl
-import io
 import json
 import base64
 import random
@@ -12,21 +11,22 @@ from static.s3 import *
 from static.model import *
 from static.rabbitmq import *
 
+from http_transport import create_openai_client
+from s3_objects import open_binaries
+from resilience import openai_call
+
 
 # ============================== 공통 유틸 ==============================
 def get_client() -> OpenAI:
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise RuntimeError("환경변수 OPENAI_API_KEY가 설정되지 않았습니다.")
-    return OpenAI(api_key=api_key)
+    return create_openai_client(api_key)
 
 
-def _open_binary(image_path: str):
-    key = image_path.lstrip("/")
-    resp = s3_client.get_object(Bucket=S3_BUCKET, Key=key)
-    data = resp["Body"].read()
-    ctype = resp.get("ContentType", "image/png")
-    return io.BytesIO(data), ctype
+def _open_binaries(image_paths: List[str]):
+    """여러 S3 이미지를 동시에 다운로드 → 요청 순서대로 [(BytesIO, content-type), ...]"""
+    return [(fh, ctype) for _, fh, ctype in open_binaries(image_paths)]
 
 
 def _b64(data: bytes) -> str:
@@ -67,20 +67,19 @@ def _build_user_content_abstraction(orig_b64: str, orig_ctype: str, new_b64: str
 
 def run_abstraction_agent(original_image_path, new_image_path, model=MODEL):
     try:
-        orig_fh, orig_ctype = _open_binary(original_image_path)
-        new_fh, new_ctype = _open_binary(new_image_path)
+        (orig_fh, orig_ctype), (new_fh, new_ctype) = _open_binaries([original_image_path, new_image_path])
         orig_b64 = _b64(orig_fh.read())
         new_b64 = _b64(new_fh.read())
 
         user_content = _build_user_content_abstraction(orig_b64, orig_ctype, new_b64, new_ctype)
-        resp = client.chat.completions.create(
+        resp = openai_call(lambda: client.chat.completions.create(
             model=model,
             messages=[
                 {"role": "system", "content": SYSTEM_INSTRUCTIONS_ABS},
                 {"role": "user", "content": user_content},
             ],
             temperature=0.2,
-        )
+        ), idempotent=True)
         message = resp.choices[0].message.content.strip()
         result = {}
         for line in message.splitlines():
@@ -128,14 +127,14 @@ def _build_user_content_filtering(abstract1: str, abstract2: str):
 def run_filtering_agent(abstract1: str, abstract2: str, model=MODEL):
     try:
         user_content = _build_user_content_filtering(abstract1, abstract2)
-        resp = client.chat.completions.create(
+        resp = openai_call(lambda: client.chat.completions.create(
             model=model,
             messages=[
                 {"role": "system", "content": SYSTEM_INSTRUCTIONS_FIL},
                 {"role": "user", "content": user_content},
             ],
             temperature=0.2,
-        )
+        ), idempotent=True)
         message = resp.choices[0].message.content.strip()
         result = {}
         for line in message.splitlines():
@@ -190,11 +189,12 @@ _ARBITER_SYSTEM = _KR_COPYRIGHT_GUIDE + """
 """
 
 
-def _s3_to_data_url_for_debate(path: str) -> Tuple[str, str]:
-    fh, ctype = _open_binary(path)
-    raw = fh.read()
-    mime = ctype or "image/png"
-    return mime, f"data:{mime};base64,{base64.b64encode(raw).decode()}"
+def _s3_to_data_urls_for_debate(paths: List[str]) -> List[Tuple[str, str]]:
+    urls = []
+    for fh, ctype in _open_binaries(paths):
+        mime = ctype or "image/png"
+        urls.append((mime, f"data:{mime};base64,{base64.b64encode(fh.read()).decode()}"))
+    return urls
 
 
 def _img_block(label: str, url: str):
@@ -203,20 +203,23 @@ def _img_block(label: str, url: str):
 
 def _call_text(model: str, system: str, user: List[dict], hist: List[dict], temperature=0.2):
     msgs = [{"role": "system", "content": system}] + hist + [{"role": "user", "content": user}]
-    resp = client.chat.completions.create(model=model, messages=msgs, temperature=temperature)
+    resp = openai_call(lambda: client.chat.completions.create(model=model, messages=msgs, temperature=temperature),
+                       idempotent=True)
     return (resp.choices[0].message.content or "").strip()
 
 
 def _call_json(model: str, system: str, user: List[dict]):
     msgs = [{"role": "system", "content": system}, {"role": "user", "content": user}]
-    resp = client.chat.completions.create(model=model, messages=msgs, temperature=0.15)
+    resp = openai_call(lambda: client.chat.completions.create(model=model, messages=msgs, temperature=0.15),
+                       idempotent=True)
     txt = (resp.choices[0].message.content or "").strip()
     return json.loads(txt)
 
 
 def run_two_sided_debate(base_path: str, ref_paths: List[str], rounds: int = 3, model: str = MODEL):
-    _, base_url = _s3_to_data_url_for_debate(base_path)
-    ref_urls = [_s3_to_data_url_for_debate(p)[1] for p in ref_paths]
+    # base 와 모든 ref 를 동시에 다운로드
+    urls = [url for _, url in _s3_to_data_urls_for_debate([base_path] + list(ref_paths))]
+    base_url, ref_urls = urls[0], urls[1:]
     ctx_blocks = _img_block("A(심사 대상)", base_url)
     for i, u in enumerate(ref_urls, 1):
         ctx_blocks += _img_block(f"B#{i}(원본 후보)", u)